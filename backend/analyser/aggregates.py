@@ -0,0 +1,501 @@
+import pandas as pd
+import numpy as np
+from typing import Optional
+
+# WPM thresholds reported on the Peak Performance slide
+WPM_THRESHOLDS = [100, 110, 120, 130, 140]
+
+
+# WPM histogram bins per WPM. MonkeyType reports WPM to 2 decimals, so each
+# 0.01 bin holds a single distinct value and the histogram is exact
+WPM_BINS_PER_UNIT = 100
+
+# Widest WPM histogram (in bins) counted with a dense bincount; wider (bogus)
+# ranges fall back to sorting the values
+MAX_DENSE_WPM_BINS = 1_000_000
+
+# Axes of the time cube built by build_cube
+CUBE_AXES = ('month', 'weekday', 'hour')
+
+
+def build_cube(month_codes: np.ndarray, weekday_codes: np.ndarray, hour_codes: np.ndarray,
+               month_count: int, **columns) -> dict:
+    """
+    Dense (month, weekday, hour) cube of count, sum and sum of squares.
+
+    Every hourly, weekday and monthly breakdown is a sum over the other
+    two axes of this cube, so timing and journey never regroup the frame.
+    Cells are summed with one pandas groupby; its compensated summation
+    keeps the per-cell sums as accurate as the old groupby().mean() calls.
+
+    Args:
+        month_codes: Months since the first month, per row
+        weekday_codes: Weekday per row (0=Monday)
+        hour_codes: Hour of day per row
+        month_count: Length of the month axis
+        columns: name -> values to summarise per cell
+
+    Returns:
+        Dictionary with 'count' plus '<name>_sum' and '<name>_sumsq'
+        arrays of shape (month_count, 7, 24)
+    """
+    shape = (month_count, 7, 24)
+    cells = (month_codes * 7 + weekday_codes) * 24 + hour_codes
+    size = month_count * 7 * 24
+
+    frame = {}
+    for name, values in columns.items():
+        frame[f"{name}_sum"] = values
+        frame[f"{name}_sumsq"] = values * values
+    sums = pd.DataFrame(frame).groupby(cells).sum()
+    occupied = sums.index.to_numpy()
+
+    cube = {"count": np.bincount(cells, minlength=size).reshape(shape)}
+    for key in frame:
+        values = np.zeros(size)
+        values[occupied] = sums[key].to_numpy()
+        cube[key] = values.reshape(shape)
+    return cube
+
+
+def cube_slice(cube: dict, axis: str) -> dict:
+    """
+    Collapse the cube onto one axis.
+
+    Only occupied cells are summed, with the same compensated groupby sum
+    as build_cube, so a slice's mean stays within the last bit of the old
+    groupby over the raw rows.
+
+    Args:
+        cube: Cube from build_cube (or merged by update_aggregates)
+        axis: 'month', 'weekday' or 'hour'
+
+    Returns:
+        Dictionary with 'count' plus the cube's '<name>_sum' /
+        '<name>_sumsq' arrays, indexed by month code, weekday 0-6 or hour 0-23
+    """
+    position = CUBE_AXES.index(axis)
+    counts = cube["count"]
+    size = counts.shape[position]
+
+    occupied = np.nonzero(counts)
+    sums = pd.DataFrame({key: values[occupied] for key, values in cube.items()
+                         if key != "count" and isinstance(values, np.ndarray)})
+    sums = sums.groupby(occupied[position]).sum().reindex(range(size), fill_value=0)
+
+    others = tuple(other for other in range(counts.ndim) if other != position)
+    sliced = {"count": counts.sum(axis=others)}
+    for key in sums:
+        sliced[key] = sums[key].to_numpy()
+    return sliced
+
+
+def time_breakdowns(cube: dict) -> dict:
+    """
+    Hourly, weekday and (active) monthly moments sliced from the cube.
+    """
+    monthly = cube_slice(cube, "month")
+
+    # Only months with tests, labelled like the Period column ("2025-01")
+    active_months = np.flatnonzero(monthly["count"])
+    monthly = {key: values[active_months] for key, values in monthly.items()}
+    monthly["ordinal"] = cube["first_month"] + active_months
+    monthly["month"] = [str(pd.Period(ordinal=int(ordinal), freq='M')) for ordinal in monthly["ordinal"]]
+
+    return {
+        "hourly": cube_slice(cube, "hour"),
+        "daily": cube_slice(cube, "weekday"),
+        "monthly": monthly,
+    }
+
+
+def wpm_histogram(wpm: np.ndarray, acc: np.ndarray) -> dict:
+    """
+    One-pass histogram of WPM in 0.01 WPM bins, with the accuracy sum per bin.
+
+    Exact for MonkeyType's 2-decimal WPM (every bin holds one distinct
+    value), and a fixed-resolution sketch (within 0.005 WPM) for finer
+    values. Quantiles, threshold counts and the clutch factor all come from
+    its cumulative counts, and two histograms merge exactly
+    (merge_wpm_histograms), so it works per chunk, per update and per year.
+
+    Returns:
+        Dictionary with 'bin' (WPM * 100, ascending), 'wpm' (the bin's
+        value), 'count' and 'acc_sum' for the occupied bins
+    """
+    bins = np.rint(wpm * WPM_BINS_PER_UNIT).astype(np.int64)
+    if len(bins) == 0:
+        return {"bin": bins, "wpm": np.zeros(0), "count": np.zeros(0, dtype=np.int64), "acc_sum": np.zeros(0)}
+
+    low = int(bins.min())
+    span = int(bins.max()) - low + 1
+    if span <= MAX_DENSE_WPM_BINS:
+        codes = bins - low
+        counts = np.bincount(codes, minlength=span)
+        occupied = np.flatnonzero(counts)
+        values = np.zeros(span)
+        values[codes] = wpm
+        return {
+            "bin": low + occupied,
+            "wpm": values[occupied],
+            "count": counts[occupied],
+            "acc_sum": np.bincount(codes, weights=acc, minlength=span)[occupied],
+        }
+
+    occupied, codes = np.unique(bins, return_inverse=True)
+    values = np.zeros(len(occupied))
+    values[codes] = wpm
+    return {
+        "bin": occupied,
+        "wpm": values,
+        "count": np.bincount(codes, minlength=len(occupied)),
+        "acc_sum": np.bincount(codes, weights=acc, minlength=len(occupied)),
+    }
+
+
+def merge_wpm_histograms(a: dict, b: dict) -> dict:
+    bins = np.union1d(a["bin"], b["bin"])
+    merged = {"bin": bins, "wpm": np.zeros(len(bins))}
+    for part in (a, b):
+        merged["wpm"][np.searchsorted(bins, part["bin"])] = part["wpm"]
+    for key in ("count", "acc_sum"):
+        values = np.zeros(len(bins), dtype=a[key].dtype)
+        np.add.at(values, np.searchsorted(bins, a["bin"]), a[key])
+        np.add.at(values, np.searchsorted(bins, b["bin"]), b[key])
+        merged[key] = values
+    return merged
+
+
+def histogram_quantile(histogram: dict, q: float) -> float:
+    """
+    The q-quantile of the histogrammed WPM, with the same linear
+    interpolation as numpy and pandas.
+    """
+    values = histogram["wpm"]
+    cumulative = np.cumsum(histogram["count"])
+    position = q * (int(cumulative[-1]) - 1)
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    # Same lerp as numpy's "linear" method, from whichever end is nearer
+    weight = position - np.floor(position)
+    if weight < 0.5:
+        return lower + (upper - lower) * weight
+    return upper - (upper - lower) * (1 - weight)
+
+
+def count_at_least(histogram: dict, threshold: float) -> int:
+    """
+    Number of tests with WPM >= threshold (one binary search on the CDF).
+    """
+    below = int(np.searchsorted(histogram["wpm"], threshold, side='left'))
+    return int(histogram["count"][below:].sum())
+
+
+def clutch_accuracies(histogram: dict) -> tuple:
+    """
+    Mean accuracy of the fastest and of the slowest 10% of tests.
+
+    Returns:
+        (fast_acc_mean, slow_acc_mean)
+    """
+    values = histogram["wpm"]
+    counts = histogram["count"]
+    fast = values >= histogram_quantile(histogram, 0.9)
+    slow = values <= histogram_quantile(histogram, 0.1)
+    fast_acc = histogram["acc_sum"][fast].sum() / counts[fast].sum() if fast.any() else 0
+    slow_acc = histogram["acc_sum"][slow].sum() / counts[slow].sum() if slow.any() else 0
+    return fast_acc, slow_acc
+
+
+def distinct_days(days: np.ndarray) -> np.ndarray:
+    """
+    Distinct days of a sorted 'date' column (days since epoch), in order.
+
+    One comparison per row instead of a sort, since the parser's frame is
+    already chronological.
+    """
+    if len(days) == 0:
+        return days
+    return days[np.concatenate(([True], days[1:] != days[:-1]))]
+
+
+def streak_state(days: np.ndarray, prior: Optional[dict] = None) -> dict:
+    """
+    Run state of consecutive active days.
+
+    Args:
+        days: Sorted unique active days, as days since epoch (see distinct_days)
+        prior: State from earlier days to continue from; days on or
+               before its last day are ignored
+
+    Returns:
+        Dictionary with 'lastDay' (days since epoch), 'current' (length of
+        the run ending on lastDay), 'longest' and 'longestGap' (most days
+        in a row without a test, between two active days)
+    """
+    state = dict(prior) if prior is not None else {"lastDay": None, "current": 0, "longest": 0, "longestGap": 0}
+
+    days = np.asarray(days, dtype=np.int64)
+    if state["lastDay"] is not None:
+        days = days[days > state["lastDay"]]
+    if len(days) == 0:
+        return state
+
+    # A step > 1 day breaks the streak (step - 1 days without tests); each run spans start..end
+    steps = np.diff(days)
+    breaks = np.flatnonzero(steps > 1)
+    run_starts = np.concatenate(([0], breaks + 1))
+    run_ends = np.concatenate((breaks, [len(days) - 1]))
+    run_lengths = run_ends - run_starts + 1
+    longest_gap = int(steps.max()) - 1 if len(steps) > 0 else 0
+
+    if state["lastDay"] is not None:
+        # The first run extends the prior one if it starts the day after
+        if days[0] == state["lastDay"] + 1:
+            run_lengths[0] += state["current"]
+        longest_gap = max(longest_gap, int(days[0]) - state["lastDay"] - 1)
+
+    return {
+        "lastDay": int(days[-1]),
+        "current": int(run_lengths[-1]),
+        "longest": max(state["longest"], int(run_lengths.max())),
+        "longestGap": max(state["longestGap"], longest_gap)
+    }
+
+
+def score_moments(wpm: np.ndarray, acc: np.ndarray, consistency: np.ndarray) -> dict:
+    """
+    Sums, means and the WPM std of the per-test scores, in float64.
+
+    Sums of two halves can differ from the sum of the whole in the last
+    bit, so update_aggregates' merged values are only close; callers that
+    still have every test's scores (incremental states) recompute these
+    to get exactly what a full analysis reports.
+    """
+    n = len(wpm)
+    wpm_sum = wpm.sum()
+    wpm_mean = wpm_sum / n
+    # Sum of squared deviations (two-pass, so the std matches pandas exactly)
+    wpm_m2 = ((wpm - wpm_mean) ** 2).sum()
+    acc_sum = acc.sum()
+    return {
+        "wpm_sum": wpm_sum,
+        "wpm_mean": wpm_mean,
+        "wpm_m2": wpm_m2,
+        "wpm_std": np.sqrt(wpm_m2 / (n - 1)) if n > 1 else np.nan,
+        "acc_sum": acc_sum,
+        "acc_mean": acc_sum / n,
+        "consistency_sum": consistency.sum(),
+    }
+
+
+def compute_aggregates(df: pd.DataFrame, prior: Optional[dict] = None) -> dict:
+    """
+    Collect every reduction the analyser modules need in one pass over the data.
+
+    core_stats, comparisons, timing, journey and the summary block in main.py
+    all used to rescan the same columns for the same means, maxima and sums.
+    This computes them once so each module only formats the results.
+
+    Computes:
+    - Totals, maxima and moments of wpm/acc/consistency/chars/restarts
+    - Personal best position and PB count
+    - WPM threshold counts and clutch factor quantiles
+    - A (month, weekday, hour) cube of moments and its hourly, daily
+      (weekday) and monthly slices
+
+    Args:
+        df: Cleaned DataFrame from parser
+        prior: Aggregates of earlier tests when `df` only holds newer ones
+               (see update_aggregates); PBs and streaks continue from it
+
+    Returns:
+        Dictionary of reductions (see keys below). Sums and means stay NumPy
+        scalars, like the pandas reductions they replace, so the modules'
+        round() calls behave exactly as before.
+    """
+    n = len(df)
+
+    wpm = df['wpm'].to_numpy(dtype=np.float64)
+    acc = df['acc'].to_numpy(dtype=np.float64)
+    consistency = df['consistency'].to_numpy(dtype=np.float64)
+    duration = df['testDuration'].to_numpy(dtype=np.float64)
+    restarts = df['restartCount'].to_numpy()
+
+    moments = score_moments(wpm, acc, consistency)
+    wpm_max = wpm.max()
+    wpm_argmax = int(wpm.argmax())
+
+    # A test is a PB if it matches the running max (carried over from prior tests)
+    running_max = np.maximum.accumulate(wpm)
+    if prior is not None:
+        running_max = np.maximum(running_max, prior['wpm_max'])
+
+    # Clutch factor (accuracy of the fastest 10% vs the slowest 10%) and
+    # threshold counts come from one WPM histogram, as for merged aggregates
+    histogram = wpm_histogram(wpm, acc)
+    fast_acc_mean, slow_acc_mean = clutch_accuracies(histogram)
+
+    # Time cube for timing (hour, weekday) and journey (month)
+    month_ordinals = df['month'].to_numpy(dtype=np.int64)
+    first_month = int(month_ordinals.min())
+    month_codes = month_ordinals - first_month
+    cube = build_cube(month_codes, df['day_of_week_num'].to_numpy(), df['hour'].to_numpy(),
+                      int(month_codes.max()) + 1, wpm=wpm, acc=acc, consistency=consistency)
+    cube["first_month"] = first_month
+
+    # Day ordinals (int32 days since epoch); df is sorted chronologically,
+    # so the active days come out in order
+    days = distinct_days(df['date'].to_numpy())
+
+    return {
+        "count": n,
+
+        # Speed (plus the sums and means of score_moments)
+        **moments,
+        "wpm_max": wpm_max,
+        "pb_datetime": df['datetime'].iloc[wpm_argmax],
+        "pb_count": int((wpm == running_max).sum()),
+        "thresholds": {threshold: count_at_least(histogram, threshold) for threshold in WPM_THRESHOLDS},
+        "wpm_histogram": histogram,
+
+        # Accuracy
+        "perfect_acc_count": int((acc == 100).sum()),
+        "fast_acc_mean": fast_acc_mean,
+        "slow_acc_mean": slow_acc_mean,
+
+        # Volume
+        # testDuration is never filled by the parser, so skip NaN like pandas does
+        "duration_sum": np.nansum(duration),
+        "words_sum": np.nansum(wpm * duration / 60),
+        "chars_total": df['total_chars'].to_numpy().sum(),
+        "chars_incorrect": df['chars_incorrect'].to_numpy().sum(),
+        "chars_extra": df['chars_extra'].to_numpy().sum(),
+        "chars_missed": df['chars_missed'].to_numpy().sum(),
+
+        # Restarts
+        "restart_sum": restarts.sum(),
+        "restart_max": restarts.max(),
+        "restart_zero_count": int((restarts == 0).sum()),
+
+        "mode_counts": df['mode'].value_counts() if 'mode' in df.columns else None,
+
+        # Calendar
+        "datetime_min": df['datetime'].min(),
+        "datetime_max": df['datetime'].max(),
+        # First and last active day, as days since epoch
+        "date_min": int(days[0]),
+        "date_max": int(days[-1]),
+        "active_days": len(days),
+        "streak": streak_state(days, prior['streak'] if prior is not None else None),
+        "year_max": int(df['year'].max()),
+
+        # Time cube, plus its hourly/weekday/monthly slices (arrays indexed
+        # by hour 0-23, weekday 0=Monday, active month)
+        "cube": cube,
+        **time_breakdowns(cube),
+    }
+
+
+def _merge_cubes(old: dict, new: dict) -> dict:
+    """
+    Add two time cubes cell by cell (their month axes may start and end
+    on different months, and overlap at the boundary).
+    """
+    first_month = min(old["first_month"], new["first_month"])
+    month_count = max(old["first_month"] + len(old["count"]), new["first_month"] + len(new["count"])) - first_month
+
+    merged = {"first_month": first_month}
+    for key, values in old.items():
+        if key == "first_month":
+            continue
+        cube = np.zeros((month_count,) + values.shape[1:], dtype=np.result_type(values, new[key]))
+        for part in (old, new):
+            offset = part["first_month"] - first_month
+            cube[offset:offset + len(part[key])] += part[key]
+        merged[key] = cube
+    return merged
+
+
+def update_aggregates(aggs: dict, df: pd.DataFrame) -> dict:
+    """
+    Fold tests newer than everything in `aggs` into it.
+
+    Every reduction is a monoid (sums, counts, extrema, group moments,
+    run state, time-cube cells, WPM histogram bins), so the cost only
+    depends on the number of new tests and the size of the cube and
+    histogram. The clutch factor is recomputed from the merged histogram.
+
+    Args:
+        aggs: Aggregates of the earlier tests
+        df: Cleaned DataFrame holding only the new tests
+
+    Returns:
+        Aggregates covering both
+    """
+    if len(df) == 0:
+        return aggs
+
+    new = compute_aggregates(df, prior=aggs)
+    n = aggs['count'] + new['count']
+
+    # Chan et al. parallel update for the sum of squared deviations
+    delta = new['wpm_mean'] - aggs['wpm_mean']
+    wpm_m2 = aggs['wpm_m2'] + new['wpm_m2'] + delta ** 2 * aggs['count'] * new['count'] / n
+    wpm_sum = aggs['wpm_sum'] + new['wpm_sum']
+    acc_sum = aggs['acc_sum'] + new['acc_sum']
+
+    # The boundary day can appear on both sides
+    overlap_day = 1 if new['date_min'] == aggs['date_max'] else 0
+
+    mode_counts = aggs['mode_counts']
+    if mode_counts is not None and new['mode_counts'] is not None:
+        mode_counts = mode_counts.add(new['mode_counts'], fill_value=0).astype(int)
+        mode_counts = mode_counts.sort_values(ascending=False, kind='stable')
+
+    merged = {
+        "count": n,
+
+        "wpm_sum": wpm_sum,
+        "wpm_mean": wpm_sum / n,
+        "wpm_max": max(aggs['wpm_max'], new['wpm_max']),
+        # Ties keep the earlier PB, like idxmax()
+        "pb_datetime": new['pb_datetime'] if new['wpm_max'] > aggs['wpm_max'] else aggs['pb_datetime'],
+        "wpm_m2": wpm_m2,
+        "wpm_std": np.sqrt(wpm_m2 / (n - 1)),
+        "pb_count": aggs['pb_count'] + new['pb_count'],
+        "thresholds": {threshold: aggs['thresholds'][threshold] + new['thresholds'][threshold] for threshold in WPM_THRESHOLDS},
+
+        "acc_sum": acc_sum,
+        "acc_mean": acc_sum / n,
+        "perfect_acc_count": aggs['perfect_acc_count'] + new['perfect_acc_count'],
+
+        "consistency_sum": aggs['consistency_sum'] + new['consistency_sum'],
+
+        "duration_sum": aggs['duration_sum'] + new['duration_sum'],
+        "words_sum": aggs['words_sum'] + new['words_sum'],
+        "chars_total": aggs['chars_total'] + new['chars_total'],
+        "chars_incorrect": aggs['chars_incorrect'] + new['chars_incorrect'],
+        "chars_extra": aggs['chars_extra'] + new['chars_extra'],
+        "chars_missed": aggs['chars_missed'] + new['chars_missed'],
+
+        "restart_sum": aggs['restart_sum'] + new['restart_sum'],
+        "restart_max": max(aggs['restart_max'], new['restart_max']),
+        "restart_zero_count": aggs['restart_zero_count'] + new['restart_zero_count'],
+
+        "mode_counts": mode_counts,
+
+        "datetime_min": aggs['datetime_min'],
+        "datetime_max": new['datetime_max'],
+        "date_min": aggs['date_min'],
+        "date_max": new['date_max'],
+        "active_days": aggs['active_days'] + new['active_days'] - overlap_day,
+        "streak": new['streak'],
+        "year_max": max(aggs['year_max'], new['year_max']),
+
+    }
+    merged["wpm_histogram"] = merge_wpm_histograms(aggs['wpm_histogram'], new['wpm_histogram'])
+    merged["fast_acc_mean"], merged["slow_acc_mean"] = clutch_accuracies(merged["wpm_histogram"])
+    merged["cube"] = _merge_cubes(aggs['cube'], new['cube'])
+    merged.update(time_breakdowns(merged["cube"]))
+    return merged
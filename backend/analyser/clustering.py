@@ -1,10 +1,114 @@
+import logging
+import time
 import pandas as pd 
 import numpy as np
-from sklearn.cluster import KMeans 
-from sklearn.preprocessing import StandardScaler # Makes features comparable
-from sklearn.metrics import silhouette_score  # For evaluating clustering quality 
+from typing import Optional, Union
 
-def find_optimal_k(features_scaled, k_range=(2,6)): 
+from .dataset import Dataset
+from .shared_arrays import SharedArray
+
+# sklearn is imported inside the functions that use it: it takes longer to
+# import than everything else in the app together, and only clustering needs
+# it (the server pre-warms it at startup, see pipeline.prewarm)
+
+logger = logging.getLogger(__name__)
+
+# Histories at least this long are clustered with the mini-batch engine
+# when method="auto"; smaller ones keep the exact full K-means fit (about
+# a second at this size). Below it personas are exactly the K-means ones.
+MINIBATCH_MIN_ROWS = 100_000
+
+# Rows in the fixed-seed subsample whose full K-means fit warm-starts the mini-batch pass
+WARM_START_SAMPLE_SIZE = 10_000
+
+# Rows per mini-batch update
+MINIBATCH_BATCH_SIZE = 4096
+
+# Rows used to estimate the silhouette score (it is O(n²) on the full data)
+SILHOUETTE_SAMPLE_SIZE = 5_000
+
+RANDOM_STATE = 42
+
+# Adaptive k ("adaptive" instead of a fixed cluster count): candidates are
+# scored on a stratified subsample of this many rows...
+ADAPTIVE_SAMPLE_SIZE = 5_000
+
+# ...over this range (capped by the number of persona names)...
+ADAPTIVE_K_RANGE = (2, 5)
+
+# ...and the search stops once it has used this much time
+ADAPTIVE_TIME_BUDGET_SECONDS = 0.5
+
+# Candidate fits run this many Lloyd iterations at a time, checking the
+# time budget in between, and the first candidate gets this many restarts
+ADAPTIVE_ITERATION_STEP = 10
+ADAPTIVE_RESTARTS = 3
+
+
+def fit_persona_model(features_scaled: np.ndarray, n_clusters: int = 4, method: str = "auto",
+                      init_centroids: Optional[np.ndarray] = None):
+    """
+    Fit the clustering model behind the personas.
+
+    Methods:
+    - "kmeans": full K-means with 10 restarts (exact, slow on long histories)
+    - "minibatch": mini-batch K-means over the whole history, warm-started
+      from centroids fitted on a fixed-seed subsample (or from init_centroids),
+      then one full K-means run from its centres. Mini-batch centres are
+      noisy; the full run settles them on the exact (Lloyd) solution next
+      to them, which is the one full K-means finds on clearly grouped data
+    - "auto": "minibatch" from MINIBATCH_MIN_ROWS rows up, "kmeans" below
+
+    Both paths use a fixed random_state, so the same data gives the same model.
+
+    Args:
+        features_scaled: Scaled feature matrix (n_tests x n_features)
+        n_clusters: Number of clusters
+        method: "auto", "kmeans" or "minibatch"
+        init_centroids: Optional (n_clusters x n_features) centroids from a
+                        previously fitted model to warm-start from
+
+    Returns:
+        Fitted KMeans or MiniBatchKMeans model
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    n_rows = len(features_scaled)
+    if method == "auto":
+        method = "minibatch" if n_rows >= MINIBATCH_MIN_ROWS else "kmeans"
+
+    if method == "kmeans":
+        if init_centroids is not None:
+            model = KMeans(n_clusters=n_clusters, init=init_centroids, n_init=1, random_state=RANDOM_STATE)
+        else:
+            model = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+        return model.fit(features_scaled)
+
+    if method != "minibatch":
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    if init_centroids is None:
+        # Warm start: the restarts only run on a small subsample
+        rng = np.random.default_rng(RANDOM_STATE)
+        sample_size = min(n_rows, WARM_START_SAMPLE_SIZE)
+        sample = np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+        seed_model = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+        init_centroids = seed_model.fit(features_scaled[sample]).cluster_centers_
+
+    model = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        init=init_centroids,
+        n_init=1,
+        batch_size=MINIBATCH_BATCH_SIZE,
+        random_state=RANDOM_STATE
+    )
+    centers = model.fit(features_scaled).cluster_centers_
+
+    # Converges in a handful of cheap passes, since it starts next to the answer
+    return KMeans(n_clusters=n_clusters, init=centers, n_init=1, random_state=RANDOM_STATE).fit(features_scaled)
+
+
+def find_optimal_k(features_scaled, k_range=(2,6), method="auto", sample_size=SILHOUETTE_SAMPLE_SIZE): 
     """
     Find optimal number of clusters using Silhouette Score.
     
@@ -16,32 +120,147 @@ def find_optimal_k(features_scaled, k_range=(2,6)):
     Args:
         features_scaled: Scaled feature matrix
         k_range: Range of k values to test (default: 2 to 6)
+        method: Clustering method passed to fit_persona_model
+        sample_size: Score on a fixed-seed sample of this many rows
+                     (None scores every row, which is O(n²))
         
     Returns:
         Optimal k value
     """
-    print(f"\n🔍 Testing k values from {k_range[0]} to {k_range[1]}...")
+    from sklearn.metrics import silhouette_score  # For evaluating clustering quality
+
+    logger.debug("🔍 Testing k values from %s to %s...", k_range[0], k_range[1])
 
     best_k = 2 
     best_score = -1 
     scores = {}
 
+    if sample_size is not None and sample_size >= len(features_scaled):
+        sample_size = None
+
     for k in range(k_range[0], k_range[1]+1):
         #Try Clutstering with k clusters 
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        labels = kmeans.fit_predict(features_scaled)
+        labels = fit_persona_model(features_scaled, n_clusters=k, method=method).labels_
 
         #Calculate Silhouette Score
-        score = silhouette_score(features_scaled, labels)
+        score = silhouette_score(features_scaled, labels, sample_size=sample_size, random_state=RANDOM_STATE)
         scores[k] = score
-        print(f" k={k}: Silhouette Score = {score:.3f}")
+        logger.debug("k=%s: Silhouette Score = %.3f", k, score)
 
         if score > best_score:
             best_score = score
             best_k = k  
-    print(f"Optimal k found: {best_k} with Silhouette Score = {best_score:.3f}\n")
+    logger.debug("Optimal k found: %s with Silhouette Score = %.3f", best_k, best_score)
     return best_k
 
+def stratified_sample(features_scaled: np.ndarray, sample_size: int) -> np.ndarray:
+    """
+    Row indices of a fixed-seed sample stratified on the first feature (WPM).
+
+    Rows are ranked by WPM and one row is drawn from each of `sample_size`
+    equal-width rank blocks, so slow and fast tests are both represented
+    in proportion (a plain random sample can miss a small fast cluster).
+    """
+    n_rows = len(features_scaled)
+    if sample_size >= n_rows:
+        return np.arange(n_rows)
+
+    order = np.argsort(features_scaled[:, 0], kind='stable')
+    block_edges = np.linspace(0, n_rows, sample_size + 1)
+    rng = np.random.default_rng(RANDOM_STATE)
+    picks = np.floor(block_edges[:-1] + rng.random(sample_size) * np.diff(block_edges)).astype(np.int64)
+    return np.sort(order[np.minimum(picks, n_rows - 1)])
+
+
+def select_k(features_scaled: np.ndarray, k_range=ADAPTIVE_K_RANGE, sample_size: int = ADAPTIVE_SAMPLE_SIZE,
+             time_budget_seconds: float = ADAPTIVE_TIME_BUDGET_SECONDS, default_k: int = 4) -> dict:
+    """
+    Pick the number of clusters cheaply enough to run on every upload.
+
+    Unlike find_optimal_k (full restarts per k plus silhouette, O(k·n²)):
+    - Candidates are fitted on a stratified subsample, not the full data
+    - Fits are reused: k+1 starts from the k centroids plus the point
+      worst served by them, so each candidate is a single K-means run
+    - Candidates are scored with the Calinski-Harabasz index, which is
+      linear in the number of rows (higher = better separated clusters)
+    - The budget is checked between candidates and every few Lloyd
+      iterations inside a fit; a fit still running when `time_budget_seconds`
+      is spent is dropped, and the best finished candidate wins (default_k
+      if none finished)
+
+    Args:
+        features_scaled: Scaled feature matrix
+        k_range: Smallest and largest k to consider
+        sample_size: Rows in the subsample
+        time_budget_seconds: Time limit for the whole search
+        default_k: Fallback when no candidate could be scored
+
+    Returns:
+        Dictionary with 'k', 'scores' (k -> index), 'sampleSize' and 'seconds'
+    """
+    from sklearn.cluster import kmeans_plusplus
+    from sklearn.metrics import calinski_harabasz_score
+
+    started = time.perf_counter()
+    deadline = started + time_budget_seconds
+    sample = features_scaled[stratified_sample(features_scaled, sample_size)]
+    k_min, k_max = k_range
+    # Calinski-Harabasz needs fewer clusters than rows, and at most one per distinct point
+    k_max = min(k_max, len(np.unique(sample, axis=0)), len(sample) - 1)
+
+    scores = {}
+    centroids = None
+    for k in range(k_min, k_max + 1):
+        if time.perf_counter() > deadline:
+            logger.debug("Adaptive k: time budget spent before k=%s", k)
+            break
+
+        if centroids is None:
+            seeds = np.random.RandomState(RANDOM_STATE)
+            inits = [kmeans_plusplus(sample, k, random_state=seeds)[0] for _ in range(ADAPTIVE_RESTARTS)]
+        else:
+            # Split off the point farthest from its centroid as the new cluster
+            distances = ((sample - centroids[model.labels_]) ** 2).sum(axis=1)
+            inits = [np.vstack([centroids, sample[distances.argmax()]])]
+
+        fits = [_fit_before(sample, init, deadline) for init in inits]
+        fits = [fit for fit in fits if fit is not None]
+        if not fits:
+            logger.debug("Adaptive k: time budget spent while fitting k=%s", k)
+            break
+        model = min(fits, key=lambda fit: fit.inertia_)
+        centroids = model.cluster_centers_
+
+        if len(np.unique(model.labels_)) < 2:
+            break
+        scores[k] = float(calinski_harabasz_score(sample, model.labels_))
+        logger.debug("k=%s: Calinski-Harabasz = %.1f", k, scores[k])
+
+    best_k = max(scores, key=scores.get) if scores else default_k
+    return {"k": best_k, "scores": scores, "sampleSize": len(sample),
+            "seconds": time.perf_counter() - started}
+
+
+def _fit_before(sample: np.ndarray, init: np.ndarray, deadline: float):
+    """
+    K-means from `init`, ADAPTIVE_ITERATION_STEP Lloyd iterations at a time.
+
+    Returns:
+        The converged model, or None if `deadline` (a perf_counter time)
+        passed first
+    """
+    from sklearn.cluster import KMeans
+
+    while True:
+        model = KMeans(n_clusters=len(init), init=init, n_init=1, max_iter=ADAPTIVE_ITERATION_STEP,
+                       random_state=RANDOM_STATE).fit(sample)
+        if model.n_iter_ < ADAPTIVE_ITERATION_STEP:
+            return model
+        if time.perf_counter() > deadline:
+            return None
+        init = model.cluster_centers_
+
+
 def assign_unique_personas(clusters):
     """
     Assign unique persona names to clusters based on relative characteristics.
@@ -150,89 +369,223 @@ def assign_unique_personas(clusters):
     return clusters
 
 
-def compute_personas(df: pd.DataFrame) -> dict: 
+# Features the personas are clustered on, and how many personas we look for
+FEATURE_COLUMNS = ['wpm', 'acc', 'consistency']
+N_CLUSTERS = 4
+
+
+# Clustering works on float32 features: half the memory of float64, and
+# K-means labels come out the same in practice
+FEATURE_DTYPE = np.float32
+
+# MonkeyType reports wpm/acc/consistency to 2 decimals, so rounding the
+# float32 features to this many recovers the exact float64 values
+FEATURE_DECIMALS = 2
+
+
+def feature_matrix(df: Union[pd.DataFrame, Dataset], out: Optional[np.ndarray] = None) -> np.ndarray:
     """
-    Use K-means clustering to identify typing personas.
-    
-    How it works:
-    1. Extract features: wpm, accuracy, consistency
-    2. Scale features to same range (StandardScaler)
-    3. Run K-means clustering (k=4 clusters)
-    4. Analyze cluster characteristics
-    5. Assign meaningful names based on patterns
-    
+    The clustering features as one contiguous (n_tests x 3) float32 matrix.
+
+    Filled column by column, so no intermediate float64 frame is built.
+
     Args:
-        df: Cleaned DataFrame from parser
-        
+        df: Cleaned DataFrame from parser, or a Dataset of it
+        out: Optional preallocated matrix to fill (e.g. a SharedArray's)
+    """
+    if out is None:
+        out = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=FEATURE_DTYPE)
+    for position, column in enumerate(FEATURE_COLUMNS):
+        out[:, position] = df.column(column) if isinstance(df, Dataset) else df[column].to_numpy()
+    return out
+
+
+def feature_columns(features: np.ndarray) -> list:
+    """
+    The columns of a feature_matrix() back as the float64 values the parser
+    read (see FEATURE_DECIMALS), in FEATURE_COLUMNS order.
+    """
+    return [np.round(features[:, position].astype(np.float64), FEATURE_DECIMALS)
+            for position in range(features.shape[1])]
+
+
+def share_feature_matrix(df: Union[pd.DataFrame, Dataset]) -> SharedArray:
+    """
+    feature_matrix(df) in shared memory, for clustering on a process pool.
+    The caller unlinks it once the fit is done.
+    """
+    shared = SharedArray.empty((len(df), len(FEATURE_COLUMNS)), FEATURE_DTYPE)
+    feature_matrix(df, out=shared.array)
+    return shared
+
+
+def cluster_moments(features: np.ndarray, labels: np.ndarray, n_clusters: int,
+                    decimals: Optional[int] = None) -> dict:
+    """
+    Per-cluster test counts and feature sums, one bincount per column.
+
+    Args:
+        features: Unscaled feature matrix (columns in FEATURE_COLUMNS order)
+        labels: Cluster label for every row
+        n_clusters: Number of clusters
+        decimals: Round each (float64) column to this many decimals first;
+                  undoes float32 storage (see FEATURE_DECIMALS)
+
     Returns:
-        Dictionary with persona analysis
+        Dictionary with 'count', 'wpm_sum', 'acc_sum' and 'consistency_sum' arrays
+    """
+    moments = {"count": np.bincount(labels, minlength=n_clusters).astype(np.int64)}
+    for position, column in enumerate(FEATURE_COLUMNS):
+        values = features[:, position].astype(np.float64)
+        if decimals is not None:
+            values = np.round(values, decimals)
+        moments[f"{column}_sum"] = np.bincount(labels, weights=values, minlength=n_clusters)
+    return moments
+
+
+def _fit_clusters(features: np.ndarray, method: str, init_centroids: Optional[np.ndarray],
+                  n_clusters: Union[int, str] = N_CLUSTERS):
     """
-    print("\n Starting ML Clustering analysis")
+    Scale the features, fit the model and summarise each cluster.
 
-    #Get features for clustering 
-    features = df[['wpm', 'acc','consistency']].copy()
+    features is a feature_matrix(); n_clusters is a cluster count or
+    "adaptive" (see select_k).
 
-    print(f" {len(features)} tests with 3 features")
+    Returns:
+        (persona state, cluster label per test)
+    """
+    logger.debug("%s tests with 3 features", len(features))
+
+    from sklearn.preprocessing import StandardScaler  # Makes features comparable
 
     # Scale the features to the same range for K-means to work properly 
     scaler = StandardScaler()
     features_scaled = scaler.fit_transform(features)
 
-    print(f" Scaled features (mean=0, std = 1)")
+    logger.debug("Scaled features (mean=0, std = 1)")
+
+    k_selection = None
+    if n_clusters == "adaptive" and init_centroids is not None:
+        # Warm starts keep the cluster count they come with
+        n_clusters = len(init_centroids)
+    elif n_clusters == "adaptive":
+        k_selection = select_k(features_scaled, default_k=N_CLUSTERS)
+        n_clusters = k_selection["k"]
+        logger.debug("Adaptive k chose %s in %.3fs", n_clusters, k_selection["seconds"])
+    elif not isinstance(n_clusters, int):
+        raise ValueError(f"Unknown cluster count: {n_clusters}")
+
+    # A small slice (e.g. a year with 2 tests) can't hold more clusters than tests
+    if n_clusters > len(features):
+        logger.debug("Only %s tests; fitting %s clusters instead of %s", len(features), len(features), n_clusters)
+        n_clusters = len(features)
+        if init_centroids is not None:
+            init_centroids = init_centroids[:n_clusters]
 
     #  Perform K-means clustering
-    # n_clusters = 4: We want 4 different personas
+    # n_clusters = 4 by default: We want 4 different personas
     # random_state = 42: Makes results reproducible (same every time)
-    # n_init = 10: Try 10 different starting positions, pick best
     
-    n_clusters = 4
-    kmeans = KMeans(
-        n_clusters=n_clusters,
-        random_state=42,
-        n_init=10
-    )
+    kmeans = fit_persona_model(features_scaled, n_clusters=n_clusters, method=method, init_centroids=init_centroids)
     
-    # Fit the model and predict cluster labels
-    cluster_labels = kmeans.fit_predict(features_scaled)
+    # Cluster label for every test
+    cluster_labels = kmeans.labels_
     
     # cluster_labels is an array like: [0, 2, 1, 0, 3, 1, ...]
     # Each number is the cluster ID for that test
     
-    print(f"K-means clustering complete ({n_clusters} clusters)")
-    
-    # Add cluster labels back to original DataFrame
-    df['cluster'] = cluster_labels
+    logger.debug("K-means clustering complete (%s clusters)", n_clusters)
+
+    state = {
+        "scaler_mean": scaler.mean_,
+        "scaler_scale": scaler.scale_,
+        "centroids": kmeans.cluster_centers_,
+        "moments": cluster_moments(features, cluster_labels, n_clusters, decimals=FEATURE_DECIMALS)
+    }
+    if k_selection is not None:
+        state["k_selection"] = k_selection
+    return state, cluster_labels
+
+
+def fit_persona_state(features: Union[pd.DataFrame, np.ndarray], method: str = "auto",
+                      init_centroids: Optional[np.ndarray] = None,
+                      n_clusters: Union[int, str] = N_CLUSTERS) -> dict:
+    """
+    Fit the persona clusters and keep only what is needed to describe and extend them.
+
+    The state holds the scaler parameters, the centroids (in scaled space)
+    and per-cluster moments - a few dozen numbers regardless of history length.
+    Pass it to describe_personas for the slide data.
+
+    Args:
+        features: Cleaned DataFrame from parser, or its feature_matrix()
+        method: "auto", "kmeans" or "minibatch" (see fit_persona_model)
+        init_centroids: Optional scaled centroids to warm-start from
+        n_clusters: Number of personas, or "adaptive" to choose 2-5 per upload
+
+    Returns:
+        Persona state dictionary
+    """
+    if isinstance(features, pd.DataFrame):
+        features = feature_matrix(features)
+    state, _ = _fit_clusters(features, method, init_centroids, n_clusters)
+    return state
+
+
+def fit_shared_persona_state(features: SharedArray, method: str = "auto",
+                             init_centroids: Optional[np.ndarray] = None,
+                             n_clusters: Union[int, str] = N_CLUSTERS) -> dict:
+    """
+    fit_persona_state on a feature matrix in shared memory (see
+    share_feature_matrix); what process-pool workers run, so the matrix is
+    never pickled.
+    """
+    return features.call(fit_persona_state, method, init_centroids, n_clusters)
+
+
+def describe_personas(state: dict) -> dict:
+    """
+    Turn per-cluster moments into named personas.
+
+    Args:
+        state: Persona state from fit_persona_state
+
+    Returns:
+        Dictionary with persona analysis
+    """
+    moments = state["moments"]
+    n_clusters = len(moments["count"])
+    total_tests = int(moments["count"].sum())
 
     # Analyze each cluster's characteristics
     clusters = []
     
     for cluster_id in range(n_clusters):
-        # Get all tests in this cluster
-        cluster_data = df[df['cluster'] == cluster_id]
-        
         # Calculate statistics for this cluster
-        cluster_size = len(cluster_data)
-        cluster_pct = (cluster_size / len(df)) * 100
-        
-        avg_wpm = cluster_data['wpm'].mean()
-        avg_acc = cluster_data['acc'].mean()
-        avg_consistency = cluster_data['consistency'].mean()
+        cluster_size = int(moments["count"][cluster_id])
+        cluster_pct = (cluster_size / total_tests) * 100
+
+        # An empty cluster (possible after a warm start) has no averages
+        divisor = cluster_size if cluster_size > 0 else np.nan
+        avg_wpm = np.nan_to_num(moments["wpm_sum"][cluster_id] / divisor)
+        avg_acc = np.nan_to_num(moments["acc_sum"][cluster_id] / divisor)
+        avg_consistency = np.nan_to_num(moments["consistency_sum"][cluster_id] / divisor)
         
         clusters.append({
             'id': int(cluster_id),
-            'count': int(cluster_size),
+            'count': cluster_size,
             'percentage': round(cluster_pct, 1),
             'avgWpm': round(avg_wpm, 2),
             'avgAccuracy': round(avg_acc, 2),
             'avgConsistency': round(avg_consistency, 2)
         })
     
-    print(f" Analyzed {n_clusters} cluster characteristics")
+    logger.debug("Analyzed %s cluster characteristics", n_clusters)
     
     # Name each cluster based on its characteristics ensuring uniqueness
     clusters = assign_unique_personas(clusters)
 
-    print(f'Named all personas')
+    logger.debug('Named all personas')
 
     #Find the dominant persona (largest cluster)
     clusters_sorted = sorted(clusters, key=lambda x: x['count'], reverse = True)
@@ -246,10 +599,34 @@ def compute_personas(df: pd.DataFrame) -> dict:
         }, 
         "allPersonas": clusters_sorted
     }
-    print(f"Dominant persona: {dominant['name']} ({dominant['percentage']}%)")
+    logger.debug("Dominant persona: %s (%s%%)", dominant['name'], dominant['percentage'])
     return result 
 
 
+def compute_personas(df: pd.DataFrame, method: str = "auto", init_centroids: Optional[np.ndarray] = None,
+                     n_clusters: Union[int, str] = N_CLUSTERS) -> dict: 
+    """
+    Use K-means clustering to identify typing personas.
+    
+    How it works:
+    1. Extract features: wpm, accuracy, consistency
+    2. Scale features to same range (StandardScaler)
+    3. Run K-means clustering (k=4 clusters, or chosen per upload with
+       n_clusters="adaptive"), mini-batch for long histories
+    4. Analyze cluster characteristics
+    5. Assign meaningful names based on patterns
     
-    ...
+    Args:
+        df: Cleaned DataFrame from parser
+        method: "auto", "kmeans" or "minibatch" (see fit_persona_model)
+        init_centroids: Optional scaled centroids to warm-start from
+        n_clusters: Number of personas, or "adaptive"
+        
+    Returns:
+        Dictionary with persona analysis
+    """
+    logger.debug("Starting ML Clustering analysis")
+
+    state, _ = _fit_clusters(feature_matrix(df), method, init_centroids, n_clusters)
 
+    return describe_personas(state)
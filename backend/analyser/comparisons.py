@@ -1,8 +1,11 @@
+import logging
 import pandas as pd
 import numpy as np
 
+logger = logging.getLogger(__name__)
 
-def compute_comparisons(df: pd.DataFrame) -> dict:
+
+def compute_comparisons(aggs: dict) -> dict:
     """
     Compare user's performance against global benchmarks and fun comparisons.
     
@@ -13,26 +16,26 @@ def compute_comparisons(df: pd.DataFrame) -> dict:
     - Speed category classification
     
     Args:
-        df: Cleaned DataFrame with 'wpm', 'acc', 'total_chars' columns
+        aggs: Shared reductions from aggregates.compute_aggregates
         
     Returns:
         Dictionary with comparison metrics
     """
     
-    print("\n Comparing your stats globally...")
-  
+    logger.debug("Comparing your stats globally...")
+
     # CORE METRICS
-    avg_wpm = df['wpm'].mean()
-    max_wpm = df['wpm'].max()
-    avg_accuracy = df['acc'].mean()
-    total_chars_typed = df['total_chars'].sum()
+    avg_wpm = aggs['wpm_mean']
+    max_wpm = aggs['wpm_max']
+    avg_accuracy = aggs['acc_mean']
+    total_chars_typed = aggs['chars_total']
     
     # Characters per second = (WPM * 5) / 60
     # (Average word is ~5 characters, 60 seconds per minute)
     chars_per_second = (avg_wpm * 5) / 60
     
-    print(f"   Average speed: {avg_wpm:.1f} WPM")
-    print(f"   Characters/second: {chars_per_second:.1f}")
+    logger.debug("Average speed: %.1f WPM", avg_wpm)
+    logger.debug("Characters/second: %.1f", chars_per_second)
     
 
     # GLOBAL PERCENTILE ESTIMATION
@@ -79,8 +82,8 @@ def compute_comparisons(df: pd.DataFrame) -> dict:
     elif avg_accuracy < 90:
         percentile = max(1, percentile - 5)
     
-    print(f"   Estimated percentile: {percentile}th")
-    print(f"   Skill tier: {skill_tier}")
+    logger.debug("Estimated percentile: %sth", percentile)
+    logger.debug("Skill tier: %s", skill_tier)
     
 
     # NOVEL COMPARISONS (Fun Facts 
@@ -118,7 +121,7 @@ def compute_comparisons(df: pd.DataFrame) -> dict:
         "timeHours": round(gatsby_time, 1)
     }
     
-    print(f"   Time to type The Great Gatsby: {gatsby_time:.1f} hours")
+    logger.debug("Time to type The Great Gatsby: %.1f hours", gatsby_time)
     
     # SPEED COMPARISONS
     
@@ -174,7 +177,7 @@ def compute_comparisons(df: pd.DataFrame) -> dict:
     
 
     # How consistent is the user? (lower std dev = more consistent)
-    wpm_std = df['wpm'].std()
+    wpm_std = aggs['wpm_std']
     consistency_score = max(0, min(100, 100 - (wpm_std / avg_wpm * 100)))
     
     if consistency_score > 80:
@@ -186,8 +189,8 @@ def compute_comparisons(df: pd.DataFrame) -> dict:
     else:
         consistency_rating = "Variable"
     
-    print(f"   Consistency: {consistency_rating} ({consistency_score:.0f}/100)")
-    print(f"   Comparison analysis complete!")
+    logger.debug("Consistency: %s (%.0f/100)", consistency_rating, consistency_score)
+    logger.debug("Comparison analysis complete!")
     
     # RETURN ALL COMPARISON DATA
     
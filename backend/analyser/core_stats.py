@@ -1,49 +1,37 @@
+import logging
 import pandas as pd 
 import numpy as np 
 
+from . import aggregates, parser
+
+logger = logging.getLogger(__name__)
+
 def calculate_longest_streak(df: pd.DataFrame) -> int:
     """
     Calculate the longest consecutive streak of active days. 
     
     How it works: 
-    1. Get unique sorted dates 
+    1. Get unique sorted days (integer day ordinals from the parser)
     2. Find gaps > 1 day (the streak breaks)
     3. Return longest streak length
 
+    The run state itself (aggregates.streak_state) is what compute_aggregates
+    keeps, so streaks can be continued when new tests are appended.
+
      Args:
-        df: DataFrame with 'date' column
+        df: DataFrame with 'date' column (days since epoch)
         
     Returns:
         Longest streak in days
     """
 
-    # Get unique dates and sort them
-    unique_dates = sorted(df['date'].unique())
-    
-    if len(unique_dates) == 0:
-        return 0
-
-    # Convert to pandas series 
-    date_series = pd.Series(unique_dates)
+    # Get unique days, sorted
+    days = np.unique(df['date'].to_numpy())
 
-    # Calculate difference between consecutive dates (in days)
-    # diff() gives us the gap: [day1, day2, day3] -> [NaN, 1, 1] for consecutive days
-    date_diffs = date_series.diff().dt.days
+    return aggregates.streak_state(days)['longest']
 
-    # Find where streaks break (gap > 1 day)
-    # Create a "streak_id" that increments at each break
-    streak_breaks = (date_diffs>1).cumsum()
 
-    # Group by streak_id and count days in each streak
-    streak_lengths = date_series.groupby(streak_breaks).size()
-
-    # Return the longest streak
-    longest = int(streak_lengths.max())
-    
-    return longest 
-
-
-def compute_core_stats(df: pd.DataFrame)-> dict: 
+def compute_core_stats(aggs: dict)-> dict: 
     """
     Compute basic statistics for multiple slides.
     
@@ -55,16 +43,16 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
     - Restart habits and quirks
     
     Args:
-        df: Cleaned DataFrame from parser
+        aggs: Shared reductions from aggregates.compute_aggregates
         
     Returns:
         Dictionary with stats for hook, yearInNumbers, peakPerformance, quirks, accuracy
     """
     # Slide 1: THe Hook 
 
-    total_words = (df['wpm'] * df['testDuration']/ 60).sum()
+    total_words = aggs['words_sum']
 
-    total_time_min = df['testDuration'].sum()/60
+    total_time_min = aggs['duration_sum']/60
     total_time_hours = total_time_min/60
 
     #Novel Comparison 
@@ -81,21 +69,25 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
         "totalTimeHours": round(total_time_hours,1),
         "novelComparison": novel_comparison
     }
-    print(f"Hook: {int(total_words)} words, {round(total_time_hours, 1)} hours")
+    logger.debug("Hook: %s words, %s hours", int(total_words), round(total_time_hours, 1))
 
     # Slide 2: Year in Numbers 
-    total_tests = len(df)
+    total_tests = aggs['count']
     
     # count unique days with activity 
-    unique_dates = df['date'].nunique()
-    date_range_days = (df['date'].max()-df['date'].min()).days+1
+    unique_dates = aggs['active_days']
+    date_range_days = aggs['date_max']-aggs['date_min']+1
     active_days_pct = (unique_dates/date_range_days)*100
 
     #Total chars typed 
-    total_characters = df['total_chars'].sum()
+    total_characters = aggs['chars_total']
+
+    #Longest streak, the streak the export ends on, and the longest break
+    longest_streak = aggs['streak']['longest']
+    current_streak = aggs['streak']['current']
+    longest_gap = aggs['streak']['longestGap']
 
-    #Longest streak 
-    longest_streak = calculate_longest_streak(df)
+    first_day, last_day = parser.day_labels([aggs['date_min'], aggs['date_max']])
     
     year_in_numbers = { 
         'totalTests': total_tests,
@@ -104,35 +96,33 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
         'activeDaysPct':round(active_days_pct, 1),
         'totalCharacters':int(total_characters),
         'longestStreak':longest_streak,
+        'currentStreak':current_streak,
+        'longestGap':longest_gap,
         "dateRange":{
-            "start": str(df['date'].min()),
-            "end":str(df['date'].max())
+            "start": first_day,
+            "end": last_day
         }
     }
     
-    print(f"Year in Numbers: {total_tests} tests, {unique_dates} active days")
+    logger.debug("Year in Numbers: %s tests, %s active days", total_tests, unique_dates)
     
     # Slide 4: Peak Performance 
 
-    all_time_pb = df['wpm'].max()
-    pb_index = df['wpm'].idxmax() #index of max WPM
-    pb_date = str(df.loc[pb_index, 'datetime'])
+    all_time_pb = aggs['wpm_max']
+    pb_date = str(aggs['pb_datetime'])
 
     #count perfect accuary tests (100%)
-    perfect_accuracy_count = len(df[df['acc']==100])
-    perfect_accuracy_pct = (perfect_accuracy_count/len(df))*100
+    perfect_accuracy_count = aggs['perfect_acc_count']
+    perfect_accuracy_pct = (perfect_accuracy_count/total_tests)*100
 
     #Count personal bests (new highest WPM at that point in time)
-    # cummax() gives the running max at the point 
-    total_pbs_hit = (df['wpm']==df['wpm'].cummax()).sum()
+    total_pbs_hit = aggs['pb_count']
 
     # WPM thresholds (e.g., how many tests > 100 WPM, > 120 WPM)
-    thresholds = [100, 110, 120, 130, 140]
     threshold_data = []
 
-    for threshold in thresholds:
-        count = len(df[df['wpm'] >= threshold])
-        pct = (count / len(df)) * 100 if len(df) > 0 else 0
+    for threshold, count in aggs['thresholds'].items():
+        pct = (count / total_tests) * 100 if total_tests > 0 else 0
         threshold_data.append({
             "wpm": threshold,
             "count": count,
@@ -148,24 +138,24 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
         "thresholds": threshold_data
     }
 
-    print(f"Peak Performance: {round(all_time_pb, 2)} WPM PB, {total_pbs_hit} PBs hit")
+    logger.debug("Peak Performance: %s WPM PB, %s PBs hit", round(all_time_pb, 2), total_pbs_hit)
     
     #Slide 8: Your Quirks 
 
-    avg_restarts = df['restartCount'].mean()
-    max_restarts = int(df['restartCount'].max())
+    avg_restarts = aggs['restart_sum']/total_tests
+    max_restarts = int(aggs['restart_max'])
 
     #Percentage of tests on first try (no restarts)
-    first_try_count = len(df[df['restartCount']==0])
-    first_try_pct = (first_try_count/len(df))*100
+    first_try_count = aggs['restart_zero_count']
+    first_try_pct = (first_try_count/total_tests)*100
     
     # TIme wasted on restarted tests (rough estimate)
     # Assume each restart wastes 3 seconds on avg 
-    time_wasted_seconds = df['restartCount'].sum() * 3
+    time_wasted_seconds = aggs['restart_sum'] * 3
     time_wasted_minutes = time_wasted_seconds / 60
 
-    if 'mode' in df.columns:
-        mode_counts = df['mode'].value_counts()
+    mode_counts = aggs['mode_counts']
+    if mode_counts is not None:
         favorite_mode = str(mode_counts.index[0]) if len(mode_counts) > 0 else "unknown"
         favorite_mode_count = int(mode_counts.iloc[0]) if len(mode_counts) > 0 else 0
     else:
@@ -190,15 +180,15 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
         "favoriteModeCount": favorite_mode_count,
         "restartAddictionLevel": restart_level
     }
-    print(f" Quirks: {round(avg_restarts, 2)} avg restarts, {restart_level} level")
+    logger.debug("Quirks: %s avg restarts, %s level", round(avg_restarts, 2), restart_level)
 
     # Slide 9: Accuracy Deep Dive 
-    overall_accuracy = df['acc'].mean()
+    overall_accuracy = aggs['acc_mean']
 
     #Total errors by type 
-    total_wrong_key = df ['chars_incorrect'].sum()
-    total_extra = df['chars_extra'].sum()
-    total_missed = df['chars_missed'].sum()
+    total_wrong_key = aggs['chars_incorrect']
+    total_extra = aggs['chars_extra']
+    total_missed = aggs['chars_missed']
     total_errors = total_wrong_key + total_extra + total_missed
 
     # Error breakdown percentages
@@ -218,14 +208,10 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
     }
 
     #Clutch Factor: accuracy when typing fast vs slow (top 10% of tests)
-    fast_threshold = df['wpm'].quantile(0.9)
-    fast_tests = df[df['wpm'] >= fast_threshold]
-    fast_accuracy = fast_tests['acc'].mean() if len(fast_tests) > 0 else 0
+    fast_accuracy = aggs['fast_acc_mean']
 
     # Bottom 10% slowest tests
-    slow_threshold = df['wpm'].quantile(0.10)
-    slow_tests = df[df['wpm'] <= slow_threshold]
-    slow_accuracy = slow_tests['acc'].mean() if len(slow_tests) > 0 else 0
+    slow_accuracy = aggs['slow_acc_mean']
     
     clutch_difference = fast_accuracy - slow_accuracy
 
@@ -240,21 +226,21 @@ def compute_core_stats(df: pd.DataFrame)-> dict:
         } 
     }
 
-    print(f"Accuracy: {round(overall_accuracy, 2)}% overall, {int(total_errors)} total errors ")
+    logger.debug("Accuracy: %s%% overall, %s total errors", round(overall_accuracy, 2), int(total_errors))
 
     # Slide 11: Share card 
     share_card = {
-        "year": int(df['year'].max()),
-        "headline": f"I typed {int(total_words):,} words in {int(df['year'].max())}!",
+        "year": aggs['year_max'],
+        "headline": f"I typed {int(total_words):,} words in {aggs['year_max']}!",
         "topStats": [
-            {"label": "Average WPM", "value": f"{df['wpm'].mean():.1f}"},
+            {"label": "Average WPM", "value": f"{aggs['wpm_mean']:.1f}"},
             {"label": "Peak WPM", "value": f"{all_time_pb:.1f}"},
             {"label": "Tests Taken", "value": f"{total_tests:,}"},
             {"label": "Active Days", "value": f"{unique_dates}"}
         ]
     }
 
-    print("Share Card Generated")
+    logger.debug("Share Card Generated")
 
     return {
         "hook": hook_data,
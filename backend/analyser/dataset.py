@@ -0,0 +1,47 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Dataset:
+    """
+    Read-only view of one parsed export, shared by the analyser modules.
+
+    Modules run concurrently on the same upload, so none of them may add or
+    overwrite columns of the parsed frame. Instead they get:
+    - column(): cached NumPy views of a column, flagged non-writeable, so an
+      in-place write fails loudly instead of changing another module's input
+    - frame(): a selection of columns as a new DataFrame (copy-on-write, so
+      only what a module writes to it is ever copied)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._columns = {}
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def columns(self) -> list:
+        return list(self._df.columns)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One column as a read-only NumPy array (no copy where pandas can avoid it).
+        """
+        if name not in self._columns:
+            values = self._df[name].to_numpy().view()
+            values.flags.writeable = False
+            self._columns[name] = values
+        return self._columns[name]
+
+    def frame(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """
+        Some (default: all) columns as a new DataFrame object; columns the
+        caller adds or replaces never reach the dataset.
+        """
+        if columns is None:
+            return self._df.copy(deep=False)
+        return self._df[columns]
@@ -0,0 +1,166 @@
+import pickle
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from . import aggregates, core_stats, clustering, journey, timing, warmup, comparisons, parser
+from .sessions import DEFAULT_SESSION_GAP_MINUTES
+
+# Bump when the state layout changes; older states are ignored and rebuilt
+STATE_VERSION = 6
+
+
+def build_state(df: pd.DataFrame, aggs: dict, persona_state: dict, preview: Optional[list] = None,
+                session_gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES) -> dict:
+    """
+    Running state for a user, built after a full analysis.
+
+    Holds monoid-style accumulators for every module plus the high-water
+    mark (newest timestamp analysed), so later uploads only need to process
+    newer tests. The count and digest of the analysed tests ('history')
+    let a later upload prove it continues this history (see matches_history).
+
+    The clustering feature matrix (12 bytes per test) is kept too: personas
+    are re-fitted on the whole history at every update, since a streaming
+    centroid update drifts away from what a full analysis would find.
+
+    Args:
+        df: Cleaned DataFrame from parser (sorted by timestamp)
+        aggs: Aggregates of df
+        persona_state: Output of clustering.fit_persona_state on df
+        preview: First rows of the export, echoed in every response
+        session_gap_minutes: Session gap the warmup accumulators use; later
+                             updates keep using it
+
+    Returns:
+        State dictionary (serialise with dumps_state)
+    """
+    closed_sessions, open_session = warmup.split_open_session(df, session_gap_minutes)
+
+    return {
+        "version": STATE_VERSION,
+        "high_water_mark": int(df['timestamp'].iloc[-1]),
+        "history": history_of(df),
+        "aggregates": aggs,
+        # Sessions that can't continue, plus the raw rows of the last one
+        "session_gap_minutes": session_gap_minutes,
+        "sessions": warmup.summarize_sessions(closed_sessions, session_gap_minutes),
+        "open_session": open_session[['timestamp', 'wpm']].reset_index(drop=True),
+        "personas": persona_state,
+        "features": clustering.feature_matrix(df),
+        "columns": list(df.columns),
+        "preview": preview if preview is not None else []
+    }
+
+
+def history_of(df: pd.DataFrame) -> dict:
+    """
+    Count and digest (parser.tests_digest) of cleaned tests.
+    """
+    return {"count": len(df), "digest": parser.tests_digest(df['timestamp'], df['wpm'], df['acc'])}
+
+
+def matches_history(state: dict, skipped: dict) -> bool:
+    """
+    Whether the tests an upload holds up to the high-water mark (the
+    parser's `skipped` summary) are exactly the ones the state was built
+    from. A user id alone proves nothing: a different export sent with
+    the same id must not see, or be folded into, someone else's state.
+    """
+    return skipped == state["history"]
+
+
+def session_gap(state: dict) -> float:
+    """
+    Session gap a state was built with (states from before it was
+    configurable used the default).
+    """
+    return state.get("session_gap_minutes", DEFAULT_SESSION_GAP_MINUTES)
+
+
+def update_state(state: dict, df: pd.DataFrame,
+                 n_clusters: Union[int, str] = clustering.N_CLUSTERS) -> dict:
+    """
+    Fold tests newer than the high-water mark into the state.
+
+    Everything a response shows comes out exactly as a full analysis of
+    the whole history would report it: personas are re-fitted on the
+    stored feature matrix, and the score sums and means are recomputed
+    from it in the order a full run adds them up.
+
+    Args:
+        state: State from build_state or a previous update
+        df: Cleaned DataFrame holding only tests newer than state["high_water_mark"]
+        n_clusters: Number of personas, or "adaptive" (as for the full analysis)
+
+    Returns:
+        Updated state
+    """
+    if len(df) == 0:
+        return state
+
+    # The last stored session may continue into the new tests
+    session_rows = pd.concat([state["open_session"], df[['timestamp', 'wpm']]], ignore_index=True)
+    gap_minutes = session_gap(state)
+    closed_sessions, open_session = warmup.split_open_session(session_rows, gap_minutes)
+
+    # New tests are newer than every stored one, so appending keeps the
+    # chronological order a full parse produces
+    features = np.concatenate([state["features"], clustering.feature_matrix(df)])
+    aggs = aggregates.update_aggregates(state["aggregates"], df)
+    aggs.update(aggregates.score_moments(*clustering.feature_columns(features)))
+
+    return {
+        **state,
+        "high_water_mark": int(df['timestamp'].iloc[-1]),
+        "history": {
+            "count": state["history"]["count"] + len(df),
+            "digest": parser.add_digests(state["history"]["digest"], history_of(df)["digest"])
+        },
+        "aggregates": aggs,
+        "sessions": warmup.merge_session_summaries(state["sessions"], warmup.summarize_sessions(closed_sessions, gap_minutes)),
+        "open_session": open_session.reset_index(drop=True),
+        "personas": clustering.fit_persona_state(features, "auto", None, n_clusters),
+        "features": features
+    }
+
+
+def render_state(state: dict) -> dict:
+    """
+    Produce every module's slide data from the stored accumulators.
+
+    Cost depends on the size of the state (months, sessions in progress,
+    distinct WPM values), not on the number of tests analysed.
+
+    Returns:
+        Dictionary with 'aggregates', 'core', 'persona', 'journey',
+        'timing', 'warmup' and 'comparisons'
+    """
+    aggs = state["aggregates"]
+
+    sessions = warmup.merge_session_summaries(state["sessions"], warmup.summarize_sessions(state["open_session"], session_gap(state)))
+
+    return {
+        "aggregates": aggs,
+        "core": core_stats.compute_core_stats(aggs),
+        "persona": clustering.describe_personas(state["personas"]),
+        "journey": journey.compute_journey(aggs),
+        "timing": timing.compute_timing(aggs),
+        "warmup": warmup.describe_warmup(sessions),
+        "comparisons": comparisons.compute_comparisons(aggs)
+    }
+
+
+def dumps_state(state: dict) -> bytes:
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads_state(data: bytes) -> Optional[dict]:
+    """
+    Deserialise a stored state; returns None for states from an older layout.
+    """
+    state = pickle.loads(data)
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
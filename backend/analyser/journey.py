@@ -1,23 +1,26 @@
+import logging
 import pandas as pd
 import numpy as np
 
+logger = logging.getLogger(__name__)
 
-def compute_journey(df: pd.DataFrame) -> dict:
+
+def compute_journey(aggs: dict) -> dict:
     """Analyze typing progress over time."""
     
-    print("\n Analyzing your typing journey...")
-    
-    # Group by month
-    monthly_stats = df.groupby('month').agg({
-        'wpm': ['mean', 'count'],
-        'acc': 'mean',
-        'consistency': 'mean'
-    }).reset_index()
-    
-    monthly_stats.columns = ['month', 'avgWpm', 'testCount', 'avgAcc', 'avgConsistency']
-    monthly_stats = monthly_stats.sort_values('month')
+    logger.debug("Analyzing your typing journey...")
+
+    # Monthly moments are a slice (in month order) of the aggregates' time cube
+    monthly = aggs['monthly']
+    monthly_stats = pd.DataFrame({
+        'month': monthly['month'],
+        'avgWpm': monthly['wpm_sum'] / monthly['count'],
+        'testCount': monthly['count'],
+        'avgAcc': monthly['acc_sum'] / monthly['count'],
+        'avgConsistency': monthly['consistency_sum'] / monthly['count']
+    })
     
-    print(f" Analyzed {len(monthly_stats)} months of data")
+    logger.debug("Analyzed %s months of data", len(monthly_stats))
     
     # Compare first and last month
     if len(monthly_stats) > 0:
@@ -29,7 +32,7 @@ def compute_journey(df: pd.DataFrame) -> dict:
         last_month_avg = 0
         improvement = 0
     
-    print(f"First month: {first_month_avg:.1f} WPM → Last month: {last_month_avg:.1f} WPM (Δ {improvement:+.1f})")
+    logger.debug("First month: %.1f WPM → Last month: %.1f WPM (Δ %+.1f)", first_month_avg, last_month_avg, improvement)
 
     # Step 3: Find the best performing month
     if len(monthly_stats) > 0:
@@ -42,25 +45,25 @@ def compute_journey(df: pd.DataFrame) -> dict:
         best_month = "N/A"
         best_month_wpm = 0
     
-    print(f"Best month: {best_month} ({best_month_wpm:.1f} WPM)")
+    logger.debug("Best month: %s (%.1f WPM)", best_month, best_month_wpm)
     
     # Calculate month-over-month changes
     # This shows which month had the biggest jump in performance
     if len(monthly_stats) > 1:
-        # Calculate difference between consecutive months
-        monthly_stats['wpmChange'] = monthly_stats['avgWpm'].diff()
+        # Calculate difference between consecutive months (kept as its own
+        # Series rather than another column on the monthly frame)
+        wpm_change = monthly_stats['avgWpm'].diff()
         
         # Find month with biggest positive change
-        biggest_jump_idx = monthly_stats['wpmChange'].idxmax()
-        biggest_jump_row = monthly_stats.loc[biggest_jump_idx]
+        biggest_jump_idx = wpm_change.idxmax()
         
-        biggest_jump_month = str(biggest_jump_row['month'])
-        biggest_jump_amount = biggest_jump_row['wpmChange']
+        biggest_jump_month = str(monthly_stats.loc[biggest_jump_idx, 'month'])
+        biggest_jump_amount = wpm_change[biggest_jump_idx]
     else:
         biggest_jump_month = "N/A"
         biggest_jump_amount = 0
     
-    print(f" Biggest improvement: {biggest_jump_month} (+{biggest_jump_amount:.1f} WPM)")
+    logger.debug("Biggest improvement: %s (+%.1f WPM)", biggest_jump_month, biggest_jump_amount)
 
     #Prepare monthly trend data for frontend chart
     monthly_trend = []
@@ -83,7 +86,7 @@ def compute_journey(df: pd.DataFrame) -> dict:
         "monthlyTrend": monthly_trend
     }
     
-    print(f"Journey analysis complete!\n")
+    logger.debug("Journey analysis complete!")
     
     return result 
 
@@ -1,48 +1,578 @@
+import gzip
+import importlib
+import logging
+import numpy as np
 import pandas as pd
 from io import BytesIO
-from datetime import datetime 
+from typing import BinaryIO, Optional, Union
 
+logger = logging.getLogger(__name__)
 
-def parse_csv(file_contents: bytes) ->pd.DataFrame:
+# Number of CSV rows parsed and cleaned at a time when streaming an upload.
+# Only one raw chunk is resident at once, so this bounds the parser's working set.
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Export columns the analysers read; everything else (_id, tags, rawWpm,
+# key spacing stats, ...) is skipped at read time
+ANALYSIS_COLUMNS = ['wpm', 'acc', 'consistency', 'charStats', 'mode', 'restartCount', 'testDuration', 'timestamp']
+
+# Accepted upload file name suffixes -> format passed to parse_upload
+# (longer suffixes first so "x.csv.gz" isn't taken for something else)
+UPLOAD_FORMATS = {
+    '.csv.gz': 'csv.gz',
+    '.csv.zst': 'csv.zst',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+
+# Columns that feed the validity filters; coerced to numbers so one bad cell
+# can't turn a whole chunk into strings
+NUMERIC_COLUMNS = ['wpm', 'acc', 'consistency', 'restartCount', 'testDuration', 'timestamp']
+
+# Numeric columns validate_columns doesn't require; clean_chunk adds them
+# (empty) when an export leaves them out
+OPTIONAL_NUMERIC_COLUMNS = ['consistency', 'restartCount', 'testDuration']
+
+# charStats format: "correct;incorrect;extra;missed"
+CHAR_STATS_COLUMNS = ['chars_correct', 'chars_incorrect', 'chars_extra', 'chars_missed']
+
+# Longest digit run the fast charStats decoder handles (keeps values in int32)
+MAX_CHAR_STATS_DIGITS = 9
+_POWERS_OF_TEN = 10 ** np.arange(MAX_CHAR_STATS_DIGITS, dtype=np.int64)
+
+# Storage plan for the cleaned frame. wpm/acc/consistency/testDuration stay
+# float64: they feed sums, means and quantiles whose rounded outputs float32
+# would change.
+#   hour              uint8     0-23
+#   day_of_week_num   uint8     0=Monday .. 6=Sunday
+#   day_of_week       category  weekday names, codes = day_of_week_num
+#   month             int32     months since 1970-01 (Period ordinal)
+#   date              int32     days since 1970-01-01 (streaks and active days are integer ops)
+#   year              int16
+#   chars_*           int32
+#   restartCount      int32
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+# Bytes of (decompressed) CSV the pre-flight check reads: the header and a few hundred rows
+SNIFF_BYTES = 64 * 1024
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised for upload formats the parser can't read (or can't read without an optional package)."""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when an upload isn't a MonkeyType export (missing columns, non-numeric values, not CSV at all)."""
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload has more tests than the configured ceiling."""
+
+
+def parse_csv(file_contents: Union[bytes, BinaryIO]) ->pd.DataFrame:
     """
     Read CSV into DataFrame
     - Convert timestamp (ms) to datetime
     - Extract hour, day_of_week, month, date
     - Parse charStats into correct/incorrect/extra/missed columns
     - Return cleaned DataFrame
+
+    Accepts either the raw bytes of the upload or a binary file object;
+    both go through the same chunked path as parse_csv_stream().
+    """
+    # Convert bytes to a file (BytesIO wraps the bytes so pandas can read it like a file)
+    if isinstance(file_contents, (bytes, bytearray)):
+        file_contents = BytesIO(file_contents)
+
+    return parse_csv_stream(file_contents)
+
+
+def parse_csv_stream(file_obj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     min_timestamp: Optional[int] = None, max_rows: Optional[int] = None,
+                     skipped: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Parse a MonkeyType export from a binary file object, chunk by chunk.
+
+    Each chunk of `chunk_size` rows is converted and cleaned (timestamps,
+    charStats split, validity filters) before the next one is read, so the
+    raw text of the upload is never held in memory as a whole. Only the
+    cleaned rows are kept and concatenated at the end.
+
+    Args:
+        file_obj: Binary file object positioned at the start of the CSV
+                  (e.g. UploadFile.file, which spools large uploads to disk)
+        chunk_size: Number of rows to parse per chunk
+        min_timestamp: If set, only keep tests strictly newer than this
+                       (ms since epoch); used for incremental re-analysis
+        max_rows: If set, stop with UploadTooLargeError as soon as more
+                  rows than this have been read
+        skipped: Optional dict that receives the 'count' and 'digest' (see
+                 tests_digest) of the valid tests dropped by min_timestamp,
+                 so callers can check they are the history they expect
+
+    Returns:
+        Cleaned DataFrame sorted chronologically
     """
-    # Convert bytes to Dataframe (BytesIo wraps the bytes so pandas can read it like a file)
     # on_bad_lines='skip' will skip malformed lines instead of erroring
-    df = pd.read_csv(BytesIO(file_contents), on_bad_lines='skip')
+    # usecols keeps the unused export columns from ever being materialised
+    reader = pd.read_csv(file_obj, on_bad_lines='skip', chunksize=chunk_size,
+                         usecols=lambda column: column in ANALYSIS_COLUMNS)
+
+    with reader:
+        return _parse_chunks(reader, min_timestamp, source="CSV", max_rows=max_rows, skipped=skipped)
+
+
+def detect_format(filename: str) -> str:
+    """
+    Work out the upload format from the file name.
+
+    Returns:
+        One of the UPLOAD_FORMATS values ('csv', 'csv.gz', 'csv.zst', 'parquet', 'arrow')
+
+    Raises:
+        UnsupportedFormatError: for any other extension
+    """
+    name = (filename or "").lower()
+    for suffix, file_format in UPLOAD_FORMATS.items():
+        if name.endswith(suffix):
+            return file_format
+    raise UnsupportedFormatError(f"Unsupported file type: {filename}")
+
+
+def parse_upload(file_obj: BinaryIO, file_format: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 min_timestamp: Optional[int] = None, max_rows: Optional[int] = None,
+                 skipped: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Parse an uploaded export in any supported format.
+
+    - csv / csv.gz / csv.zst: decompressed on the fly and streamed through
+      parse_csv_stream (zstd needs the optional zstandard package)
+    - parquet / arrow: read batch by batch with pyarrow (optional), only
+      the analysed columns are loaded and no text parsing happens
+
+    Every format goes through the same clean_chunk step, so the result is
+    identical to parsing the equivalent CSV.
+
+    Args:
+        file_obj: Binary file object positioned at the start of the upload
+        file_format: Output of detect_format
+        chunk_size: Rows per chunk (CSV) or per record batch (Parquet)
+        min_timestamp: See parse_csv_stream
+        max_rows: See parse_csv_stream
+        skipped: See parse_csv_stream
+
+    Returns:
+        Cleaned DataFrame sorted chronologically
+    """
+    if file_format == "csv":
+        return parse_csv_stream(file_obj, chunk_size, min_timestamp, max_rows, skipped)
 
-    print(f"Loaded CSV: {len(df)} tests found")
-    print(f"Columns: {list(df.columns)}")
+    if file_format == "csv.gz":
+        with gzip.GzipFile(fileobj=file_obj, mode='rb') as decompressed:
+            return parse_csv_stream(decompressed, chunk_size, min_timestamp, max_rows, skipped)
 
+    if file_format == "csv.zst":
+        zstandard = _import_optional("zstandard", "zstd-compressed CSV")
+        # closefd=False: the caller still owns the upload (and may rewind it)
+        with zstandard.ZstdDecompressor().stream_reader(file_obj, closefd=False) as decompressed:
+            return parse_csv_stream(decompressed, chunk_size, min_timestamp, max_rows, skipped)
+
+    if file_format in ("parquet", "arrow"):
+        return _parse_chunks(_arrow_chunks(file_obj, file_format, chunk_size), min_timestamp,
+                             source=file_format.capitalize(), max_rows=max_rows, skipped=skipped)
+
+    raise UnsupportedFormatError(f"Unsupported upload format: {file_format}")
+
+
+def _import_optional(module_name: str, purpose: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise UnsupportedFormatError(
+            f"{purpose} uploads need the optional '{module_name}' package (pip install {module_name})"
+        )
+
+
+def _arrow_chunks(file_obj: BinaryIO, file_format: str, chunk_size: int):
+    """
+    Yield DataFrames of the analysed columns from a Parquet or Arrow IPC upload.
+
+    Record batches are converted one at a time; numeric columns without
+    nulls are handed to pandas without copying the Arrow buffers.
+    """
+    pa = _import_optional("pyarrow", file_format.capitalize())
+
+    if file_format == "parquet":
+        parquet = importlib.import_module("pyarrow.parquet")
+        parquet_file = parquet.ParquetFile(file_obj)
+        columns = [name for name in parquet_file.schema_arrow.names if name in ANALYSIS_COLUMNS]
+        batches = parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        # Arrow IPC comes in a random-access file format and a streaming format
+        try:
+            ipc_file = pa.ipc.open_file(file_obj)
+            batches = (ipc_file.get_batch(index) for index in range(ipc_file.num_record_batches))
+        except pa.ArrowInvalid:
+            file_obj.seek(0)
+            batches = pa.ipc.open_stream(file_obj)
+
+    for batch in batches:
+        batch = batch.select([name for name in batch.schema.names if name in ANALYSIS_COLUMNS])
+        chunk = batch.to_pandas()
+
+        # Typed formats may store timestamps as datetimes rather than epoch ms
+        if 'timestamp' in chunk.columns and pd.api.types.is_datetime64_any_dtype(chunk['timestamp']):
+            chunk['timestamp'] = chunk['timestamp'].astype('datetime64[ms]').astype(np.int64)
+
+        yield chunk
+
+
+def _parse_chunks(chunks, min_timestamp: Optional[int], source: str, max_rows: Optional[int] = None,
+                  skipped: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Validate and clean raw chunks, then concatenate and sort the result.
+    """
+    cleaned_chunks = []
+    raw_row_count = 0
+    columns = None
+    if skipped is not None:
+        skipped.update(count=0, digest=0)
+
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            validate_columns(columns)
+
+        raw_row_count += len(chunk)
+        if max_rows is not None and raw_row_count > max_rows:
+            raise UploadTooLargeError(f"Exports can have at most {max_rows:,} tests")
+        cleaned_chunks.append(clean_chunk(chunk, min_timestamp, skipped))
+
+    if columns is None:
+        raise pd.errors.EmptyDataError(f"No rows found in {source} upload")
+
+    logger.debug("Loaded %s: %s tests found", source, raw_row_count)
+    if 'charStats' not in columns:
+        logger.warning("charStats column not found, using default values")
+
+    df = pd.concat(cleaned_chunks, ignore_index=True)
+    logger.debug("Columns: %s", list(df.columns))
+    
+    # min/max scan the whole column, so only when the line will be shown
+    if len(df) > 0 and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Date Range: %s to %s", df['datetime'].min(), df['datetime'].max())
+
+    logger.debug("Data cleaned: %s valid tests remaining", len(df))
+
+     # Sort by timestamp (chronological order)
+    df = df.sort_values('timestamp').reset_index(drop=True)
+    
+    logger.debug("Data sorted chronologically")
+    logger.debug("Final shape: %s tests x %s features", len(df), len(df.columns))
+    
+    return df
+
+
+def validate_columns(columns) -> None:
+    """
+    Raise InvalidUploadError if the export is missing columns the analysers need.
+    """
     # Verify required columns exist
     required_columns = ['wpm', 'acc']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in required_columns if col not in columns]
     if missing_columns:
-        raise ValueError(f"CSV is missing required columns: {missing_columns}")
+        raise InvalidUploadError(f"CSV is missing required columns: {missing_columns}")
 
     # Check if timestamp column exists, if not try to find alternative
-    if 'timestamp' not in df.columns:
-        raise ValueError("CSV is missing 'timestamp' column. Please export your data from MonkeyType with timestamps included.")
+    if 'timestamp' not in columns:
+        raise InvalidUploadError("CSV is missing 'timestamp' column. Please export your data from MonkeyType with timestamps included.")
+
+
+def sniff_upload(file_obj: BinaryIO, file_format: str = "csv", max_rows: Optional[int] = None) -> dict:
+    """
+    Pre-flight check of an upload before it's hashed and parsed.
+
+    Reads only the header and a small sample (SNIFF_BYTES of decompressed
+    CSV, or the footer/schema of Parquet and Arrow files), so a wrong file
+    is rejected in milliseconds instead of after a full parse. The file is
+    rewound afterwards.
+
+    Args:
+        file_obj: Binary file object positioned at the start of the upload
+        file_format: Output of detect_format
+        max_rows: Row ceiling, checked here when the format records its row
+                  count (Parquet); CSV is checked while parsing
+
+    Returns:
+        Dictionary with 'columns' and 'rows' (None unless known up front)
+
+    Raises:
+        InvalidUploadError: if the sample isn't a readable MonkeyType export
+        UploadTooLargeError: if the file says it has more than max_rows rows
+        UnsupportedFormatError: for formats needing a missing optional package
+    """
+    try:
+        if file_format in ("parquet", "arrow"):
+            return _sniff_arrow(file_obj, file_format, max_rows)
+        return _sniff_csv(_read_sample(file_obj, file_format))
+    finally:
+        file_obj.seek(0)
+
+
+def _read_sample(file_obj: BinaryIO, file_format: str) -> bytes:
+    file_obj.seek(0)
+    if file_format == "csv":
+        return file_obj.read(SNIFF_BYTES)
+
+    zstandard = _import_optional("zstandard", "zstd-compressed CSV") if file_format == "csv.zst" else None
+    try:
+        if zstandard is not None:
+            # closefd=False: the upload is rewound and parsed after this
+            with zstandard.ZstdDecompressor().stream_reader(file_obj, closefd=False) as decompressed:
+                return decompressed.read(SNIFF_BYTES)
+        with gzip.GzipFile(fileobj=file_obj, mode='rb') as decompressed:
+            return decompressed.read(SNIFF_BYTES)
+    except Exception as e:
+        # BadGzipFile / EOFError for gzip, ZstdError for zstd
+        raise InvalidUploadError(f"Couldn't decompress the upload: {e}")
+
+
+def _sniff_csv(sample: bytes) -> dict:
+    if not sample.strip():
+        raise pd.errors.EmptyDataError("Upload is empty")
+    if b"\0" in sample:
+        raise InvalidUploadError("Upload doesn't look like a CSV file")
+
+    # Drop the last line: it may have been cut off mid-row
+    if len(sample) == SNIFF_BYTES and b"\n" in sample:
+        sample = sample[:sample.rindex(b"\n") + 1]
+
+    try:
+        head = pd.read_csv(BytesIO(sample), on_bad_lines='skip',
+                           usecols=lambda column: column in ANALYSIS_COLUMNS)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise InvalidUploadError(f"Upload doesn't look like a CSV file: {e}")
+    validate_columns(list(head.columns))
+
+    # At least one sampled row needs numeric wpm, acc and timestamp values
+    if len(head) > 0:
+        required = head[['wpm', 'acc', 'timestamp']].apply(pd.to_numeric, errors='coerce')
+        if not required.notna().all(axis=1).any():
+            raise InvalidUploadError("wpm, acc and timestamp must be numbers; "
+                                     "is this a MonkeyType results export?")
+
+    return {"columns": list(head.columns), "rows": None}
+
+
+def _sniff_arrow(file_obj: BinaryIO, file_format: str, max_rows: Optional[int]) -> dict:
+    pa = _import_optional("pyarrow", file_format.capitalize())
+    file_obj.seek(0)
+    rows = None
+    try:
+        if file_format == "parquet":
+            parquet_file = importlib.import_module("pyarrow.parquet").ParquetFile(file_obj)
+            columns = parquet_file.schema_arrow.names
+            rows = parquet_file.metadata.num_rows
+        else:
+            try:
+                ipc_file = pa.ipc.open_file(file_obj)
+                columns = ipc_file.schema.names
+            except pa.ArrowInvalid:
+                file_obj.seek(0)
+                columns = pa.ipc.open_stream(file_obj).schema.names
+    except pa.ArrowInvalid as e:
+        raise InvalidUploadError(f"Upload isn't a valid {file_format.capitalize()} file: {e}")
+
+    validate_columns(columns)
+    if max_rows is not None and rows is not None and rows > max_rows:
+        raise UploadTooLargeError(f"Exports can have at most {max_rows:,} tests")
+    return {"columns": list(columns), "rows": rows}
+
+
+def decode_char_stats(char_stats: pd.Series) -> np.ndarray:
+    """
+    Decode "correct;incorrect;extra;missed" strings into an int32 (n, 4) array.
+
+    The whole column is joined into one byte buffer and tokenised with numpy:
+    separators split it into fields and the digits of every field are
+    accumulated in a handful of vectorised passes, so no per-field strings
+    or wide object frames are built. Rows that aren't four plain digit runs
+    (junk, signs, decimals, missing fields) are handed to
+    _decode_char_stats_slow, so malformed values still become 0 as before.
+
+    Args:
+        char_stats: Raw charStats column (NaN counts as "0;0;0;0")
+
+    Returns:
+        int32 array with one row per test and one column per CHAR_STATS_COLUMNS entry
+    """
+    row_count = len(char_stats)
+    decoded = np.zeros((row_count, 4), dtype=np.int32)
+    if row_count == 0:
+        return decoded
+
+    texts = char_stats.fillna('0;0;0;0').astype(str)
+    buffer = np.frombuffer(('\n'.join(texts.tolist()) + '\n').encode(), dtype=np.uint8)
+
+    # Every field ends at a ';' or at the line break closing its row
+    separator_positions = np.flatnonzero((buffer == ord(';')) | (buffer == ord('\n')))
+    ends_row = buffer[separator_positions] == ord('\n')
+    row_end_positions = separator_positions[ends_row]
+    if len(row_end_positions) != row_count:
+        # A value contained a line break, so bytes can't be mapped to rows
+        return _decode_char_stats_slow(texts)
+
+    field_row = np.cumsum(ends_row) - ends_row
+    field_starts = np.concatenate(([0], separator_positions[:-1] + 1))
+    field_lengths = separator_positions - field_starts
+    fields_per_row = np.bincount(field_row, minlength=row_count)
+
+    # A row takes the fast path if it is exactly four fields of at most 9 digits
+    digits = buffer - np.uint8(ord('0'))  # non-digits wrap around to values > 9
+    is_other = digits > 9
+    is_other[separator_positions] = False
+    other_rows = np.searchsorted(row_end_positions, np.flatnonzero(is_other))
+    fast_rows = (
+        (fields_per_row == 4)
+        & (np.bincount(other_rows, minlength=row_count) == 0)
+        & (np.bincount(field_row[field_lengths > MAX_CHAR_STATS_DIGITS], minlength=row_count) == 0)
+    )
+
+    # Horner's rule, one digit position at a time across all fields
+    field_values = np.zeros(len(separator_positions), dtype=np.int64)
+    active = np.flatnonzero(field_lengths > 0)
+    for offset in range(MAX_CHAR_STATS_DIGITS):
+        active = active[field_lengths[active] > offset]
+        if len(active) == 0:
+            break
+        field_values[active] = field_values[active] * 10 + digits[field_starts[active] + offset]
+
+    if fast_rows.all():
+        return field_values.reshape(row_count, 4).astype(np.int32)
+
+    # Scatter the fields of fast rows into their (row, position) slots
+    first_field = np.cumsum(fields_per_row) - fields_per_row
+    field_position = np.arange(len(separator_positions)) - first_field[field_row]
+    fast_fields = fast_rows[field_row]
+    decoded[field_row[fast_fields], field_position[fast_fields]] = field_values[fast_fields]
+    decoded[~fast_rows] = _decode_char_stats_slow(texts[~fast_rows])
+
+    return decoded
+
+
+def _decode_char_stats_slow(texts: pd.Series) -> np.ndarray:
+    """
+    Reference charStats decoding through pandas string splitting.
+
+    Any field that isn't a number becomes 0; extra fields are ignored and
+    values beyond the int32 range are clipped.
+    """
+    decoded = np.zeros((len(texts), 4), dtype=np.int32)
+    if len(texts) == 0:
+        return decoded
+
+    # Split the string by ';' and convert to integers with error handling
+    char_stats_split = texts.str.split(';', expand=True)
+
+    # Convert to numeric, coercing errors to NaN, then fill with 0
+    # (if every value is malformed the split may have fewer than 4 columns)
+    for position in range(4):
+        if position in char_stats_split.columns:
+            values = pd.to_numeric(char_stats_split[position], errors='coerce').fillna(0).astype(np.int64)
+            decoded[:, position] = np.clip(values, np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+    return decoded
+
+
+def _valid_tests(df: pd.DataFrame) -> pd.Series:
+    """
+    Rows with wpm/acc/timestamp present, WPM > 0 and accuracy in 0-100.
+
+    One mask, so the frame is only filtered (copied) once; NaN fails every comparison.
+    """
+    return (df['wpm'] > 0) & (df['acc'] >= 0) & (df['acc'] <= 100) & df['timestamp'].notna()
+
+
+def tests_digest(timestamps, wpm, acc) -> int:
+    """
+    Order-independent 64-bit digest of a set of tests.
+
+    Each test (timestamp, WPM and accuracy to 2 decimals) is hashed on its
+    own and the hashes are summed mod 2**64, so digests of chunks (or of an
+    old history and the tests added to it) combine with add_digests.
+    """
+    with np.errstate(over='ignore'):
+        h = np.asarray(timestamps, dtype=np.int64).astype(np.uint64)
+        h ^= np.rint(np.asarray(wpm, dtype=np.float64) * 100).astype(np.int64).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        h ^= np.rint(np.asarray(acc, dtype=np.float64) * 100).astype(np.int64).astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+        # splitmix64 finaliser
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+        return int(h.sum(dtype=np.uint64))
+
+
+def add_digests(a: int, b: int) -> int:
+    return (a + b) % 2 ** 64
+
+
+def clean_chunk(df: pd.DataFrame, min_timestamp: Optional[int] = None,
+                skipped: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Convert and clean one chunk of raw export rows.
+
+    Every step here is row-local, so chunks can be cleaned independently
+    and concatenated afterwards without changing the result. Invalid rows
+    are dropped first so the derived columns are only built for tests we keep.
+
+    With min_timestamp, valid tests at or before it are dropped too; their
+    count and digest are added to `skipped` when given (see parse_csv_stream).
+    """
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Drop already-analysed tests before doing any per-row work on them
+    if min_timestamp is not None:
+        newer = df['timestamp'] > min_timestamp
+        if skipped is not None:
+            old = df[~newer]
+            old = old[_valid_tests(old)]
+            skipped["count"] += len(old)
+            skipped["digest"] = add_digests(skipped["digest"], tests_digest(old['timestamp'], old['wpm'], old['acc']))
+        df = df[newer]
+
+    #Clean and validate data 
+    
+    # Remove rows with missing critical values and invalid tests (WPM = 0 or
+    # negative, accuracy out of range)
+    df = df[_valid_tests(df)].copy()
+
+    # Timestamps may have been read as floats next to a bad cell
+    df['timestamp'] = df['timestamp'].astype(np.int64)
 
     #Convert timestamp from milliseconds to datetime 
     # unit = 'ms' tells pandas the timestamp is in milliseconds 
 
     df['datetime'] = pd.to_datetime(df['timestamp'], unit = 'ms')
-    print(f" Date Range: {df['datetime'].min()} to {df['datetime'].max()}")
 
     #Extract hour, day of week, month from datetime 
-    df['hour'] = df['datetime'].dt.hour              # 0-23 (for "when you type best")
-    df['day_of_week'] = df['datetime'].dt.day_name() # "Monday", "Tuesday", etc.
-    df['day_of_week_num'] = df['datetime'].dt.dayofweek  # 0=Monday, 6=Sunday
-    df['month'] = df['datetime'].dt.to_period('M')   # "2024-12", "2025-01", etc.
-    df['date'] = df['datetime'].dt.date              # Just the date (no time)
-    df['year'] = df['datetime'].dt.year              # 2024, 2025, etc.
-    
-    print(f"Date range: {df['datetime'].min()} to {df['datetime'].max()}")
+    # Calendar fields are stored as small integer codes (see the storage plan at the top)
+    weekday = df['datetime'].dt.dayofweek.to_numpy(dtype=np.uint8)
+    year = df['datetime'].dt.year
+
+    df['hour'] = df['datetime'].dt.hour.astype(np.uint8)  # 0-23 (for "when you type best")
+    df['day_of_week'] = pd.Categorical.from_codes(weekday, categories=WEEKDAY_NAMES)  # "Monday", "Tuesday", etc.
+    df['day_of_week_num'] = weekday                        # 0=Monday, 6=Sunday
+    # Months since 1970-01, the same numbering as pandas' monthly Period ordinals
+    df['month'] = ((year - 1970) * 12 + df['datetime'].dt.month - 1).astype(np.int32)
+    df['date'] = (df['timestamp'] // 86_400_000).astype(np.int32)  # Day of the test (UTC, like datetime)
+    df['year'] = year.astype(np.int16)                     # 2024, 2025, etc.
 
 
     # Parse charStats string into separate columns
@@ -50,56 +580,42 @@ def parse_csv(file_contents: bytes) ->pd.DataFrame:
 
     # Check if charStats column exists
     if 'charStats' in df.columns:
-        # Fill NaN/None values with "0;0;0;0" before splitting
-        df['charStats'] = df['charStats'].fillna('0;0;0;0')
-        
-        # Split the string by ';' and convert to integers with error handling
-        char_stats_split = df['charStats'].str.split(';', expand=True)
-        
-        # Convert to numeric, coercing errors to NaN, then fill with 0
-        df['chars_correct'] = pd.to_numeric(char_stats_split[0], errors='coerce').fillna(0).astype(int)
-        df['chars_incorrect'] = pd.to_numeric(char_stats_split[1], errors='coerce').fillna(0).astype(int)
-        df['chars_extra'] = pd.to_numeric(char_stats_split[2], errors='coerce').fillna(0).astype(int)
-        df['chars_missed'] = pd.to_numeric(char_stats_split[3], errors='coerce').fillna(0).astype(int)
+        char_stats = decode_char_stats(df.pop('charStats'))
+        for position, col in enumerate(CHAR_STATS_COLUMNS):
+            df[col] = char_stats[:, position]
         
         # Calculate total characters typed (useful for analysis)
         df['total_chars'] = df['chars_correct'] + df['chars_incorrect'] + df['chars_extra']
-        
-        print(f" Parsed Char stats")
     else:
         # If charStats doesn't exist, create default columns with 0
-        print(f" Warning: charStats column not found, using default values")
-        df['chars_correct'] = 0
-        df['chars_incorrect'] = 0
-        df['chars_extra'] = 0
-        df['chars_missed'] = 0
-        df['total_chars'] = 0
+        for col in CHAR_STATS_COLUMNS:
+            df[col] = np.int32(0)
+        df['total_chars'] = np.int32(0)
 
+    # Older or hand-edited exports may lack the optional columns entirely;
+    # treat them like an export whose cells are all empty
+    for col in OPTIONAL_NUMERIC_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
 
-    #Clean and validate data 
-    # Note: total_chars already calculated above
-    
-    # Step 5: Clean and validate data
-    
-    # Remove rows with missing critical values
-    df = df.dropna(subset=['wpm', 'acc', 'timestamp'])
-    
-    # Remove invalid tests (WPM = 0 or negative, accuracy out of range)
-    df = df[df['wpm'] > 0]
-    df = df[(df['acc'] >= 0) & (df['acc'] <= 100)]
-    
     # Fill missing consistency values with 0 (some tests might not have this)
     df['consistency'] = df['consistency'].fillna(0)
     
     # Fill missing restartCount with 0
-    df['restartCount'] = df['restartCount'].fillna(0).astype(int)
-    
-    print(f"Data cleaned: {len(df)} valid tests remaining")
+    df['restartCount'] = df['restartCount'].fillna(0).astype(np.int32)
 
-     # Sort by timestamp (chronological order)
-    df = df.sort_values('timestamp').reset_index(drop=True)
-    
-    print(f"Data sorted chronologically")
-    print(f"Final shape: {len(df)} tests x {len(df.columns)} features\n")
-    
-    return df 
\ No newline at end of file
+    return df
+
+
+def month_labels(ordinals) -> list:
+    """
+    Format month codes from the 'month' column as "YYYY-MM" strings.
+    """
+    return [str(period) for period in pd.PeriodIndex.from_ordinals(np.asarray(ordinals, dtype=np.int64), freq='M')]
+
+
+def day_labels(ordinals) -> list:
+    """
+    Format day codes from the 'date' column as "YYYY-MM-DD" strings.
+    """
+    return np.asarray(ordinals, dtype=np.int64).astype('datetime64[D]').astype(str).tolist()
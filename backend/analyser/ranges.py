@@ -0,0 +1,72 @@
+import datetime as dt
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Earliest and latest year accepted for a year filter
+MIN_YEAR = 1970
+MAX_YEAR = 9999
+
+
+def day_start_ms(day: dt.date) -> int:
+    """
+    Midnight (UTC, like the parser's datetime column) of a day, in epoch ms.
+    """
+    return (day - dt.date(1970, 1, 1)).days * 86_400_000
+
+
+def year_range(year: int) -> tuple:
+    """
+    [start, end) timestamps (ms) of one calendar year.
+    """
+    return day_start_ms(dt.date(year, 1, 1)), day_start_ms(dt.date(year + 1, 1, 1))
+
+
+def date_range(start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> tuple:
+    """
+    [start, end) timestamps (ms) covering the days start..end inclusive.
+
+    Either side may be None for an open-ended range.
+    """
+    return (day_start_ms(start) if start is not None else None,
+            day_start_ms(end + dt.timedelta(days=1)) if end is not None else None)
+
+
+def range_rows(timestamps: np.ndarray, time_range: tuple) -> slice:
+    """
+    Rows of chronologically sorted timestamps that fall in [start, end).
+
+    Two binary searches, so slicing never scans the frame.
+    """
+    start, end = time_range
+    first = int(np.searchsorted(timestamps, start, side='left')) if start is not None else 0
+    last = int(np.searchsorted(timestamps, end, side='left')) if end is not None else len(timestamps)
+    return slice(first, max(first, last))
+
+
+def year_rows(timestamps: np.ndarray) -> dict:
+    """
+    Rows of each calendar year present in chronologically sorted timestamps.
+
+    Returns:
+        Dictionary of year -> slice, in year order (years without tests are skipped)
+    """
+    if len(timestamps) == 0:
+        return {}
+
+    first_year = pd.Timestamp(int(timestamps[0]), unit='ms').year
+    last_year = pd.Timestamp(int(timestamps[-1]), unit='ms').year
+    boundaries = [year_range(year)[0] for year in range(first_year, last_year + 2)]
+    offsets = np.searchsorted(timestamps, boundaries, side='left')
+
+    return {year: slice(int(offsets[i]), int(offsets[i + 1]))
+            for i, year in enumerate(range(first_year, last_year + 1))
+            if offsets[i + 1] > offsets[i]}
+
+
+def slice_tests(df: pd.DataFrame, rows: slice) -> pd.DataFrame:
+    """
+    The tests in `rows`, renumbered from 0 like a freshly parsed export.
+    """
+    return df.iloc[rows].reset_index(drop=True)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# A gap longer than this (in minutes) between two tests starts a new session
+DEFAULT_SESSION_GAP_MINUTES = 30
+
+# Accepted range for a per-request gap (a gap of a day or more would merge
+# whole days of practice into one session)
+MIN_SESSION_GAP_MINUTES = 1
+MAX_SESSION_GAP_MINUTES = 24 * 60
+
+
+def session_starts(timestamps: np.ndarray, gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES) -> np.ndarray:
+    """
+    Row offsets where each session starts in chronologically sorted timestamps.
+
+    A "session" is a group of tests taken close together in time.
+    If there's a gap longer than `gap_minutes`, we consider it a new session.
+    """
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64)
+    gaps = np.diff(timestamps) / (1000 * 60)  # Convert ms to minutes
+    return np.concatenate(([0], np.flatnonzero(gaps > gap_minutes) + 1))
+
+
+def build_session_index(df: pd.DataFrame, gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES) -> dict:
+    """
+    Split tests into sessions once and reduce each session to a few numbers.
+
+    Sessions are contiguous row ranges of the sorted frame, so session i is
+    rows starts[i] .. ends[i] and every per-session value below is one
+    array lookup; modules never need to regroup the frame.
+
+    Args:
+        df: Tests sorted by timestamp (parser output) with 'timestamp' and
+            'wpm'; 'acc' and 'restartCount' are summarised when present
+        gap_minutes: Longest break that still continues a session
+
+    Returns:
+        Dictionary with:
+        - 'gap_minutes': the threshold used
+        - 'starts' / 'ends': row offsets of each session (end exclusive, int64)
+        - 'lengths': tests per session (int32)
+        - 'start_timestamp' / 'end_timestamp': first and last test (ms)
+        - 'wpm_sum' / 'wpm_max': per-session speed reductions
+        - 'peak_position': 1-based position of the fastest test (first on ties)
+        - 'acc_sum': per-session accuracy sum, if acc is present
+        - 'restart_sum': restarts per session, if restartCount is present
+    """
+    timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+    wpm = df['wpm'].to_numpy(dtype=np.float64)
+
+    starts = session_starts(timestamps, gap_minutes).astype(np.int64)
+    ends = np.append(starts[1:], len(timestamps))[:len(starts)].astype(np.int64)
+    lengths = ends - starts
+
+    index = {
+        "gap_minutes": gap_minutes,
+        "starts": starts,
+        "ends": ends,
+        "lengths": lengths.astype(np.int32),
+        "start_timestamp": timestamps[starts],
+        "end_timestamp": timestamps[ends - 1],
+    }
+    if len(starts) == 0:
+        index.update({
+            "wpm_sum": np.zeros(0),
+            "wpm_max": np.zeros(0),
+            "peak_position": np.zeros(0, dtype=np.int32),
+        })
+        if 'acc' in df.columns:
+            index["acc_sum"] = np.zeros(0)
+        if 'restartCount' in df.columns:
+            index["restart_sum"] = np.zeros(0, dtype=np.int64)
+        return index
+
+    positions = np.arange(len(wpm)) - np.repeat(starts, lengths) + 1
+    wpm_max = np.maximum.reduceat(wpm, starts)
+
+    # Smallest position whose WPM equals its session's max
+    peak_candidates = np.where(wpm == np.repeat(wpm_max, lengths), positions, len(wpm) + 1)
+
+    index.update({
+        "wpm_sum": np.add.reduceat(wpm, starts),
+        "wpm_max": wpm_max,
+        "peak_position": np.minimum.reduceat(peak_candidates, starts).astype(np.int32),
+    })
+    if 'acc' in df.columns:
+        index["acc_sum"] = np.add.reduceat(df['acc'].to_numpy(dtype=np.float64), starts)
+    if 'restartCount' in df.columns:
+        index["restart_sum"] = np.add.reduceat(df['restartCount'].to_numpy(dtype=np.int64), starts)
+    return index
+
+
+def session_rows(index: dict, session: int) -> slice:
+    """
+    Rows of the indexed frame that belong to one session.
+    """
+    return slice(int(index["starts"][session]), int(index["ends"][session]))
+
+
+def test_positions(index: dict) -> np.ndarray:
+    """
+    1-based position of every test within its session (1st test, 2nd test, etc.).
+    """
+    return np.arange(int(index["lengths"].sum())) - np.repeat(index["starts"], index["lengths"]) + 1
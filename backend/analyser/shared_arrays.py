@@ -0,0 +1,74 @@
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+
+class SharedArray:
+    """
+    Picklable handle to a NumPy array in shared memory.
+
+    The process that creates the array owns the block and unlinks it when
+    done; worker processes attach to it by name. Pickling the handle only
+    sends the name, shape and dtype, so a process pool can work on a large
+    array without copying it into every job.
+    """
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+        self._block: Optional[shared_memory.SharedMemory] = None
+
+    @classmethod
+    def empty(cls, shape: tuple, dtype) -> "SharedArray":
+        """
+        Allocate an (uninitialised) shared array; fill it through .array.
+        """
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        shared = cls(block.name, shape, dtype)
+        shared._block = block
+        return shared
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        The array in the owning process.
+        """
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._block.buf)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Attach to the block and call func(array, *args, **kwargs) on it.
+
+        The array is only valid during the call, so func must not keep
+        references to it (results computed from it are fine).
+        """
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            array = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+            return func(array, *args, **kwargs)
+        finally:
+            array = None
+            try:
+                block.close()
+            except BufferError:
+                # Still referenced (e.g. from a traceback); unmapped when collected
+                pass
+
+    def unlink(self) -> None:
+        """
+        Free the block (owning process only). Workers still attached keep
+        their mapping until they close it.
+        """
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __getstate__(self):
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["shape"], state["dtype"])
@@ -1,7 +1,10 @@
+import logging
 import pandas as pd 
 import numpy as np 
 
-def compute_timing(df: pd.DataFrame) -> dict: 
+logger = logging.getLogger(__name__)
+
+def compute_timing(aggs: dict) -> dict: 
     """
     Analyze WHEN the user types best.
     
@@ -13,63 +16,55 @@ def compute_timing(df: pd.DataFrame) -> dict:
     - Hourly performance breakdown for charts
     
     Args:
-        df: Cleaned DataFrame with 'hour', 'day_of_week', 'wpm' columns
+        aggs: Shared reductions from aggregates.compute_aggregates
         
     Returns:
         Dictionary with timing insights
     """
-
-    hourly_stats = df.groupby('hour').agg(
-        {
-            'wpm': ['mean', 'count'],
-            'acc': 'mean'
-        }
-    ).reset_index()
-
-     # Flatten column names (pandas creates multi-level columns)
-    hourly_stats.columns = ['hour', 'avg_wpm', 'test_count', 'avg_acc']
+    # Hourly moments are a slice of the aggregates' time cube; keep hours with tests
+    hourly = aggs['hourly']
+    active_hours = np.flatnonzero(hourly['count'])
+    hourly_stats = pd.DataFrame({
+        'hour': active_hours,
+        'avg_wpm': hourly['wpm_sum'][active_hours] / hourly['count'][active_hours],
+        'test_count': hourly['count'][active_hours],
+        'avg_acc': hourly['acc_sum'][active_hours] / hourly['count'][active_hours]
+    })
     
     # Only consider hours with at least 5 tests (to avoid outliers)
     significant_hours = hourly_stats[hourly_stats['test_count'] >= 5]
     
+    # Fallback if insufficient data: rank every hour that has tests
+    if len(significant_hours) == 0:
+        significant_hours = hourly_stats
+
     # Find best and worst hours
-    if len(significant_hours) > 0:
-        best_hour_row = significant_hours.loc[significant_hours['avg_wpm'].idxmax()]
-        worst_hour_row = significant_hours.loc[significant_hours['avg_wpm'].idxmin()]
-        most_active_hour_row = hourly_stats.loc[hourly_stats['test_count'].idxmax()]
-        
-        best_hour = int(best_hour_row['hour'])
-        best_hour_wpm = round(float(best_hour_row['avg_wpm']), 1)
-        
-        worst_hour = int(worst_hour_row['hour'])
-        worst_hour_wpm = round(float(worst_hour_row['avg_wpm']), 1)
-        
-        most_active_hour = int(most_active_hour_row['hour'])
-        most_active_count = int(most_active_hour_row['test_count'])
-    else:
-        # Fallback if insufficient data
-        best_hour = int(df.groupby('hour')['wpm'].mean().idxmax())
-        best_hour_wpm = round(float(df.groupby('hour')['wpm'].mean().max()), 1)
-        worst_hour = int(df.groupby('hour')['wpm'].mean().idxmin())
-        worst_hour_wpm = round(float(df.groupby('hour')['wpm'].mean().min()), 1)
-        most_active_hour = int(df.groupby('hour').size().idxmax())
-        most_active_count = int(df.groupby('hour').size().max())
+    best_hour_row = significant_hours.loc[significant_hours['avg_wpm'].idxmax()]
+    worst_hour_row = significant_hours.loc[significant_hours['avg_wpm'].idxmin()]
+    most_active_hour_row = hourly_stats.loc[hourly_stats['test_count'].idxmax()]
+    
+    best_hour = int(best_hour_row['hour'])
+    best_hour_wpm = round(float(best_hour_row['avg_wpm']), 1)
+    
+    worst_hour = int(worst_hour_row['hour'])
+    worst_hour_wpm = round(float(worst_hour_row['avg_wpm']), 1)
+    
+    most_active_hour = int(most_active_hour_row['hour'])
+    most_active_count = int(most_active_hour_row['test_count'])
 
     #Day of the week analysis 
      # Define day order (Monday = 0, Sunday = 6)
     day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     
-    # Group by day of week
-    daily_stats = df.groupby('day_of_week').agg({
-        'wpm': ['mean', 'count'],
-        'acc': 'mean'
-    }).reset_index()
-    
-    daily_stats.columns = ['day', 'avg_wpm', 'test_count', 'avg_acc']
-    
-    # Sort by day order
-    daily_stats['day'] = pd.Categorical(daily_stats['day'], categories=day_order, ordered=True)
-    daily_stats = daily_stats.sort_values('day')
+    # The weekday slice is indexed by day_of_week_num, so it's already in day order
+    daily = aggs['daily']
+    active_days = np.flatnonzero(daily['count'])
+    daily_stats = pd.DataFrame({
+        'day': [day_order[day] for day in active_days],
+        'avg_wpm': daily['wpm_sum'][active_days] / daily['count'][active_days],
+        'test_count': daily['count'][active_days],
+        'avg_acc': daily['acc_sum'][active_days] / daily['count'][active_days]
+    })
     
     # Find best day
     best_day_row = daily_stats.loc[daily_stats['avg_wpm'].idxmax()]
@@ -86,11 +81,8 @@ def compute_timing(df: pd.DataFrame) -> dict:
     # Early Bird: 5 AM - 11 AM (hours 5-10)
     # Night Owl: 10 PM - 2 AM (hours 22-23, 0-1)
     
-    early_bird_hours = df[df['hour'].between(5, 10)]
-    night_owl_hours = df[(df['hour'] >= 22) | (df['hour'] <= 1)]
-    
-    early_bird_count = len(early_bird_hours)
-    night_owl_count = len(night_owl_hours)
+    early_bird_count = int(hourly['count'][5:11].sum())
+    night_owl_count = int(hourly['count'][[22, 23, 0, 1]].sum())
     
     # Determine classification
     if night_owl_count > early_bird_count * 1.5:
@@ -145,13 +137,13 @@ def compute_timing(df: pd.DataFrame) -> dict:
         else:
             return f"{hour - 12} PM"
 
-    print(f"\n🕐 Analyzing your typing schedule...")
-    print(f"   Best hour: {format_hour(best_hour)} ({best_hour_wpm} WPM)")
-    print(f"   Worst hour: {format_hour(worst_hour)} ({worst_hour_wpm} WPM)")
-    print(f"   Most active: {format_hour(most_active_hour)} ({most_active_count} tests)")
-    print(f"   Best day: {best_day} ({best_day_wpm} WPM)")
-    print(f"   Time preference: {time_preference}")
-    print(f"   Timing analysis complete!")
+    logger.debug("🕐 Analyzing your typing schedule...")
+    logger.debug("Best hour: %s (%s WPM)", format_hour(best_hour), best_hour_wpm)
+    logger.debug("Worst hour: %s (%s WPM)", format_hour(worst_hour), worst_hour_wpm)
+    logger.debug("Most active: %s (%s tests)", format_hour(most_active_hour), most_active_count)
+    logger.debug("Best day: %s (%s WPM)", best_day, best_day_wpm)
+    logger.debug("Time preference: %s", time_preference)
+    logger.debug("Timing analysis complete!")
     
     return {
         "bestHour": best_hour,
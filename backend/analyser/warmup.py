@@ -1,54 +1,157 @@
+import logging
 import pandas as pd
 import numpy as np
+from typing import Optional
 
-def compute_warmup(df: pd.DataFrame) -> dict:
+from .sessions import DEFAULT_SESSION_GAP_MINUTES, build_session_index, session_starts, test_positions
+
+logger = logging.getLogger(__name__)
+
+# Positions shown on the warmup curve (1st test .. 10th test of a session)
+WARMUP_CURVE_LENGTH = 10
+
+
+def _sorted_by_time(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Analyze how typing speed improves during "warmup" at the start of sessions.
-    
-    A "session" is defined as tests taken within 30 minutes of each other.
-    We track:
-    - Cold start WPM (first test of session)
-    - Warmed up WPM (after 3+ tests)
-    - How many tests until peak performance
-    - Warmup curve for visualization
-    
+    The parser already sorts by timestamp, so this only sorts frames that
+    come from elsewhere.
+    """
+    timestamps = df['timestamp'].to_numpy()
+    if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+        return df.sort_values('timestamp', kind='stable')
+    return df
+
+
+def split_open_session(df: pd.DataFrame, gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES):
+    """
+    Split chronologically sorted tests into finished sessions and the last one.
+
+    The last session may still continue with tests from a later export, so
+    incremental analysis keeps its rows and only summarises the rest.
+
+    Returns:
+        (closed_df, open_df)
+    """
+    starts = session_starts(df['timestamp'].to_numpy(), gap_minutes)
+    last_start = int(starts[-1]) if len(starts) > 0 else 0
+    return df.iloc[:last_start], df.iloc[last_start:]
+
+
+def summarize_sessions(df: pd.DataFrame, gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES,
+                       index: Optional[dict] = None) -> dict:
+    """
+    Reduce tests to the session accumulators behind the warmup slide.
+
+    Every field is a sum, count, maximum or histogram, so summaries of
+    disjoint sets of whole sessions can be combined with merge_session_summaries.
+
     Args:
-        df: Cleaned DataFrame with 'timestamp', 'wpm' columns
-        
+        df: Tests with 'timestamp' and 'wpm' columns
+        gap_minutes: Session gap, used when no index is given
+        index: Session index of df from sessions.build_session_index
+               (built here if missing)
+
     Returns:
-        Dictionary with warmup insights
+        Dictionary of session accumulators
     """
-    
-    print("\n🔥 Analyzing your warmup patterns...")
-    
-
-    # A "session" is a group of tests taken close together in time
-    # If there's a 30+ minute gap, we consider it a new session
-    
-    df = df.sort_values('timestamp').reset_index(drop=True)
-    
-    # Calculate time difference between consecutive tests (in minutes)
-    df['time_diff_minutes'] = df['timestamp'].diff() / (1000 * 60)  # Convert ms to minutes
-    
-    # Mark the start of a new session (gap > 30 minutes OR first test)
-    # cumsum() creates a session ID that increments at each gap
-    df['session_id'] = (df['time_diff_minutes'] > 30).fillna(True).cumsum()
-    
-    # Number each test within its session (1st test, 2nd test, etc.)
-    df['test_in_session'] = df.groupby('session_id').cumcount() + 1
-    
-    print(f"   Identified {df['session_id'].nunique()} typing sessions")
-    
-    
+    if len(df) == 0:
+        return {
+            "session_count": 0,
+            "session_length_sum": 0,
+            "longest_session": 0,
+            "cold_sum": 0.0,
+            "cold_count": 0,
+            "warm_sum": 0.0,
+            "warm_count": 0,
+            "peak_position_counts": np.zeros(1, dtype=np.int64),
+            "curve_sum": np.zeros(WARMUP_CURVE_LENGTH),
+            "curve_count": np.zeros(WARMUP_CURVE_LENGTH, dtype=np.int64)
+        }
+
+    if index is None:
+        df = _sorted_by_time(df)
+        index = build_session_index(df, gap_minutes)
+
+    wpm = df['wpm'].to_numpy(dtype=np.float64)
+    session_lengths = index["lengths"]
+    test_in_session = test_positions(index)
+
     # Get all "cold start" tests (first test of each session)
-    cold_start_tests = df[df['test_in_session'] == 1]
-    cold_start_wpm = cold_start_tests['wpm'].mean()
-    
+    cold_start_wpm = wpm[index["starts"]]
+
     # Get "warmed up" tests (4th test onwards in a session)
-    warmed_up_tests = df[df['test_in_session'] >= 4]
-    
-    if len(warmed_up_tests) > 0:
-        warmed_up_wpm = warmed_up_tests['wpm'].mean()
+    warmed_up_wpm = wpm[test_in_session >= 4]
+
+    # For each session of 3+ tests, which test number had the highest WPM
+    peak_test_positions = index["peak_position"][session_lengths >= 3]
+
+    if len(peak_test_positions) > 0:
+        peak_position_counts = np.bincount(peak_test_positions).astype(np.int64)
+    else:
+        peak_position_counts = np.zeros(1, dtype=np.int64)
+
+    # WPM sum and count for each test position (1st, 2nd, 3rd, etc.)
+    in_curve = test_in_session <= WARMUP_CURVE_LENGTH
+    curve_index = test_in_session[in_curve] - 1
+    curve_sum = np.bincount(curve_index, weights=wpm[in_curve], minlength=WARMUP_CURVE_LENGTH)
+    curve_count = np.bincount(curve_index, minlength=WARMUP_CURVE_LENGTH)
+
+    return {
+        "session_count": len(session_lengths),
+        "session_length_sum": int(session_lengths.sum()),
+        "longest_session": int(session_lengths.max()),
+        "cold_sum": cold_start_wpm.sum(),
+        "cold_count": len(cold_start_wpm),
+        "warm_sum": warmed_up_wpm.sum(),
+        "warm_count": len(warmed_up_wpm),
+        "peak_position_counts": peak_position_counts,
+        "curve_sum": curve_sum.astype(np.float64),
+        "curve_count": curve_count.astype(np.int64)
+    }
+
+
+def merge_session_summaries(a: dict, b: dict) -> dict:
+    """
+    Combine the summaries of two disjoint sets of whole sessions.
+    """
+    peak_length = max(len(a["peak_position_counts"]), len(b["peak_position_counts"]))
+    peak_position_counts = np.zeros(peak_length, dtype=np.int64)
+    peak_position_counts[:len(a["peak_position_counts"])] += a["peak_position_counts"]
+    peak_position_counts[:len(b["peak_position_counts"])] += b["peak_position_counts"]
+
+    merged = {key: a[key] + b[key] for key in a if key not in ("longest_session", "peak_position_counts")}
+    merged["longest_session"] = max(a["longest_session"], b["longest_session"])
+    merged["peak_position_counts"] = peak_position_counts
+    return merged
+
+
+def _median_from_counts(counts: np.ndarray) -> float:
+    """
+    Median of the values 0..len(counts)-1 given how often each occurs.
+    """
+    total = counts.sum()
+    cumulative = np.cumsum(counts)
+    lower = np.searchsorted(cumulative, (total - 1) // 2, side='right')
+    upper = np.searchsorted(cumulative, total // 2, side='right')
+    return (lower + upper) / 2
+
+
+def describe_warmup(summary: dict) -> dict:
+    """
+    Turn session accumulators into the warmup slide data.
+
+    Args:
+        summary: Output of summarize_sessions (or a merge of several)
+
+    Returns:
+        Dictionary with warmup insights
+    """
+    logger.debug("Identified %s typing sessions", summary['session_count'])
+
+    cold_start_wpm = summary["cold_sum"] / summary["cold_count"]
+
+    if summary["warm_count"] > 0:
+        warmed_up_wpm = summary["warm_sum"] / summary["warm_count"]
         warmup_improvement = warmed_up_wpm - cold_start_wpm
         warmup_improvement_pct = (warmup_improvement / cold_start_wpm) * 100
     else:
@@ -56,61 +159,42 @@ def compute_warmup(df: pd.DataFrame) -> dict:
         warmed_up_wpm = cold_start_wpm
         warmup_improvement = 0
         warmup_improvement_pct = 0
-    
-    print(f"   Cold start: {cold_start_wpm:.1f} WPM")
-    print(f"   Warmed up: {warmed_up_wpm:.1f} WPM (Δ {warmup_improvement:+.1f} WPM)")
-    
-    # For each session, find which test number had the highest WPM
-    sessions_with_multiple_tests = df[df.groupby('session_id')['session_id'].transform('size') >= 3]
-    
-    if len(sessions_with_multiple_tests) > 0:
-        # Find the test number with max WPM in each session
-        peak_test_positions = sessions_with_multiple_tests.groupby('session_id').apply(
-            lambda session: session.loc[session['wpm'].idxmax(), 'test_in_session']
-        )
-        
-        avg_tests_until_peak = peak_test_positions.mean()
-        median_tests_until_peak = peak_test_positions.median()
+
+    logger.debug("Cold start: %.1f WPM", cold_start_wpm)
+    logger.debug("Warmed up: %.1f WPM (Δ %+.1f WPM)", warmed_up_wpm, warmup_improvement)
+
+    peak_position_counts = summary["peak_position_counts"]
+    peak_sessions = peak_position_counts.sum()
+
+    if peak_sessions > 0:
+        avg_tests_until_peak = (peak_position_counts * np.arange(len(peak_position_counts))).sum() / peak_sessions
+        median_tests_until_peak = _median_from_counts(peak_position_counts)
     else:
         avg_tests_until_peak = 1
         median_tests_until_peak = 1
-    
-    print(f"   Average tests until peak: {avg_tests_until_peak:.1f}")
-    
-
-    
-    # Calculate average WPM for each test position (1st, 2nd, 3rd, etc.)
-    warmup_curve = df[df['test_in_session'] <= 10].groupby('test_in_session').agg({
-        'wpm': ['mean', 'count']
-    }).reset_index()
-    
-    warmup_curve.columns = ['testNumber', 'avgWpm', 'sampleSize']
-    
+
+    logger.debug("Average tests until peak: %.1f", avg_tests_until_peak)
+
     # Convert to list of dictionaries for JSON response
     warmup_curve_data = []
-    for _, row in warmup_curve.iterrows():
+    for position in range(WARMUP_CURVE_LENGTH):
+        sample_size = int(summary["curve_count"][position])
+        if sample_size == 0:
+            continue
         warmup_curve_data.append({
-            "testNumber": int(row['testNumber']),
-            "avgWpm": round(float(row['avgWpm']), 1),
-            "sampleSize": int(row['sampleSize'])
+            "testNumber": position + 1,
+            "avgWpm": round(float(summary["curve_sum"][position] / sample_size), 1),
+            "sampleSize": sample_size
         })
-    
-    
-    session_stats = df.groupby('session_id').agg({
-        'wpm': ['mean', 'count'],
-        'test_in_session': 'max'  # Number of tests in session
-    }).reset_index()
-    
-    session_stats.columns = ['session_id', 'avg_wpm', 'test_count', 'max_test_num']
-    
-    avg_tests_per_session = session_stats['test_count'].mean()
-    longest_session = int(session_stats['test_count'].max())
-    
-    print(f"   Average session length: {avg_tests_per_session:.1f} tests")
-    print(f"   Longest session: {longest_session} tests")
-    
-
-    
+
+    avg_tests_per_session = summary["session_length_sum"] / summary["session_count"]
+    longest_session = summary["longest_session"]
+
+    logger.debug("Average session length: %.1f tests", avg_tests_per_session)
+    logger.debug("Longest session: %s tests", longest_session)
+
+
+
     # Determine if user benefits from warmup
     if warmup_improvement > 5:
         warmup_quality = "Strong Warmup Effect"
@@ -124,28 +208,53 @@ def compute_warmup(df: pd.DataFrame) -> dict:
     else:
         warmup_quality = "Consistent Performer"
         warmup_message = "You maintain consistent speed throughout sessions"
-    
-    print(f"   {warmup_quality}")
-    print(f"   Warmup analysis complete!")
-    
+
+    logger.debug("%s", warmup_quality)
+    logger.debug("Warmup analysis complete!")
+
     # RETURN ALL WARMUP DATA
-    
-    
+
+
     return {
         "coldStartWpm": round(float(cold_start_wpm), 1),
         "warmedUpWpm": round(float(warmed_up_wpm), 1),
         "warmupImprovement": round(float(warmup_improvement), 1),
         "warmupImprovementPercent": round(float(warmup_improvement_pct), 1),
-        
+
         "testsUntilPeak": round(float(avg_tests_until_peak), 1),
         "medianTestsUntilPeak": int(median_tests_until_peak),
-        
-        "totalSessions": int(df['session_id'].nunique()),
+
+        "totalSessions": int(summary["session_count"]),
         "avgTestsPerSession": round(float(avg_tests_per_session), 1),
         "longestSession": longest_session,
-        
+
         "warmupQuality": warmup_quality,
         "warmupMessage": warmup_message,
-        
+
         "warmupCurve": warmup_curve_data
-    }
\ No newline at end of file
+    }
+
+
+def compute_warmup(df: pd.DataFrame, session_index: Optional[dict] = None) -> dict:
+    """
+    Analyze how typing speed improves during "warmup" at the start of sessions.
+
+    A "session" is defined as tests taken within 30 minutes of each other
+    (or the gap the session index was built with).
+    We track:
+    - Cold start WPM (first test of session)
+    - Warmed up WPM (after 3+ tests)
+    - How many tests until peak performance
+    - Warmup curve for visualization
+
+    Args:
+        df: Cleaned DataFrame with 'timestamp', 'wpm' columns
+        session_index: Precomputed sessions.build_session_index(df), if any
+
+    Returns:
+        Dictionary with warmup insights
+    """
+
+    logger.debug("🔥 Analyzing your warmup patterns...")
+
+    return describe_warmup(summarize_sessions(df, index=session_index))
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# backend/batch.py
+#
+# Analyses many exports at once (e.g. a whole typing club at year end),
+# spreading them across a process pool. Used by /api/analyze/batch and
+# runnable on its own:
+#
+# Usage:
+#   python batch.py exports.zip                        # NDJSON on stdout
+#   python batch.py alice.csv bob.csv.gz --output results.ndjson --workers 8
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from analyser import parser, sessions
+from pipeline import analyze_export
+import serialization
+
+# Most exports a single batch may contain (BATCH_MAX_FILES overrides)
+DEFAULT_MAX_FILES = 500
+
+# Most megabytes of exports a batch may hold once unzipped (BATCH_MAX_MB overrides)
+DEFAULT_MAX_BATCH_MB = 500
+
+# Bytes read at a time from uploads and zip members
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class BatchTooLarge(ValueError):
+    """Raised when a batch holds more exports, or more bytes, than allowed."""
+
+
+def max_batch_files() -> int:
+    return int(os.getenv("BATCH_MAX_FILES", str(DEFAULT_MAX_FILES)))
+
+
+def max_batch_bytes() -> Optional[int]:
+    """
+    Most bytes a batch may hold, both as uploaded and once unzipped
+    (BATCH_MAX_MB, default 500; 0 disables).
+    """
+    return int(float(os.getenv("BATCH_MAX_MB", str(DEFAULT_MAX_BATCH_MB))) * 1024 * 1024) or None
+
+
+def _megabytes(n_bytes: int) -> str:
+    return f"{n_bytes / (1024 * 1024):g} MB"
+
+
+def read_bounded(file_obj, max_bytes: Optional[int], name: str) -> bytes:
+    """
+    Read a file to the end in chunks, stopping with BatchTooLarge as soon as
+    it passes max_bytes (so a lying header or a zip bomb is never fully
+    inflated into memory).
+    """
+    chunks = []
+    total = 0
+    while True:
+        chunk = file_obj.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise BatchTooLarge(f"{name} is larger than {_megabytes(max_bytes)}")
+        chunks.append(chunk)
+
+
+def batch_workers() -> int:
+    """
+    Worker processes for batch analysis (BATCH_WORKERS, default: CPU count).
+    """
+    workers = os.getenv("BATCH_WORKERS")
+    return int(workers) if workers else (os.cpu_count() or 1)
+
+
+def _limit_worker_threads():
+    # Exports are the unit of parallelism; keep each worker's BLAS/OpenMP
+    # pools (KMeans) to one thread so N workers don't fight over N cores
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(1)
+
+
+def create_batch_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max_workers or batch_workers(), initializer=_limit_worker_threads)
+
+
+def _is_export_name(name: str) -> bool:
+    try:
+        parser.detect_format(name)
+        return True
+    except parser.UnsupportedFormatError:
+        return False
+
+
+def expand_upload(filename: str, data: bytes, max_export_bytes: Optional[int] = None) -> Iterator[tuple]:
+    """
+    Turn one uploaded file into (name, bytes) exports.
+
+    Zip archives yield every supported export inside them (folders and
+    macOS metadata are skipped); anything else is a single export.
+
+    Raises:
+        BatchTooLarge: if an export is over max_export_bytes (zip members
+                       are checked against their declared size first, then
+                       while they're decompressed)
+    """
+    if not filename.lower().endswith(".zip"):
+        if max_export_bytes and len(data) > max_export_bytes:
+            raise BatchTooLarge(f"{filename} is larger than {_megabytes(max_export_bytes)}")
+        yield filename, data
+        return
+
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        for member in archive.infolist():
+            path = PurePosixPath(member.filename)
+            if member.is_dir() or "__MACOSX" in path.parts or path.name.startswith("."):
+                continue
+            if not _is_export_name(path.name):
+                continue
+            if max_export_bytes and member.file_size > max_export_bytes:
+                raise BatchTooLarge(f"{member.filename} is larger than {_megabytes(max_export_bytes)}")
+            with archive.open(member) as member_file:
+                yield member.filename, read_bounded(member_file, max_export_bytes, member.filename)
+
+
+def collect_exports(uploads: Iterable[tuple], max_files: Optional[int] = None,
+                    max_export_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None) -> list:
+    """
+    Expand (filename, bytes) uploads into the list of exports to analyse.
+
+    Args:
+        max_files: Most exports (default: max_batch_files())
+        max_export_bytes: Most bytes per export (None: no limit)
+        max_total_bytes: Most bytes of all exports together (None: no limit)
+
+    Raises:
+        BatchTooLarge: if there are more than max_files exports, or an
+                       export or the whole batch is over its byte limit
+    """
+    max_files = max_files or max_batch_files()
+    exports = []
+    total_bytes = 0
+    for filename, data in uploads:
+        for name, export_data in expand_upload(filename, data, max_export_bytes):
+            exports.append((name, export_data))
+            total_bytes += len(export_data)
+            if len(exports) > max_files:
+                raise BatchTooLarge(f"A batch can hold at most {max_files} exports")
+            if max_total_bytes and total_bytes > max_total_bytes:
+                raise BatchTooLarge(f"A batch can hold at most {_megabytes(max_total_bytes)} of exports")
+    return exports
+
+
+def user_label(name: str) -> str:
+    """
+    Name a result after its export: "club/alice.csv.gz" -> "alice".
+    """
+    base = PurePosixPath(name).name
+    for suffix in parser.UPLOAD_FORMATS:
+        if base.lower().endswith(suffix):
+            return base[:-len(suffix)]
+    return base
+
+
+def analyze_member(name: str, data: bytes,
+                   session_gap_minutes: float = sessions.DEFAULT_SESSION_GAP_MINUTES,
+                   max_rows: Optional[int] = None) -> dict:
+    """
+    Analyse one export of a batch; never raises, so one bad file can't
+    sink the rest of the batch.
+
+    Top-level so process pools can pickle it. Exports with more than
+    max_rows tests fail like any other bad file.
+
+    Returns:
+        NDJSON record with 'file', 'user', 'status', 'seconds' and either
+        'data' (the WrappedData response) or 'error'
+    """
+    record = {"file": name, "user": user_label(name)}
+    start = time.perf_counter()
+    try:
+        record["data"] = analyze_export(BytesIO(data), parser.detect_format(name), session_gap_minutes, max_rows)
+        record["status"] = "success"
+    except (parser.UnsupportedFormatError, parser.InvalidUploadError, parser.UploadTooLargeError) as e:
+        record.update(status="error", error=str(e))
+    except pd.errors.EmptyDataError:
+        record.update(status="error", error="CSV file is empty or invalid.")
+    except Exception as e:
+        record.update(status="error", error=f"Error processing file: {str(e)}")
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def summary_record(total: int, failed: int, seconds: float) -> dict:
+    """
+    Last NDJSON line of a batch.
+    """
+    return {"status": "complete", "total": total, "succeeded": total - failed, "failed": failed,
+            "seconds": round(seconds, 3)}
+
+
+def dumps_record(record: dict) -> bytes:
+    # Same encoding as the single-export endpoint
+    return serialization.dumps(record) + b"\n"
+
+
+def run_batch(exports: list, executor, session_gap_minutes: float = sessions.DEFAULT_SESSION_GAP_MINUTES,
+              max_in_flight: Optional[int] = None, max_rows: Optional[int] = None) -> Iterator[dict]:
+    """
+    Analyse exports on an executor and yield records as each one finishes.
+
+    At most `max_in_flight` exports are queued at once (default: twice
+    batch_workers()) so a large batch isn't copied into the workers all at once.
+    max_rows caps the tests per export (see analyze_member).
+
+    Yields:
+        One record per export (see analyze_member), then summary_record
+    """
+    max_in_flight = max_in_flight or 2 * batch_workers()
+    pending = set()
+    remaining = iter(exports)
+    failed = 0
+    start = time.perf_counter()
+
+    def submit_next():
+        for name, data in remaining:
+            pending.add(executor.submit(analyze_member, name, data, session_gap_minutes, max_rows))
+            if len(pending) >= max_in_flight:
+                return
+
+    submit_next()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            record = future.result()
+            failed += record["status"] != "success"
+            yield record
+        submit_next()
+
+    yield summary_record(len(exports), failed, time.perf_counter() - start)
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="Analyse many MonkeyType exports into NDJSON")
+    arg_parser.add_argument("inputs", nargs="+", type=Path, help="Exports (.csv, .csv.gz, .parquet, ...) or zip archives")
+    arg_parser.add_argument("--output", type=Path, help="NDJSON file to write (default: stdout)")
+    arg_parser.add_argument("--workers", type=int, help="Worker processes (default: BATCH_WORKERS or CPU count)")
+    arg_parser.add_argument("--session-gap-minutes", type=float, default=sessions.DEFAULT_SESSION_GAP_MINUTES)
+    arg_parser.add_argument("--max-files", type=int, help="Most exports to accept (default: BATCH_MAX_FILES or 500)")
+    arg_parser.add_argument("--max-mb", type=float, help="Most megabytes per export, after unzipping (default: no limit)")
+    arg_parser.add_argument("--max-rows", type=int, help="Most tests per export (default: no limit)")
+    args = arg_parser.parse_args()
+
+    max_export_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb else None
+    try:
+        exports = collect_exports(((path.name, path.read_bytes()) for path in args.inputs), args.max_files,
+                                  max_export_bytes)
+    except (BatchTooLarge, zipfile.BadZipFile) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    workers = args.workers or batch_workers()
+    output = args.output.open("wb") if args.output else sys.stdout.buffer
+    failed = 0
+    try:
+        with create_batch_executor(workers) as executor:
+            for record in run_batch(exports, executor, args.session_gap_minutes, 2 * workers, args.max_rows):
+                output.write(dumps_record(record))
+                output.flush()
+                if record["status"] == "error":
+                    failed += 1
+                    print(f"{record['file']}: {record['error']}", file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
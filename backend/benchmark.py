@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# backend/benchmark.py
+#
+# Times the parser and every analyser module on synthetic exports.
+#
+# Usage:
+#   python benchmark.py                                  # 1k, 10k, 100k tests, table only
+#   python benchmark.py --sizes 1k,1m --repeat 3 --output bench.json
+#   python benchmark.py --compare bench-main.json        # ratios vs an earlier run
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from analyser import parser, aggregates, core_stats, clustering, journey, timing, warmup, comparisons
+from synthetic_export import export_csv_bytes
+
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _read_status_kb(field: str):
+    """
+    Read a memory field (VmRSS, VmHWM) from /proc/self/status, in KB.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset the kernel's peak RSS counter (Linux only); False if unsupported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb():
+    peak = _read_status_kb('VmHWM')
+    if peak is None:
+        # ru_maxrss is KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak //= 1024
+    return peak
+
+
+def measure(func, repeat: int = 1, trace_allocations: bool = True) -> dict:
+    """
+    Time a benchmark stage and record its memory use.
+
+    Timed runs happen without tracemalloc so its overhead doesn't skew the
+    wall times; allocations come from one extra traced run.
+
+    Returns:
+        Dictionary with wall times, peak RSS and allocation figures
+    """
+    wall_times = []
+    peak_rss_resettable = _reset_peak_rss()
+    rss_before = _read_status_kb('VmRSS')
+
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            wall_times.append(time.perf_counter() - start)
+
+    peak_rss = _peak_rss_kb()
+    stats = {
+        "wallSeconds": round(min(wall_times), 6),
+        "wallSecondsMedian": round(statistics.median(wall_times), 6),
+        "runs": len(wall_times),
+        "peakRssMb": round(peak_rss / 1024, 1) if peak_rss is not None else None,
+        "rssGrowthMb": round((peak_rss - rss_before) / 1024, 1) if peak_rss_resettable and rss_before else None,
+    }
+
+    if trace_allocations:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        stats["allocPeakMb"] = round(peak / 2**20, 2)
+        stats["allocRetainedMb"] = round(retained / 2**20, 2)
+
+    return stats
+
+
+def benchmark_size(n_tests: int, repeat: int, seed: int, trace_allocations: bool) -> list:
+    """
+    Run every stage on one synthetic export size.
+    """
+    data = export_csv_bytes(n_tests, seed)
+    print(f"\n{n_tests:,} tests ({len(data) / 2**20:.1f} MB of CSV)")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = parser.parse_csv(data)
+        aggs = aggregates.compute_aggregates(df)
+
+    stages = {
+        "parser.parse_csv": lambda: parser.parse_csv(data),
+        "aggregates.compute_aggregates": lambda: aggregates.compute_aggregates(df),
+        "core_stats.compute_core_stats": lambda: core_stats.compute_core_stats(aggs),
+        "clustering.compute_personas": lambda: clustering.compute_personas(df),
+        "clustering.compute_personas[adaptive]": lambda: clustering.compute_personas(df, n_clusters="adaptive"),
+        "journey.compute_journey": lambda: journey.compute_journey(aggs),
+        "timing.compute_timing": lambda: timing.compute_timing(aggs),
+        "warmup.compute_warmup": lambda: warmup.compute_warmup(df),
+        "comparisons.compute_comparisons": lambda: comparisons.compute_comparisons(aggs),
+    }
+
+    results = []
+    for stage, func in stages.items():
+        stats = measure(func, repeat, trace_allocations)
+        results.append({"tests": n_tests, "stage": stage, **stats})
+
+        alloc = f"  alloc peak {stats['allocPeakMb']:8.1f} MB" if trace_allocations else ""
+        print(f"  {stage:40s} {stats['wallSeconds'] * 1000:10.1f} ms  peak RSS {stats['peakRssMb']:8.1f} MB{alloc}")
+
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "createdAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, fail_above=None) -> bool:
+    """
+    Print wall time ratios against an earlier run.
+
+    Returns:
+        False if any stage got slower than `fail_above` times the baseline
+    """
+    baseline_times = {(row["tests"], row["stage"]): row["wallSeconds"] for row in baseline["results"]}
+    ok = True
+
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'} (ratio > 1 = slower)")
+    for row in current["results"]:
+        before = baseline_times.get((row["tests"], row["stage"]))
+        if not before:
+            continue
+        ratio = row["wallSeconds"] / before
+        flag = ""
+        if fail_above is not None and ratio > fail_above:
+            flag = "  <-- regression"
+            ok = False
+        print(f"  {row['tests']:>9,}  {row['stage']:40s} {ratio:6.2f}x{flag}")
+
+    return ok
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the parser and analyser modules")
+    arg_parser.add_argument("--sizes", default="1k,10k,100k", help="Comma-separated test counts, e.g. 1k,10k,1m")
+    arg_parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage (best is reported)")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic exports")
+    arg_parser.add_argument("--output", type=Path, help="JSON file to save the results to (default: table only)")
+    arg_parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc pass")
+    arg_parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    arg_parser.add_argument("--fail-above", type=float, help="Exit non-zero if a stage is this many times slower")
+    args = arg_parser.parse_args()
+
+    results = []
+    for size in args.sizes.split(','):
+        results.extend(benchmark_size(parse_size(size), args.repeat, args.seed, not args.no_alloc))
+
+    report = {"environment": environment(), "seed": args.seed, "repeat": args.repeat, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        if not compare(report, json.loads(args.compare.read_text()), args.fail_above):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+# Bytes read per step when hashing an upload
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_upload(file_obj: BinaryIO, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    SHA-256 of an upload, read chunk by chunk so the body is never fully in memory.
+
+    The file is rewound afterwards so the parser can read it from the start.
+
+    Args:
+        file_obj: Binary file object (e.g. UploadFile.file)
+        chunk_size: Bytes read per step
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def user_state_key(user_id: str) -> str:
+    """
+    Storage key for a user's incremental analysis state.
+
+    Hashed so arbitrary user ids are safe to use as file names.
+    """
+    return hashlib.sha256(f"user-state:{user_id}".encode()).hexdigest()
+
+
+def cache_key(upload_digest: str, **params) -> str:
+    """
+    Build a cache key from the upload hash plus any request parameters
+    that change the analysis output.
+    """
+    if not params:
+        return upload_digest
+    suffix = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return hashlib.sha256(f"{upload_digest}?{suffix}".encode()).hexdigest()
+
+
+class DiskCacheBackend:
+    """
+    On-disk cache tier: one file per key under `directory`.
+
+    Entries older than `ttl_seconds` (by file mtime) count as missing.
+    Any object with the same get/set methods can be plugged in instead.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: Optional[float] = None, suffix: str = ".json"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if self.ttl_seconds is not None and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        # Write to a temp file and rename so readers never see a partial entry
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(value)
+        os.replace(tmp_path, path)
+
+
+class ResultCache:
+    """
+    Two-tier byte cache, used for finished /api/analyze responses and for
+    per-user incremental analysis state.
+
+    - Local tier: in-process LRU bounded by entry count and total bytes,
+      with a per-entry TTL
+    - Optional second tier (e.g. DiskCacheBackend) consulted on a local
+      miss; hits there are promoted into the local tier
+
+    Values are opaque bytes (encoded JSON bodies keyed by cache_key(),
+    pickled states keyed by user_state_key()).
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = 3600, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        value = self.backend.get(key) if self.backend is not None else None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.backend_hits += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                "hits": self.hits,
+                "backendHits": self.backend_hits,
+                "misses": self.misses,
+                "hitRate": round((self.hits + self.backend_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl_seconds,
+                "backend": type(self.backend).__name__ if self.backend is not None else None
+            }
+
+    # Callers must hold self._lock
+
+    def _store(self, key: str, value: bytes) -> None:
+        if self.max_entries <= 0 or len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+
+        # Evict least recently used entries until both limits hold
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+def create_result_cache() -> ResultCache:
+    """
+    Build the app's result cache from environment variables.
+
+    RESULT_CACHE_MAX_ENTRIES  Local LRU entry limit (default 128, 0 disables the local tier)
+    RESULT_CACHE_MAX_MB       Local LRU size limit in MB (default 64)
+    RESULT_CACHE_TTL_SECONDS  Entry lifetime in both tiers (default 3600)
+    RESULT_CACHE_DIR          Directory for the on-disk tier (disabled if unset)
+    """
+    ttl_seconds = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    cache_dir = os.getenv("RESULT_CACHE_DIR")
+
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "128")),
+        max_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+        ttl_seconds=ttl_seconds,
+        backend=DiskCacheBackend(cache_dir, ttl_seconds=ttl_seconds) if cache_dir else None
+    )
+
+
+def create_state_store() -> ResultCache:
+    """
+    Build the store for per-user incremental analysis state.
+
+    USER_STATE_MAX_ENTRIES  States kept in memory (default 256)
+    USER_STATE_TTL_SECONDS  How long a state is kept (default 30 days)
+    USER_STATE_DIR          Directory for persisting states (memory only if unset)
+    """
+    ttl_seconds = float(os.getenv("USER_STATE_TTL_SECONDS", str(30 * 24 * 3600)))
+    state_dir = os.getenv("USER_STATE_DIR")
+
+    return ResultCache(
+        max_entries=int(os.getenv("USER_STATE_MAX_ENTRIES", "256")),
+        max_bytes=256 * 1024 * 1024,
+        ttl_seconds=ttl_seconds,
+        backend=DiskCacheBackend(state_dir, ttl_seconds=ttl_seconds, suffix=".pkl") if state_dir else None
+    )
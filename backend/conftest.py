@@ -0,0 +1,19 @@
+# backend/conftest.py
+#
+# Shared pytest setup: the backend modules import each other by bare name
+# (e.g. `from analyser import parser`), so put this directory on the path.
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+    return TestClient(main.app)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# backend/import_report.py
+#
+# Breaks down how long importing the app takes, package by package, using
+# Python's -X importtime in a fresh interpreter (so nothing is cached).
+#
+# Usage:
+#   python import_report.py                          # import main
+#   python import_report.py --module analyser.clustering --top 10
+#   python import_report.py --fail-above 1.5         # exit 1 if slower (CI)
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+
+def measure_imports(module: str) -> list:
+    """
+    Import `module` in a fresh interpreter and collect -X importtime output.
+
+    Returns:
+        List of (module name, self microseconds, cumulative microseconds)
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=Path(__file__).parent)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def package_breakdown(timings: list) -> dict:
+    """
+    Sum the self time of every module by top-level package, in seconds.
+    """
+    packages = defaultdict(int)
+    for name, self_us, _ in timings:
+        packages[name.split(".")[0]] += self_us
+    return {package: round(total / 1e6, 4) for package, total in
+            sorted(packages.items(), key=lambda item: item[1], reverse=True)}
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="Report the import-time breakdown of the backend")
+    arg_parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    arg_parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    arg_parser.add_argument("--json", action="store_true", help="Print the breakdown as JSON")
+    arg_parser.add_argument("--fail-above", type=float, help="Exit non-zero if the total exceeds this many seconds")
+    args = arg_parser.parse_args()
+
+    timings = measure_imports(args.module)
+    packages = package_breakdown(timings)
+    total = round(sum(packages.values()), 4)
+
+    if args.json:
+        print(json.dumps({"module": args.module, "totalSeconds": total, "packages": packages}, indent=2))
+    else:
+        print(f"Importing {args.module}: {total:.2f}s across {len(timings)} modules\n")
+        for package, seconds in list(packages.items())[:args.top]:
+            print(f"  {package:28s} {seconds * 1000:9.1f} ms  {seconds / total:6.1%}")
+
+    if args.fail_above is not None and total > args.fail_above:
+        print(f"\nImport time {total:.2f}s is above {args.fail_above:.2f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
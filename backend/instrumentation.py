@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Resident set size of this process, or None where /proc isn't available.
+    """
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def timed_call(func, *args):
+    """
+    Run func(*args) and measure it where it runs (thread or pool process).
+
+    Top-level so process pools can pickle it.
+
+    Returns:
+        (result, duration in seconds, RSS delta in bytes or None)
+    """
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    rss_after = current_rss_bytes()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return result, duration, rss_delta
+
+
+class StageMetrics:
+    """
+    Process-wide aggregates of every recorded span, rendered in the
+    Prometheus text exposition format.
+
+    - analyze_stage_duration_seconds   histogram per stage
+    - analyze_stage_rows_total         rows processed per stage
+    - analyze_stage_rss_delta_bytes    summary of RSS change per stage
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage: str, duration: float, rows: Optional[int] = None,
+                rss_delta: Optional[int] = None) -> None:
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {
+                    "bucket_counts": [0] * len(self.buckets),
+                    "count": 0,
+                    "duration_sum": 0.0,
+                    "rows": 0,
+                    "rss_delta_sum": 0,
+                    "rss_delta_count": 0
+                }
+
+            for index, upper_bound in enumerate(self.buckets):
+                if duration <= upper_bound:
+                    stats["bucket_counts"][index] += 1
+            stats["count"] += 1
+            stats["duration_sum"] += duration
+            if rows is not None:
+                stats["rows"] += rows
+            if rss_delta is not None:
+                stats["rss_delta_sum"] += rss_delta
+                stats["rss_delta_count"] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            stages = {stage: dict(stats, bucket_counts=list(stats["bucket_counts"]))
+                      for stage, stats in sorted(self._stages.items())}
+
+        lines = [
+            "# HELP analyze_stage_duration_seconds Time spent in each stage of the analyze pipeline",
+            "# TYPE analyze_stage_duration_seconds histogram",
+        ]
+        for stage, stats in stages.items():
+            for upper_bound, bucket_count in zip(self.buckets, stats["bucket_counts"]):
+                lines.append(f'analyze_stage_duration_seconds_bucket{{stage="{stage}",le="{upper_bound}"}} {bucket_count}')
+            lines.append(f'analyze_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'analyze_stage_duration_seconds_sum{{stage="{stage}"}} {stats["duration_sum"]:.6f}')
+            lines.append(f'analyze_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        lines += [
+            "# HELP analyze_stage_rows_total Rows processed by each stage",
+            "# TYPE analyze_stage_rows_total counter",
+        ]
+        lines += [f'analyze_stage_rows_total{{stage="{stage}"}} {stats["rows"]}' for stage, stats in stages.items()]
+
+        lines += [
+            "# HELP analyze_stage_rss_delta_bytes Change in process RSS across each stage",
+            "# TYPE analyze_stage_rss_delta_bytes summary",
+        ]
+        for stage, stats in stages.items():
+            lines.append(f'analyze_stage_rss_delta_bytes_sum{{stage="{stage}"}} {stats["rss_delta_sum"]}')
+            lines.append(f'analyze_stage_rss_delta_bytes_count{{stage="{stage}"}} {stats["rss_delta_count"]}')
+
+        rss = current_rss_bytes()
+        if rss is not None:
+            lines += [
+                "# HELP process_resident_memory_bytes Resident memory size in bytes",
+                "# TYPE process_resident_memory_bytes gauge",
+                f"process_resident_memory_bytes {rss}",
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every request in this process
+stage_metrics = StageMetrics()
+
+# Wall time of each startup phase ("import", "prewarm") in seconds, exported
+# on /metrics so cold-start regressions show up next to request latency
+startup_timings = {}
+
+
+def gauge_lines(name: str, help_text: str, value, metric_type: str = "gauge") -> list:
+    """
+    Exposition lines for a single unlabelled metric.
+    """
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+
+
+class Trace:
+    """
+    Spans recorded while handling one request.
+
+    Every span is also fed into `metrics` (the process-wide StageMetrics),
+    and the request's spans can be returned as a Server-Timing header.
+    """
+
+    def __init__(self, metrics: StageMetrics = stage_metrics):
+        self.metrics = metrics
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, rows: Optional[int] = None):
+        """
+        Time a block of code.
+
+        Yields a dict; set its "rows" key inside the block when the row
+        count is only known once the stage has run.
+        """
+        record = {"rows": rows}
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            duration = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            self.add(name, duration, record["rows"], rss_delta)
+
+    def add(self, name: str, duration: float, rows: Optional[int] = None, rss_delta: Optional[int] = None) -> None:
+        """
+        Record a span measured elsewhere (e.g. by timed_call in a worker).
+        """
+        with self._lock:
+            self.spans.append({"name": name, "duration": duration, "rows": rows, "rssDelta": rss_delta})
+        self.metrics.observe(name, duration, rows, rss_delta)
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ", ".join(f"{span['name']};dur={span['duration'] * 1000:.1f}" for span in self.spans)
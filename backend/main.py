@@ -1,24 +1,115 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+
+# Start of the app's imports, reported as the "import" startup timing
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, Form, Request, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 import pandas as pd
-from io import BytesIO
+import datetime as dt
+import logging
+import os
 import sys
 from pathlib import Path
+from typing import List, Optional
+import zipfile
+from contextlib import asynccontextmanager
 
 # Add the backend directory to the Python path
 sys.path.append(str(Path(__file__).parent))
 
-from analyser import parser, core_stats, clustering, journey, timing, warmup, comparisons
+from analyser import parser, aggregates, clustering, incremental, ranges, sessions
+from cache import create_result_cache, create_state_store, hash_upload, cache_key, user_state_key
+from pipeline import (AnalysisTimeout, PoolSaturated, create_analysis_pool, build_preview, build_response, build_summary,
+                      PERSONA_CLUSTERS)
+from instrumentation import Trace, gauge_lines, stage_metrics, startup_timings
+import serialization
+import batch
+
+startup_timings["import"] = time.perf_counter() - IMPORT_STARTED
+
+# LOG_LEVEL=DEBUG brings back the per-stage progress output
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# SERVER_TIMING=1 adds a Server-Timing header with the request's stage spans
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# PREWARM=0 skips warming the analysis pool when the server starts
+PREWARM = os.getenv("PREWARM", "1") == "1"
+
+# Upload ceilings for /api/analyze: UPLOAD_MAX_MB (default 100) of upload
+# and UPLOAD_MAX_ROWS (default 1,000,000) tests; 0 disables either
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "100")) * 1024 * 1024)
+UPLOAD_MAX_ROWS = int(os.getenv("UPLOAD_MAX_ROWS", "1000000")) or None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the analysis pool before serving, shut the pools down after.
+
+    Importing the app stays cheap (sklearn is imported lazily, which keeps
+    CLI tools fast); a server pays those imports and the first KMeans fit
+    here instead of on the first upload.
+    """
+    if PREWARM:
+        startup_timings["prewarm"] = await run_in_threadpool(analysis_pool.prewarm)
+    logger.info("Startup: imports %.2fs, pre-warm %.2fs",
+                startup_timings.get("import", 0), startup_timings.get("prewarm", 0))
+
+    yield
+
+    analysis_pool.shutdown()
+    if batch_executor is not None:
+        batch_executor.shutdown(wait=False, cancel_futures=True)
 
 
 # Initialize FastAPI app
 app = FastAPI(
     title="MonkeyType Wrapped API",
     description="Analyze your typing stats and get a Spotify Wrapped-style breakdown",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )  
 
+class UploadSizeLimit:
+    """
+    ASGI middleware that turns away an upload whose Content-Length is over
+    the byte ceiling before any of its body is read or spooled.
+
+    Uploads sent without a Content-Length (chunked) are checked by the
+    endpoint once they're spooled.
+    """
+
+    def __init__(self, app, path: str, max_bytes: Optional[int], message: Optional[str] = None):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+        self.message = message
+
+    async def __call__(self, scope, receive, send):
+        if self.max_bytes and scope["type"] == "http" and scope["path"] == self.path:
+            content_length = dict(scope["headers"]).get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > self.max_bytes:
+                response = JSONResponse(status_code=413, content={"detail": self.message or upload_too_large_message()})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def upload_too_large_message() -> str:
+    return f"Upload is too large; exports can be at most {UPLOAD_MAX_BYTES / (1024 * 1024):g} MB."
+
+
+# Registered before CORS so rejected uploads still get CORS headers
+app.add_middleware(UploadSizeLimit, path="/api/analyze", max_bytes=UPLOAD_MAX_BYTES)
+app.add_middleware(UploadSizeLimit, path="/api/analyze/batch", max_bytes=batch.max_batch_bytes(),
+                   message=f"Batch is too large; a batch can be at most {(batch.max_batch_bytes() or 0) / (1024 * 1024):g} MB.")
+
 # CORS Configuration
 # This allows frontend (running on a different port/domain) to call this API
 app.add_middleware(
@@ -32,8 +123,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],              # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],              # Allow all headers
+    expose_headers=["X-Cache", "Retry-After", "Server-Timing"],  # Let the frontend see cache hits, busy retries and timings
 )
 
+# Finished analyses keyed by upload hash, so re-uploading the same export
+# skips the whole pipeline (configured through RESULT_CACHE_* env vars)
+result_cache = create_result_cache()
+
+# Per-user running state for incremental re-analysis (USER_STATE_* env vars)
+state_store = create_state_store()
+
+# Worker pool for the analyser modules (ANALYSIS_* env vars)
+analysis_pool = create_analysis_pool()
+
+
+# Process pool for /api/analyze/batch (BATCH_* env vars), started on first use
+batch_executor = None
+
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -47,153 +154,573 @@ async def root():
         "docs": "/docs"  # FastAPI auto-generates interactive docs
     }
 
+# Cache sizing endpoint
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters and current size of the result cache.
+    """
+    return result_cache.stats()
+
+# Analysis pool endpoint
+@app.get("/api/analysis/stats")
+async def analysis_stats():
+    """
+    Size and load of the analysis worker pool.
+    """
+    return analysis_pool.stats()
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metrics():
+    """
+    Per-stage durations, rows and memory deltas plus cache and pool
+    gauges, in the Prometheus text format.
+    """
+    cache = result_cache.stats()
+    pool = analysis_pool.stats()
+    lines = [
+        *gauge_lines("analyze_result_cache_hits_total", "Uploads served from the result cache", cache["hits"] + cache["backendHits"], "counter"),
+        *gauge_lines("analyze_result_cache_misses_total", "Uploads that ran the pipeline", cache["misses"], "counter"),
+        *gauge_lines("analyze_result_cache_bytes", "Bytes held by the in-memory result cache", cache["bytes"]),
+        *gauge_lines("analyze_pool_active", "Uploads currently being analysed", pool["active"]),
+        *gauge_lines("analyze_pool_completed_total", "Uploads analysed on the pool", pool["completed"], "counter"),
+        *gauge_lines("analyze_pool_rejected_total", "Uploads rejected with a 503", pool["rejected"], "counter"),
+        *gauge_lines("analyze_pool_timeouts_total", "Uploads that hit the analysis timeout", pool["timeouts"], "counter"),
+    ]
+    if startup_timings:
+        lines += [
+            "# HELP app_startup_seconds Wall time of each startup phase",
+            "# TYPE app_startup_seconds gauge",
+            *(f'app_startup_seconds{{phase="{phase}"}} {seconds:.6f}' for phase, seconds in startup_timings.items()),
+        ]
+    return PlainTextResponse(stage_metrics.render() + "\n".join(lines) + "\n",
+                             media_type="text/plain; version=0.0.4")
+
+def analyze_incrementally(file_obj, file_format: str, state: dict, trace: Trace):
+    """
+    Re-analyse a returning user's export from their stored state.
+
+    Only tests newer than the state's high-water mark are parsed past the
+    text stage and folded in; apart from the persona re-fit (see
+    incremental.update_state) the cost scales with the new tests. The
+    older tests must be exactly the ones the state was built from.
+
+    Returns:
+        (response data, updated state), or None when the upload doesn't
+        continue the stored history (the caller runs a full analysis)
+    """
+    with trace.span("parse") as span:
+        skipped = {}
+        new_tests = parser.parse_upload(file_obj, file_format, min_timestamp=state["high_water_mark"],
+                                        max_rows=UPLOAD_MAX_ROWS, skipped=skipped)
+        span["rows"] = len(new_tests)
+
+    if not incremental.matches_history(state, skipped):
+        logger.info("Upload doesn't continue the stored history (%d of %d tests); rebuilding state",
+                    skipped["count"], state["history"]["count"])
+        return None
+    logger.debug("Incremental analysis: %d new tests", len(new_tests))
+
+    with trace.span("incremental_update", rows=len(new_tests)):
+        state = incremental.update_state(state, new_tests, PERSONA_CLUSTERS)
+        sections = incremental.render_state(state)
+
+    response_data = build_response(sections, sections["aggregates"], state["columns"], state["preview"])
+    response_data["incremental"] = {
+        "mode": "delta",
+        "newTests": len(new_tests),
+        "highWaterMark": state["high_water_mark"]
+    }
+    return response_data, state
+
+
+def prepare_upload(file_obj, file_format: str, trace: Trace,
+                   session_gap_minutes: float = sessions.DEFAULT_SESSION_GAP_MINUTES,
+                   time_range: Optional[tuple] = None):
+    """
+    Parse an upload and collect everything the modules share.
+
+    Args:
+        time_range: Optional [start, end) timestamps (ms) to keep (see resolve_time_range)
+
+    Returns:
+        (cleaned DataFrame, shared aggregates, preview rows, session index)
+    """
+    # Step 3: Stream the upload into the parser chunk by chunk
+    # UploadFile spools large bodies to disk, so we hand the parser the
+    # underlying file instead of reading the whole upload into memory
+    with trace.span("parse") as span:
+        df = parser.parse_upload(file_obj, file_format, max_rows=UPLOAD_MAX_ROWS)
+        span["rows"] = len(df)
+    
+    # Step 4: Validate we have data
+    if df.empty:
+        raise HTTPException(
+            status_code=400,
+            detail="CSV file is empty or invalid."
+        )
+
+    # Keep only the requested dates (a binary search on the sorted timestamps)
+    if time_range is not None:
+        df = ranges.slice_tests(df, ranges.range_rows(df['timestamp'].to_numpy(), time_range))
+        if df.empty:
+            raise HTTPException(
+                status_code=400,
+                detail="No tests in the requested date range."
+            )
+    
+    logger.debug("Received CSV with %d rows", len(df))
+    logger.debug("Columns: %s", list(df.columns))
+
+    return (df, *prepare_frame(df, trace, session_gap_minutes))
+
+
+def prepare_frame(df: pd.DataFrame, trace: Trace,
+                  session_gap_minutes: float = sessions.DEFAULT_SESSION_GAP_MINUTES):
+    """
+    Collect everything the modules share for already parsed tests (a whole
+    export or one year of it).
+
+    Returns:
+        (shared aggregates, preview rows, session index)
+    """
+    # Step 5: Prepare sample data for preview (convert to JSON-compatible format)
+    preview = build_preview(df)
+    
+    # Collect the shared reductions once; every module reads from them
+    with trace.span("aggregates", rows=len(df)):
+        aggs = aggregates.compute_aggregates(df)
+    logger.debug("Computed shared aggregates")
+
+    # Split the (sorted) tests into sessions once for every per-session module
+    with trace.span("sessions", rows=len(df)):
+        session_index = sessions.build_session_index(df, session_gap_minutes)
+
+    return aggs, preview, session_index
+
+
+def timed(response: Response, trace: Trace) -> Response:
+    """
+    Attach the request's spans as a Server-Timing header when enabled.
+    """
+    if SERVER_TIMING and trace.spans:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+def resolve_session_gap(session_gap_minutes: Optional[float]) -> float:
+    """
+    Default and validate the session_gap_minutes form field.
+    """
+    if session_gap_minutes is None:
+        return float(sessions.DEFAULT_SESSION_GAP_MINUTES)
+    if not sessions.MIN_SESSION_GAP_MINUTES <= session_gap_minutes <= sessions.MAX_SESSION_GAP_MINUTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"session_gap_minutes must be between {sessions.MIN_SESSION_GAP_MINUTES} "
+                   f"and {sessions.MAX_SESSION_GAP_MINUTES}."
+        )
+    return session_gap_minutes
+
+
+def resolve_time_range(year: Optional[int], start: Optional[str], end: Optional[str]) -> Optional[tuple]:
+    """
+    Turn the year / start / end form fields into [start, end) timestamps
+    (ms), or None to analyse the whole export.
+    """
+    if year is not None:
+        if start or end:
+            raise HTTPException(status_code=400, detail="Pass either year or start/end, not both.")
+        if not ranges.MIN_YEAR <= year <= ranges.MAX_YEAR:
+            raise HTTPException(status_code=400, detail=f"year must be between {ranges.MIN_YEAR} and {ranges.MAX_YEAR}.")
+        return ranges.year_range(year)
+
+    if not start and not end:
+        return None
+    try:
+        start_day = dt.date.fromisoformat(start) if start else None
+        end_day = dt.date.fromisoformat(end) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be dates like 2025-01-31.")
+    if start_day is not None and end_day is not None and start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+    return ranges.date_range(start_day, end_day)
+
+
 # Main analysis endpoint
 @app.post("/api/analyze")
-async def analyze_typing_data(file: UploadFile = File(...)):
+async def analyze_typing_data(request: Request, file: UploadFile = File(...), user_id: Optional[str] = Form(None),
+                              session_gap_minutes: Optional[float] = Form(None), stream: Optional[str] = Form(None),
+                              year: Optional[int] = Form(None), start: Optional[str] = Form(None),
+                              end: Optional[str] = Form(None), per_year: bool = Form(False)):
     """
-    Main endpoint: receives a MonkeyType CSV file and returns analyzed stats.
+    Main endpoint: receives a MonkeyType export and returns analyzed stats.
     
     How it works:
-    1. Receives CSV file from frontend
-    2. Validates file format
-    3. Parses CSV into a DataFrame (table structure)
-    4. Runs analysis modules (stats, journey, timing, etc.)
-    5. Returns JSON with all computed insights
+    1. Receives the export from frontend: CSV (optionally .gz/.zst
+       compressed), or a Parquet / Arrow IPC conversion of it
+    2. Validates file format, size, header and a sample of rows (see
+       parser.sniff_upload) before doing anything expensive
+    3. Hashes the upload and returns the cached result for a repeat upload
+    4. Streams the CSV into a DataFrame (table structure) in chunks
+    5. Runs analysis modules (stats, journey, timing, etc.) concurrently on a worker pool
+    6. Returns JSON with all computed insights (and caches it)
+
+    With stream=ndjson or stream=sse (or an Accept header asking for
+    application/x-ndjson or text/event-stream) the response is streamed
+    instead: each slide is sent as soon as its module finishes, so the
+    first slides don't wait for clustering. Failures after the stream has
+    started arrive as an "error" event (see stream_response).
+
+    With a user_id, the pipeline also keeps compact running state for that
+    user; their next upload only processes tests newer than the last one seen.
+
+    A year or a start/end date range narrows the analysis to those tests,
+    and per_year adds a "years" object with a full result for every
+    calendar year, e.g. {"2024": {...}, "2025": {...}}. Each slice is two
+    binary searches on the parsed export, so a year only costs its own
+    tests. These requests don't use or update incremental state (which
+    always covers the whole history).
     
     Args:
-        file: CSV file uploaded by user (multipart/form-data)
+        file: Export uploaded by user (multipart/form-data)
+        user_id: Optional stable id enabling incremental re-analysis
+        session_gap_minutes: Optional break (in minutes) that ends a typing
+                             session; defaults to 30
+        stream: Optional 'ndjson' or 'sse' to stream the slides
+        year: Optional calendar year to analyse (UTC, like every date here)
+        start / end: Optional first and last day (YYYY-MM-DD) to analyse;
+                     either may be left open
+        per_year: Also return a result per calendar year
         
     Returns:
         JSON object matching WrappedData schema
     """
     
     # Step 1: Validate file type
-    if not file.filename.endswith('.csv'):
+    try:
+        file_format = parser.detect_format(file.filename)
+    except parser.UnsupportedFormatError:
         raise HTTPException(
             status_code=400,
-            detail="Invalid file format. Please upload a CSV file."
+            detail="Invalid file format. Please upload a CSV (optionally .gz or .zst), Parquet or Arrow file."
         )
     
+    session_gap_minutes = resolve_session_gap(session_gap_minutes)
+    time_range = resolve_time_range(year, start, end)
+    if time_range is not None or per_year:
+        user_id = None
+
+    # Chunked uploads had no Content-Length for UploadSizeLimit to check
+    if UPLOAD_MAX_BYTES and file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=upload_too_large_message())
+
+    trace = Trace()
+    stream_format = resolve_stream_format(stream, request.headers.get("accept", ""))
+    accept_encoding = request.headers.get("accept-encoding", "")
     try:
-        # Step 2: Read file contents into memory
-        contents = await file.read()
-        
-        # Step 3: Parse CSV using pandas directly (temporary - will move to parser.py)
-        # This converts the raw CSV into a pandas DataFrame
-        df = parser.parse_csv(contents)
-        
-        # Step 4: Validate we have data
-        if df.empty:
-            raise HTTPException(
-                status_code=400,
-                detail="CSV file is empty or invalid."
-            )
-        
-        print(f"Received CSV with {len(df)} rows")
-        print(f"Columns: {list(df.columns)}")
-        
-        # Step 5: Prepare sample data for preview (convert to JSON-compatible format)
-        preview_df = df.head(3).copy()
-        
-        # Convert datetime objects to strings
-        if 'datetime' in preview_df.columns:
-            preview_df['datetime'] = preview_df['datetime'].astype(str)
-        if 'date' in preview_df.columns:
-            preview_df['date'] = preview_df['date'].astype(str)
-        if 'month' in preview_df.columns:
-            preview_df['month'] = preview_df['month'].astype(str)
-        
-        # Replace NaN/infinity with None (JSON null)
-        preview_df = preview_df.replace({float('nan'): None, float('inf'): None, float('-inf'): None})
-        
-        # Step 6: Return basic info for now (placeholder response)
-        # Replace this with actual analysis once modules are implemented
-        response_data = {
-            "status": "success",
-            "message": "CSV uploaded successfully! Analysis modules coming soon.",
-            "rowCount": len(df),
-            "columns": list(df.columns),
-            "dateRange": {
-                "start": str(df['datetime'].min()),
-                "end": str(df['datetime'].max())
-            },
-            "preview": preview_df.to_dict(orient="records") if len(preview_df) > 0 else [],
-            "stats": {
-                "avgWpm": float(df['wpm'].mean()),
-                "maxWpm": float(df['wpm'].max()),
-                "avgAccuracy": float(df['acc'].mean()),
-                "totalChars": int(df['total_chars'].sum())
-            }
-        }
-        
-        # Compute core stats using the core_stats module
-        core = core_stats.compute_core_stats(df)
-        print(f" Computed core stats")
-        
-        # Compute personas using the clustering module
-        personas = clustering.compute_personas(df)
-        print(f" Computed personas via ML clustering")
-        
-        # Compute journey stats (progress over time)
-        journey_data = journey.compute_journey(df)
-        print(f" Computed journey/progress stats")
-        
-        # Compute timing analysis (when user types best)
-        timing_data = timing.compute_timing(df)
-        print(f" Computed timing/schedule analysis")
+        # Pre-flight: only the header and a small sample are read, so a
+        # wrong file is rejected before it's hashed or parsed
+        with trace.span("preflight"):
+            await run_in_threadpool(parser.sniff_upload, file.file, file_format, UPLOAD_MAX_ROWS)
 
-        # Compute warmup analysis (performance changes within sessions)
-        warmup_data = warmup.compute_warmup(df)
-        print(f" Computed warmup analysis")
-        
-        # Compute global comparisons (how you rank)
-        comparison_data = comparisons.compute_comparisons(df)
-        print(f" Computed global comparisons")
-        
-        # Update response data to include core stats and personas
-        response_data = {
-            "status": "success",
-            **core,  # Spreads hook, yearInNumbers, etc.
-            "persona": personas,
-            "journey": journey_data,
-            "timing": timing_data, 
-            "warmup": warmup_data,
-            "comparisons": comparison_data,
-            "message": "Analysis complete!",
-            "rowCount": len(df),
-            "columns": list(df.columns),
-            "dateRange": {
-                "start": str(df['datetime'].min()),
-                "end": str(df['datetime'].max())
-            },
-            "preview": preview_df.to_dict(orient="records") if len(preview_df) > 0 else [],
-            "stats": {
-                "avgWpm": float(df['wpm'].mean()),
-                "maxWpm": float(df['wpm'].max()),
-                "avgAccuracy": float(df['acc'].mean()),
-                "totalChars": int(df['total_chars'].sum())
+        # Step 2: Hash the upload chunk by chunk; identical exports share a result
+        with trace.span("read_upload"):
+            # Tracked users get their own entries: a response carries the
+            # user's incremental block, and a hit skips their state update
+            upload_key = cache_key(await run_in_threadpool(hash_upload, file.file),
+                                   format=file_format, user=user_id,
+                                   session_gap=session_gap_minutes, time_range=time_range, per_year=per_year)
+        cached_body = result_cache.get(upload_key)
+        if cached_body is not None:
+            logger.debug("Serving cached analysis")
+            if stream_format is not None:
+                return stream_response(cached_events(cached_body), stream_format, upload_key, trace, cache="HIT")
+            return timed(serialization.compressed_response(cached_body, accept_encoding, {"X-Cache": "HIT"}), trace)
+
+        events = analysis_events(file.file, file_format, user_id, session_gap_minutes, trace, time_range, per_year)
+
+        # Streaming mode: slides go out as their modules finish
+        if stream_format is not None:
+            return stream_response(events, stream_format, upload_key, trace, cache="MISS")
+
+        async for event, data in events:
+            if event == "result":
+                response_data = data
+
+        logger.debug("Processing complete!")
+        with trace.span("serialize"):
+            body = serialization.dumps(response_data)
+        result_cache.set(upload_key, body)
+        with trace.span("compress"):
+            response = serialization.compressed_response(body, accept_encoding, {"X-Cache": "MISS"})
+        return timed(response, trace)
+
+    except Exception as e:
+        raise http_error(e)
+
+
+async def analysis_events(file_obj, file_format: str, user_id: Optional[str], session_gap_minutes: float, trace: Trace,
+                          time_range: Optional[tuple] = None, per_year: bool = False):
+    """
+    Run the analysis for one upload, yielding response pieces as they're ready.
+
+    Yields:
+        (section, partial WrappedData) pairs: 'summary' (counts, date range,
+        preview) once the upload is parsed, then 'core', 'journey',
+        'timing', 'warmup', 'comparisons' and 'persona' as their modules
+        finish, 'years' when per_year is set, 'incremental' for tracked
+        users, and finally
+        ('result', full response data)
+    """
+    # Everything below is CPU-bound and runs off the event loop; the pool
+    # caps how many uploads are analysed at once
+    async with analysis_pool.slot():
+
+        # Returning users: fold only the new tests into their stored state
+        if user_id is not None:
+            state_key = user_state_key(user_id)
+            stored_state = state_store.get(state_key)
+            state = incremental.loads_state(stored_state) if stored_state is not None else None
+            # A different session gap invalidates the stored session accumulators
+            if state is not None and incremental.session_gap(state) == session_gap_minutes:
+                result = await run_in_threadpool(analyze_incrementally, file_obj, file_format, state, trace)
+                if result is not None:
+                    response_data, state = result
+                    state_store.set(state_key, incremental.dumps_state(state))
+                    yield "result", response_data
+                    return
+                # Not the stored history: analyse from scratch and replace the state
+                file_obj.seek(0)
+
+        # Steps 3-5: Parse, preview and shared reductions
+        df, aggs, preview, session_index = await run_in_threadpool(
+            prepare_upload, file_obj, file_format, trace, session_gap_minutes, time_range)
+        yield "summary", {"status": "success", "message": "Analysis complete!", **build_summary(aggs, list(df.columns), preview)}
+
+        # Step 6: Run the analysis modules concurrently on the pool
+        sections = {}
+        async for section, result in analysis_pool.iter_modules(df, aggs, trace, session_index):
+            sections[section] = result
+            if section == "core":
+                yield "core", result  # Spreads hook, yearInNumbers, etc.
+            elif section == "persona_state":
+                # Personas are described from the fitted model, which is also
+                # kept for incremental updates
+                sections["persona"] = clustering.describe_personas(result)
+                yield "persona", {"persona": sections["persona"]}
+            else:
+                yield section, {section: result}
+
+        persona_state = sections.pop("persona_state")
+
+        # Build the response from the module outputs
+        response_data = build_response(sections, aggs, list(df.columns), preview)
+
+        # One result per calendar year, each computed from its own slice
+        if per_year:
+            years = {}
+            for year, rows in ranges.year_rows(df['timestamp'].to_numpy()).items():
+                if rows.stop - rows.start == len(df):
+                    # A single year: that's the result we already have
+                    years[str(year)] = dict(response_data)
+                    continue
+                year_df = ranges.slice_tests(df, rows)
+                year_aggs, year_preview, year_index = await run_in_threadpool(
+                    prepare_frame, year_df, trace, session_gap_minutes)
+                year_sections = await analysis_pool.run_modules(year_df, year_aggs, trace, year_index)
+                year_sections["persona"] = clustering.describe_personas(year_sections.pop("persona_state"))
+                years[str(year)] = build_response(year_sections, year_aggs, list(year_df.columns), year_preview)
+            response_data["years"] = years
+            yield "years", {"years": years}
+
+        # First upload for this user: store the running state for next time
+        if user_id is not None:
+            state = await run_in_threadpool(incremental.build_state, df, aggs, persona_state, preview,
+                                            session_gap_minutes)
+            state_store.set(user_state_key(user_id), incremental.dumps_state(state))
+            response_data["incremental"] = {
+                "mode": "full",
+                "newTests": len(df),
+                "highWaterMark": state["high_water_mark"]
             }
-        }
-        
-        print("Processing complete!")
-        return JSONResponse(content=response_data)
-        
-    except pd.errors.EmptyDataError:
-        raise HTTPException(
+            yield "incremental", {"incremental": response_data["incremental"]}
+
+    yield "result", response_data
+
+
+async def cached_events(cached_body: bytes):
+    yield "result", serialization.loads(cached_body)
+
+
+def resolve_stream_format(stream: Optional[str], accept: str) -> Optional[str]:
+    """
+    Pick the response mode from the `stream` form field or the Accept header.
+
+    Returns:
+        'ndjson', 'sse' or None (one JSON document)
+    """
+    if stream:
+        if stream not in ("ndjson", "sse"):
+            raise HTTPException(status_code=400, detail="stream must be 'ndjson' or 'sse'.")
+        return stream
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    return None
+
+
+def http_error(e: Exception) -> HTTPException:
+    """
+    Map an analysis failure to the HTTP error the API reports for it.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, PoolSaturated):
+        return HTTPException(
+            status_code=503,
+            detail=f"Server is busy, please try again shortly. ({str(e)})",
+            headers={"Retry-After": str(max(1, int(analysis_pool.queue_timeout_seconds)))}
+        )
+    if isinstance(e, AnalysisTimeout):
+        return HTTPException(
+            status_code=504,
+            detail=str(e)
+        )
+    if isinstance(e, parser.InvalidUploadError):
+        return HTTPException(
             status_code=400,
-            detail="CSV file is empty or corrupted."
+            detail=str(e)
         )
-    except Exception as e:
-        # Log the error for debugging
-        print(f" Error during analysis: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing file: {str(e)}"
+    if isinstance(e, parser.UploadTooLargeError):
+        return HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    if isinstance(e, parser.UnsupportedFormatError):
+        # e.g. a Parquet upload without pyarrow installed
+        return HTTPException(
+            status_code=415,
+            detail=str(e)
+        )
+    if isinstance(e, pd.errors.EmptyDataError):
+        return HTTPException(
+            status_code=400,
+            detail="CSV file is empty or corrupted."
         )
 
+    # Log the error (with traceback) for debugging
+    logger.exception("Error during analysis: %s", e)
+    return HTTPException(
+        status_code=500,
+        detail=f"Error processing file: {str(e)}"
+    )
+
+
+def encode_event(stream_format: str, event: str, payload: dict) -> bytes:
+    """
+    One stream event: an NDJSON line with an "event" key, or an SSE frame.
+    """
+    if stream_format == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + serialization.dumps(payload) + b"\n\n"
+    return serialization.dumps({"event": event, **payload}) + b"\n"
+
+
+def stream_response(events, stream_format: str, upload_key: str, trace: Trace, cache: str) -> StreamingResponse:
+    """
+    Stream analysis events as NDJSON lines or server-sent events.
+
+    Every piece is a "partial" event whose data merges into the WrappedData
+    object; a "complete" event ends the stream, or an "error" event (with
+    the HTTP status the plain endpoint would have answered) if it fails:
+
+        {"event": "partial", "section": "summary", "data": {"rowCount": ..., ...}}
+        {"event": "partial", "section": "core", "data": {"hook": ..., "yearInNumbers": ...}}
+        {"event": "partial", "section": "journey", "data": {"journey": ...}}
+        ...
+        {"event": "complete", "cache": "MISS"}
+
+    The finished response is cached like a plain request's.
+    """
+    async def body():
+        sent_partials = False
+        try:
+            async for section, data in events:
+                if section != "result":
+                    sent_partials = True
+                    yield encode_event(stream_format, "partial", {"section": section, "data": data})
+                    continue
+
+                # Nothing was streamed piecewise (cache hit, incremental update)
+                if not sent_partials:
+                    yield encode_event(stream_format, "partial", {"section": "all", "data": data})
+                if cache == "MISS":
+                    with trace.span("serialize"):
+                        result_cache.set(upload_key, serialization.dumps(data))
+
+            complete = {"cache": cache}
+            if SERVER_TIMING and trace.spans:
+                complete["serverTiming"] = trace.server_timing()
+            logger.debug("Processing complete!")
+            yield encode_event(stream_format, "complete", complete)
+        except Exception as e:
+            error = http_error(e)
+            yield encode_event(stream_format, "error", {"status": error.status_code, "detail": error.detail})
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"X-Cache": cache, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Batch analysis endpoint
+@app.post("/api/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...), session_gap_minutes: Optional[float] = Form(None)):
+    """
+    Analyse many exports in one request, e.g. a whole club at year end.
+
+    Accepts several exports in one multipart form and/or zip archives of
+    them. Exports are analysed in parallel on a process pool and each
+    result is streamed back as one NDJSON line as soon as it's ready:
+
+        {"file": "alice.csv", "user": "alice", "status": "success", "seconds": 0.41, "data": {...WrappedData}}
+        {"file": "bob.csv", "user": "bob", "status": "error", "seconds": 0.01, "error": "..."}
+        {"status": "complete", "total": 2, "succeeded": 1, "failed": 1, "seconds": 0.52}
+
+    Lines arrive in completion order, not upload order.
+
+    Each export (a file, or a member of a zip) is held to the same
+    UPLOAD_MAX_MB / UPLOAD_MAX_ROWS ceilings as /api/analyze, and the whole
+    batch to BATCH_MAX_MB.
+    """
+    global batch_executor
+
+    session_gap_minutes = resolve_session_gap(session_gap_minutes)
+    max_batch_bytes = batch.max_batch_bytes()
+
+    try:
+        uploads = []
+        for file in files:
+            name = file.filename or "export.csv"
+            # Zip archives are checked member by member once expanded
+            max_bytes = max_batch_bytes if name.lower().endswith(".zip") else UPLOAD_MAX_BYTES
+            uploads.append((name, await run_in_threadpool(batch.read_bounded, file.file, max_bytes, name)))
+        exports = await run_in_threadpool(batch.collect_exports, uploads, None, UPLOAD_MAX_BYTES, max_batch_bytes)
+    except batch.BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Could not read the zip archive.")
+    if not exports:
+        raise HTTPException(status_code=400, detail="No exports found in the upload.")
+
+    if batch_executor is None:
+        batch_executor = batch.create_batch_executor()
+
+    logger.debug("Batch of %d exports", len(exports))
+    records = batch.run_batch(exports, batch_executor, session_gap_minutes, max_rows=UPLOAD_MAX_ROWS)
+    return StreamingResponse((batch.dumps_record(record) for record in records), media_type="application/x-ndjson")
+
 # Run with: uvicorn main:app --reload --host 0.0.0.0 --port 8000
 if __name__ == "__main__":
     import uvicorn
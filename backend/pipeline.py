@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from analyser import parser, aggregates, sessions, core_stats, clustering, journey, timing, warmup, comparisons
+from analyser.dataset import Dataset
+from analyser.shared_arrays import SharedArray
+from instrumentation import Trace, timed_call
+
+logger = logging.getLogger(__name__)
+
+# Size of the synthetic export run through the pipeline by prewarm()
+PREWARM_TESTS = 500
+
+
+class PoolSaturated(Exception):
+    """Raised when no analysis slot frees up within the queue timeout."""
+
+
+class AnalysisTimeout(Exception):
+    """Raised when a request's modules don't finish within the timeout."""
+
+
+def build_preview(df: pd.DataFrame) -> list:
+    """
+    First rows of the export in a JSON-compatible form.
+
+    Built column by column from the three rows instead of through
+    DataFrame.replace/to_dict, which copy and scan the whole head frame.
+    """
+    head = df.head(3)
+    columns = {}
+    for column in head.columns:
+        # Convert datetime objects to strings
+        if column == 'datetime':
+            values = head[column].astype(str).tolist()
+        elif column == 'date':
+            values = parser.day_labels(head[column])
+        elif column == 'month':
+            values = list(parser.month_labels(head[column]))
+        else:
+            values = head[column].tolist()
+
+        # Replace NaN/infinity with None (JSON null)
+        columns[column] = [None if isinstance(value, float) and not math.isfinite(value) else value
+                           for value in values]
+
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def build_summary(aggs: dict, columns: list, preview: list) -> dict:
+    """
+    Response fields that come straight from the shared aggregates (no
+    module needed), so they can be sent before any slide is ready.
+    """
+    return {
+        "rowCount": aggs['count'],
+        "columns": columns,
+        "dateRange": {
+            "start": str(aggs['datetime_min']),
+            "end": str(aggs['datetime_max'])
+        },
+        "preview": preview,
+        "stats": {
+            "avgWpm": float(aggs['wpm_mean']),
+            "maxWpm": float(aggs['wpm_max']),
+            "avgAccuracy": float(aggs['acc_mean']),
+            "totalChars": int(aggs['chars_total'])
+        }
+    }
+
+
+def build_response(sections: dict, aggs: dict, columns: list, preview: list) -> dict:
+    """
+    Assemble the WrappedData response from the module outputs.
+
+    Args:
+        sections: Module outputs keyed 'core', 'persona', 'journey', 'timing', 'warmup', 'comparisons'
+        aggs: Shared aggregates the modules were computed from
+        columns: Columns of the parsed export
+        preview: Output of build_preview
+    """
+    return {
+        "status": "success",
+        **sections["core"],  # Spreads hook, yearInNumbers, etc.
+        "persona": sections["persona"],
+        "journey": sections["journey"],
+        "timing": sections["timing"], 
+        "warmup": sections["warmup"],
+        "comparisons": sections["comparisons"],
+        "message": "Analysis complete!",
+        **build_summary(aggs, columns, preview)
+    }
+
+
+def parse_persona_clusters(value: str) -> Union[int, str]:
+    """
+    Validate a PERSONA_CLUSTERS value: a number of personas (1 to the
+    number of persona names) or "adaptive" to choose 2-5 per upload within
+    a small time budget.
+    """
+    value = value.strip().lower()
+    if value == "adaptive":
+        return value
+    max_clusters = clustering.ADAPTIVE_K_RANGE[1]
+    if not value.isdigit() or not 1 <= int(value) <= max_clusters:
+        raise ValueError(f"PERSONA_CLUSTERS must be 'adaptive' or a number from 1 to {max_clusters}, got {value!r}")
+    return int(value)
+
+
+# PERSONA_CLUSTERS: how many personas to fit (default 4, or "adaptive");
+# read once here so a bad value stops the server at startup, not every upload
+PERSONA_CLUSTERS = parse_persona_clusters(os.getenv("PERSONA_CLUSTERS", str(clustering.N_CLUSTERS)))
+
+
+def module_jobs(dataset: Dataset, aggs: dict, session_index: Optional[dict] = None,
+                features: Union[np.ndarray, SharedArray, None] = None) -> dict:
+    """
+    Every analyser module as (function, *args), keyed by response section.
+
+    No module gets the parsed DataFrame itself, so modules running side by
+    side can't see each other's changes. Modules that work from the shared
+    aggregates get no rows at all; warmup gets its own frame of the columns
+    it reads, and clustering gets its float32 feature matrix, which keeps
+    process-pool payloads small.
+
+    Args:
+        dataset: Read-only Dataset of the cleaned DataFrame
+        features: clustering.feature_matrix(dataset), or a SharedArray of it
+                  for process pools (built from the dataset when omitted)
+    """
+    if features is None:
+        features = clustering.feature_matrix(dataset)
+    fit = clustering.fit_shared_persona_state if isinstance(features, SharedArray) else clustering.fit_persona_state
+
+    return {
+        "core": (core_stats.compute_core_stats, aggs),
+        "persona_state": (fit, features, "auto", None, PERSONA_CLUSTERS),
+        "journey": (journey.compute_journey, aggs),
+        "timing": (timing.compute_timing, aggs),
+        "warmup": (warmup.compute_warmup, dataset.frame(['timestamp', 'wpm']), session_index),
+        "comparisons": (comparisons.compute_comparisons, aggs),
+    }
+
+
+def analyze_export(file_obj, file_format: str = "csv",
+                   session_gap_minutes: float = sessions.DEFAULT_SESSION_GAP_MINUTES,
+                   max_rows: Optional[int] = None) -> dict:
+    """
+    Run the whole pipeline for one export in the calling thread or process.
+
+    Used where exports are the unit of parallelism (batch analysis), so the
+    modules run one after another here instead of on an AnalysisPool.
+
+    Args:
+        file_obj: Binary file object positioned at the start of the export
+        file_format: Output of parser.detect_format
+        session_gap_minutes: Break that ends a typing session
+        max_rows: Optional row ceiling (see parser.parse_upload)
+
+    Returns:
+        JSON-compatible WrappedData dictionary
+
+    Raises:
+        pd.errors.EmptyDataError: if no valid tests are left after cleaning
+        parser.UploadTooLargeError: if the export has more than max_rows tests
+    """
+    df = parser.parse_upload(file_obj, file_format, max_rows=max_rows)
+    if df.empty:
+        raise pd.errors.EmptyDataError("No valid tests in the export")
+
+    preview = build_preview(df)
+    aggs = aggregates.compute_aggregates(df)
+    session_index = sessions.build_session_index(df, session_gap_minutes)
+
+    jobs = module_jobs(Dataset(df), aggs, session_index)
+    sections = {name: func(*args) for name, (func, *args) in jobs.items()}
+    sections["persona"] = clustering.describe_personas(sections.pop("persona_state"))
+
+    return build_response(sections, aggs, list(df.columns), preview)
+
+
+def prewarm(n_tests: int = PREWARM_TESTS) -> float:
+    """
+    Run a small synthetic export through the whole pipeline.
+
+    Loads everything imported lazily (sklearn) and pays one-off costs such
+    as BLAS/OpenMP thread pool start-up in KMeans, so the first real upload
+    doesn't. Top-level so process pools can pickle it.
+
+    Returns:
+        Seconds taken
+    """
+    from synthetic_export import export_csv_bytes
+
+    started = time.perf_counter()
+    analyze_export(BytesIO(export_csv_bytes(n_tests, seed=0)), "csv")
+    return time.perf_counter() - started
+
+
+class AnalysisPool:
+    """
+    Runs the CPU-bound analyser modules off the event loop.
+
+    - Modules go to a thread pool or a process pool (kind="thread"/"process")
+    - At most `max_concurrent` requests analyse at once; others wait up to
+      `queue_timeout_seconds` for a slot and are then rejected (backpressure)
+    - A request's modules must finish within `timeout_seconds`
+
+    Thread pools avoid copying the DataFrame but share the GIL with the
+    server; process pools pay for pickling each module's inputs in exchange
+    for real parallelism.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None,
+                 max_concurrent: Optional[int] = None, timeout_seconds: Optional[float] = 120,
+                 queue_timeout_seconds: float = 10):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers or min(6, os.cpu_count() or 1)
+        self.max_concurrent = max_concurrent or self.max_workers
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+
+        if kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analyser")
+
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of the pool's request slots for the duration of an analysis.
+
+        Raises:
+            PoolSaturated: if no slot frees up within queue_timeout_seconds
+        """
+        try:
+            if not self._slots.locked():
+                await self._slots.acquire()
+            elif self.queue_timeout_seconds > 0:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+            else:
+                raise asyncio.TimeoutError
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolSaturated(f"All {self.max_concurrent} analysis slots are busy")
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def iter_modules(self, df: pd.DataFrame, aggs: dict, trace: Optional[Trace] = None,
+                           session_index: Optional[dict] = None):
+        """
+        Run every analyser module for one upload, yielding each result as
+        soon as its module finishes (cheap modules first, clustering last).
+
+        Args:
+            df: Cleaned DataFrame from parser
+            aggs: Output of aggregates.compute_aggregates(df)
+            trace: Optional request trace; each module is recorded as a span
+                   measured inside the worker that ran it
+            session_index: sessions.build_session_index(df), shared with the
+                           modules that work per session
+
+        Yields:
+            (section, result) pairs, section being one of 'core',
+            'persona_state', 'journey', 'timing', 'warmup' and 'comparisons'
+
+        Raises:
+            AnalysisTimeout: if the modules don't finish within timeout_seconds
+        """
+        dataset = Dataset(df)
+
+        # Process workers read the clustering features from shared memory
+        # instead of unpickling their own copy
+        shared_features = clustering.share_feature_matrix(dataset) if self.kind == "process" else None
+        jobs = module_jobs(dataset, aggs, session_index, shared_features)
+
+        loop = asyncio.get_running_loop()
+        futures = {loop.run_in_executor(self.executor, timed_call, func, *args): (name, func)
+                   for name, (func, *args) in jobs.items()}
+
+        started = time.perf_counter()
+        deadline = started + self.timeout_seconds if self.timeout_seconds is not None else None
+        pending = set(futures)
+        try:
+            while pending:
+                timeout = max(0, deadline - time.perf_counter()) if deadline is not None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Modules that haven't started yet are dropped; running ones
+                    # finish in the background but their results are discarded
+                    self.timeouts += 1
+                    raise AnalysisTimeout(f"Analysis took longer than {self.timeout_seconds:g}s")
+
+                # Same-tick finishers come out in the usual section order
+                for future in sorted(done, key=lambda future: list(futures).index(future)):
+                    name, func = futures[future]
+                    result, duration, rss_delta = future.result()
+                    if trace is not None:
+                        # Spans are named after the module ("clustering", "warmup", ...)
+                        trace.add(func.__module__.rsplit('.', 1)[-1], duration, len(df), rss_delta)
+                    yield name, result
+        finally:
+            # Also covers a caller that stops listening (e.g. a dropped stream)
+            for future in pending:
+                future.cancel()
+            if shared_features is not None:
+                shared_features.unlink()
+
+        self.completed += 1
+        logger.debug("Ran %d modules on the %s pool in %.2fs", len(jobs), self.kind, time.perf_counter() - started)
+
+    async def run_modules(self, df: pd.DataFrame, aggs: dict, trace: Optional[Trace] = None,
+                          session_index: Optional[dict] = None) -> dict:
+        """
+        Run every analyser module for one upload and gather the results.
+
+        Same arguments as iter_modules.
+
+        Returns:
+            Dictionary with 'core', 'persona_state', 'journey', 'timing',
+            'warmup' and 'comparisons'
+        """
+        return {name: result async for name, result in self.iter_modules(df, aggs, trace, session_index)}
+
+    def prewarm(self) -> float:
+        """
+        Warm up wherever the modules run: this process for a thread pool,
+        or each worker process of a process pool. Blocks until done.
+
+        Returns:
+            Seconds taken
+        """
+        started = time.perf_counter()
+        if self.kind == "process":
+            # One job per worker; the pool starts a process for each
+            for future in [self.executor.submit(prewarm) for _ in range(self.max_workers)]:
+                future.result()
+        else:
+            self.executor.submit(prewarm).result()
+        return time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "maxWorkers": self.max_workers,
+            "maxConcurrent": self.max_concurrent,
+            "active": self.active,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "timeoutSeconds": self.timeout_seconds,
+            "queueTimeoutSeconds": self.queue_timeout_seconds
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_analysis_pool() -> AnalysisPool:
+    """
+    Build the app's analysis pool from environment variables.
+
+    ANALYSIS_POOL                   "thread" (default) or "process"
+    ANALYSIS_WORKERS                Pool size (default min(6, CPU count))
+    ANALYSIS_MAX_CONCURRENT         Uploads analysed at once (default: pool size)
+    ANALYSIS_QUEUE_TIMEOUT_SECONDS  How long an upload waits for a slot before a 503 (default 10)
+    ANALYSIS_TIMEOUT_SECONDS        Per-upload module time limit before a 504 (default 120, 0 disables)
+    """
+    workers = os.getenv("ANALYSIS_WORKERS")
+    max_concurrent = os.getenv("ANALYSIS_MAX_CONCURRENT")
+    timeout_seconds = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "120"))
+
+    return AnalysisPool(
+        kind=os.getenv("ANALYSIS_POOL", "thread"),
+        max_workers=int(workers) if workers else None,
+        max_concurrent=int(max_concurrent) if max_concurrent else None,
+        timeout_seconds=timeout_seconds if timeout_seconds > 0 else None,
+        queue_timeout_seconds=float(os.getenv("ANALYSIS_QUEUE_TIMEOUT_SECONDS", "10"))
+    )
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from fastapi.responses import Response
+
+# orjson is optional: several times faster than the stdlib encoder and
+# serialises NumPy scalars/arrays natively. Without it we fall back to json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Brotli is optional too; without it large responses are gzipped
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this (bytes) aren't worth compressing; 0 disables
+# compression (RESPONSE_COMPRESS_MIN_BYTES)
+DEFAULT_COMPRESS_MIN_BYTES = 8192
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    # Fallback encoder hook for what orjson handles natively
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """
+    Encode a response as compact UTF-8 JSON.
+
+    Output matches Starlette's JSONResponse byte for byte, except that NumPy
+    values are accepted and (with orjson) NaN/infinity become null instead
+    of raising.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def compress_min_bytes() -> int:
+    return int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", str(DEFAULT_COMPRESS_MIN_BYTES)))
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick 'br' or 'gzip' from an Accept-Encoding header (None if neither).
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compressed_response(body: bytes, accept_encoding: str, headers: Optional[dict] = None) -> Response:
+    """
+    JSON response for an already encoded body, compressed with brotli or
+    gzip when it's large enough and the client accepts it.
+    """
+    headers = dict(headers or {})
+    min_bytes = compress_min_bytes()
+    encoding = negotiate_encoding(accept_encoding) if min_bytes and len(body) >= min_bytes else None
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if min_bytes:
+        headers["Vary"] = "Accept-Encoding"
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# backend/synthetic_export.py
+#
+# Generates realistic fake MonkeyType exports for benchmarks and load tests.
+#
+# Usage:
+#   python synthetic_export.py 100000 synthetic.csv [--seed 1]
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Same column order as a real MonkeyType results export
+EXPORT_COLUMNS = [
+    '_id', 'isPb', 'wpm', 'acc', 'rawWpm', 'consistency', 'charStats', 'mode', 'mode2',
+    'quoteLength', 'restartCount', 'testDuration', 'afkDuration', 'incompleteTestSeconds',
+    'punctuation', 'numbers', 'language', 'funbox', 'difficulty', 'lazyMode', 'blindMode',
+    'bailedOut', 'tags', 'timestamp'
+]
+
+# (mode, mode2 choices, probability)
+MODES = [
+    ('time', [15, 30, 60, 120], 0.70),
+    ('words', [10, 25, 50, 100], 0.18),
+    ('quote', ['0', '1', '2', '3'], 0.08),
+    ('zen', ['zen'], 0.02),
+    ('custom', ['custom'], 0.02),
+]
+
+# 2022-01-01 00:00 UTC in ms
+DEFAULT_START_MS = 1640995200000
+
+
+def generate_export(n_tests: int, seed: int = 0, start_ms: int = DEFAULT_START_MS,
+                    malformed_rate: float = 0.002) -> pd.DataFrame:
+    """
+    Build a synthetic export with the shape of real MonkeyType data.
+
+    - Tests come in sessions (seconds to minutes apart) separated by gaps
+      of 30+ minutes to a few days
+    - Speed improves slowly over the history and warms up within a session
+    - Modes, durations, charStats and restart counts follow the mode mix
+    - A small share of rows is invalid (0 WPM, missing or garbage charStats,
+      missing consistency) to exercise the parser's cleaning
+
+    Args:
+        n_tests: Number of rows to generate
+        seed: Random seed (same seed, same export)
+        start_ms: Timestamp of the first test
+        malformed_rate: Share of rows given each kind of defect
+
+    Returns:
+        DataFrame with EXPORT_COLUMNS, newest test first like the real export
+    """
+    rng = np.random.default_rng(seed)
+
+    # Sessions: geometric lengths, short gaps inside, long gaps between
+    session_lengths = rng.geometric(1 / 8, size=n_tests)
+    session_of_test = np.repeat(np.arange(n_tests), session_lengths)[:n_tests]
+    new_session = np.concatenate(([True], np.diff(session_of_test) > 0))
+    test_in_session = np.arange(n_tests) - np.maximum.accumulate(np.where(new_session, np.arange(n_tests), 0))
+
+    within_gaps = rng.integers(20_000, 300_000, n_tests)
+    between_gaps = rng.integers(31 * 60_000, 3 * 86_400_000, n_tests)
+    timestamps = start_ms + np.cumsum(np.where(new_session, between_gaps, within_gaps))
+
+    # Speed: long-term improvement + warmup within a session + noise
+    progress = np.linspace(0, 1, n_tests)
+    warmup = 6 * (1 - np.exp(-test_in_session / 3))
+    wpm = np.round((70 + 35 * progress + warmup + rng.normal(0, 12, n_tests)).clip(5, 250), 2)
+    acc = np.round((97 - (wpm - 90) / 20 + rng.normal(0, 2.5, n_tests)).clip(40, 100), 2)
+    acc[rng.random(n_tests) < 0.08] = 100
+    consistency = np.round(rng.normal(75, 8, n_tests).clip(0, 100), 2)
+
+    # Mode mix
+    mode_index = rng.choice(len(MODES), n_tests, p=[probability for *_, probability in MODES])
+    mode = np.array([name for name, *_ in MODES])[mode_index]
+    mode2 = np.empty(n_tests, dtype=object)
+    for index, (_, choices, _) in enumerate(MODES):
+        rows = mode_index == index
+        mode2[rows] = rng.choice(np.array(choices, dtype=object), rows.sum())
+
+    duration = np.where(mode == 'time', pd.to_numeric(pd.Series(mode2), errors='coerce').fillna(30), rng.uniform(5, 90, n_tests))
+    duration = np.round(duration + rng.uniform(0, 0.2, n_tests), 2)
+
+    # charStats follow from speed, duration and accuracy (5 chars per word)
+    typed = (wpm * 5 * duration / 60).astype(np.int64)
+    incorrect = np.round(typed * (100 - acc) / 100).astype(np.int64)
+    extra = rng.poisson(0.5, n_tests)
+    missed = rng.poisson(0.7, n_tests)
+    char_stats = pd.Series([f"{c};{i};{e};{m}" for c, i, e, m in zip(typed - incorrect, incorrect, extra, missed)],
+                           dtype=object)
+
+    export = pd.DataFrame({
+        '_id': [f"{index:024x}" for index in rng.permutation(n_tests)],
+        'isPb': '',
+        'wpm': wpm,
+        'acc': acc,
+        'rawWpm': np.round(wpm * rng.uniform(1.0, 1.15, n_tests), 2),
+        'consistency': consistency,
+        'charStats': char_stats,
+        'mode': mode,
+        'mode2': mode2,
+        'quoteLength': np.where(mode == 'quote', rng.integers(0, 4, n_tests), -1),
+        'restartCount': rng.poisson(0.8, n_tests),
+        'testDuration': duration,
+        'afkDuration': rng.poisson(0.2, n_tests),
+        'incompleteTestSeconds': np.round(rng.exponential(2, n_tests) * (rng.random(n_tests) < 0.3), 2),
+        'punctuation': np.where(rng.random(n_tests) < 0.15, 'true', 'false'),
+        'numbers': np.where(rng.random(n_tests) < 0.05, 'true', 'false'),
+        'language': np.where(rng.random(n_tests) < 0.9, 'english', 'english_1k'),
+        'funbox': '',
+        'difficulty': 'normal',
+        'lazyMode': 'false',
+        'blindMode': 'false',
+        'bailedOut': 'false',
+        'tags': '',
+        'timestamp': timestamps,
+    }, columns=EXPORT_COLUMNS)
+
+    # Defects the parser has to clean up
+    export.loc[rng.random(n_tests) < malformed_rate, 'wpm'] = 0
+    export.loc[rng.random(n_tests) < malformed_rate, 'charStats'] = np.nan
+    export.loc[rng.random(n_tests) < malformed_rate, 'charStats'] = 'garbage'
+    export.loc[rng.random(n_tests) < malformed_rate, 'consistency'] = np.nan
+
+    # MonkeyType exports list the newest test first
+    return export.iloc[::-1].reset_index(drop=True)
+
+
+def export_csv_bytes(n_tests: int, seed: int = 0) -> bytes:
+    """
+    Synthetic export encoded exactly like the CSV a user would upload.
+    """
+    return generate_export(n_tests, seed).to_csv(index=False).encode()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic MonkeyType export")
+    arg_parser.add_argument("tests", type=int, help="Number of tests (rows)")
+    arg_parser.add_argument("output", type=Path, help="CSV file to write")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    args.output.write_bytes(export_csv_bytes(args.tests, args.seed))
+    print(f"Wrote {args.tests} synthetic tests to {args.output}")
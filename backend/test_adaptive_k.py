@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# backend/test_adaptive_k.py
+#
+# Adaptive persona count (PERSONA_CLUSTERS=adaptive): select_k finds the
+# number of typing regimes, stays inside its time budget even within one
+# fit, and PERSONA_CLUSTERS is validated once when the app starts.
+#
+# Usage:
+#   python -m pytest test_adaptive_k.py
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+import pipeline
+from analyser import clustering
+from synthetic_export import export_csv_bytes
+from test_personas import grouped_export
+
+
+def test_select_k_finds_the_regimes():
+    features_scaled = StandardScaler().fit_transform(clustering.feature_matrix(grouped_export(20000, 7)))
+
+    selection = clustering.select_k(features_scaled, time_budget_seconds=5)
+
+    assert selection["k"] == 4
+    assert set(selection["scores"]) == {2, 3, 4, 5}
+    assert selection["sampleSize"] == clustering.ADAPTIVE_SAMPLE_SIZE
+
+
+def test_spent_budget_falls_back_to_default_k():
+    features_scaled = StandardScaler().fit_transform(clustering.feature_matrix(grouped_export(5000, 8)))
+
+    selection = clustering.select_k(features_scaled, time_budget_seconds=0, default_k=4)
+
+    assert selection == {**selection, "k": 4, "scores": {}}
+
+
+def test_fit_gives_up_at_the_deadline():
+    rng = np.random.default_rng(9)
+    sample = rng.normal(size=(5000, 3))
+    # All starting centres in one corner: K-means needs many iterations from here
+    init = np.full((4, 3), 3.0) + rng.normal(0, 0.01, (4, 3))
+    assert KMeans(n_clusters=4, init=init, n_init=1).fit(sample).n_iter_ > clustering.ADAPTIVE_ITERATION_STEP
+
+    assert clustering._fit_before(sample, init, deadline=time.perf_counter() - 1) is None
+    assert clustering._fit_before(sample, init, deadline=time.perf_counter() + 60) is not None
+
+
+@pytest.mark.parametrize("value, expected", [("4", 4), (" 2 ", 2), ("5", 5), ("adaptive", "adaptive"), ("Adaptive", "adaptive")])
+def test_parse_persona_clusters(value, expected):
+    assert pipeline.parse_persona_clusters(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "6", "four", "-1", "2.5", ""])
+def test_bad_persona_clusters_are_rejected(value):
+    with pytest.raises(ValueError, match="PERSONA_CLUSTERS"):
+        pipeline.parse_persona_clusters(value)
+
+
+def test_bad_persona_clusters_stop_startup():
+    result = subprocess.run([sys.executable, "-c", "import main"], cwd=Path(__file__).parent,
+                            env={"PERSONA_CLUSTERS": "lots", "PATH": ""}, capture_output=True, text=True)
+
+    assert result.returncode != 0
+    assert "PERSONA_CLUSTERS" in result.stderr
+
+
+def test_adaptive_upload(client, monkeypatch):
+    monkeypatch.setattr(pipeline, "PERSONA_CLUSTERS", "adaptive")
+
+    response = client.post("/api/analyze", files={"file": ("export.csv", export_csv_bytes(3000, seed=10))})
+
+    assert response.status_code == 200, response.text
+    assert 2 <= len(response.json()["persona"]["allPersonas"]) <= 5
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# backend/test_aggregates.py
+#
+# Shared aggregates (aggregates.compute_aggregates): every reduction must
+# match the pandas expression the modules used to evaluate themselves, and
+# folding new tests in with update_aggregates must match computing them
+# over the whole history. The time cube and its hourly, weekday and
+# monthly slices must match grouping the frame.
+#
+# Usage:
+#   python -m pytest test_aggregates.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import aggregates, parser
+from synthetic_export import generate_export
+
+
+@pytest.fixture(scope="module")
+def df():
+    return parser.parse_csv(generate_export(5000, seed=81).to_csv(index=False).encode())
+
+
+@pytest.fixture(scope="module")
+def aggs(df):
+    return aggregates.compute_aggregates(df)
+
+
+def test_totals_and_moments_match_pandas(df, aggs):
+    assert aggs['count'] == len(df)
+    assert aggs['wpm_mean'] == pytest.approx(df['wpm'].mean(), rel=1e-12)
+    assert aggs['wpm_std'] == pytest.approx(df['wpm'].std(), rel=1e-12)
+    assert aggs['wpm_max'] == df['wpm'].max()
+    assert aggs['pb_datetime'] == df.loc[df['wpm'].idxmax(), 'datetime']
+    assert aggs['acc_mean'] == pytest.approx(df['acc'].mean(), rel=1e-12)
+    assert aggs['consistency_sum'] == pytest.approx(df['consistency'].sum(), rel=1e-12)
+    assert aggs['perfect_acc_count'] == int((df['acc'] == 100).sum())
+    assert aggs['duration_sum'] == pytest.approx(df['testDuration'].sum(), rel=1e-12)
+    assert aggs['words_sum'] == pytest.approx((df['wpm'] * df['testDuration'] / 60).sum(), rel=1e-12)
+    assert aggs['chars_total'] == df['total_chars'].sum()
+    assert aggs['chars_missed'] == df['chars_missed'].sum()
+    assert aggs['restart_sum'] == df['restartCount'].sum()
+    assert aggs['restart_max'] == df['restartCount'].max()
+    assert aggs['restart_zero_count'] == int((df['restartCount'] == 0).sum())
+    pd.testing.assert_series_equal(aggs['mode_counts'], df['mode'].value_counts())
+
+
+def test_pb_count_and_thresholds(df, aggs):
+    wpm = df['wpm'].to_numpy()
+
+    assert aggs['pb_count'] == int((wpm == np.maximum.accumulate(wpm)).sum())
+    for threshold in aggregates.WPM_THRESHOLDS:
+        assert aggs['thresholds'][threshold] == int((wpm >= threshold).sum())
+
+
+def test_calendar(df, aggs):
+    assert aggs['active_days'] == df['date'].nunique()
+    assert aggs['date_min'] == df['date'].min()
+    assert aggs['date_max'] == df['date'].max()
+    assert aggs['year_max'] == df['year'].max()
+
+
+@pytest.mark.parametrize("split", [1, 2500, 4999])
+def test_update_matches_full_compute(df, aggs, split):
+    merged = aggregates.update_aggregates(aggregates.compute_aggregates(df.iloc[:split]), df.iloc[split:])
+
+    for key in ['count', 'wpm_max', 'pb_datetime', 'pb_count', 'thresholds', 'perfect_acc_count',
+                'chars_total', 'restart_sum', 'restart_max', 'restart_zero_count', 'datetime_min',
+                'datetime_max', 'date_min', 'date_max', 'active_days', 'streak', 'year_max']:
+        assert merged[key] == aggs[key], key
+    for key in ['wpm_mean', 'wpm_std', 'acc_mean', 'consistency_sum', 'duration_sum', 'words_sum',
+                'fast_acc_mean', 'slow_acc_mean']:
+        assert merged[key] == pytest.approx(aggs[key], rel=1e-12), key
+    pd.testing.assert_series_equal(merged['mode_counts'], aggs['mode_counts'], check_names=False)
+    np.testing.assert_array_equal(merged['cube']['count'], aggs['cube']['count'])
+    np.testing.assert_allclose(merged['cube']['wpm_sum'], aggs['cube']['wpm_sum'])
+
+
+@pytest.mark.parametrize("key, column, size", [("hourly", 'hour', 24), ("daily", 'day_of_week_num', 7)])
+def test_cube_slices_match_groupby(df, aggs, key, column, size):
+    grouped = df.groupby(column)
+    sliced = aggs[key]
+
+    np.testing.assert_array_equal(sliced['count'], grouped.size().reindex(range(size), fill_value=0))
+    for name in ('wpm', 'acc', 'consistency'):
+        np.testing.assert_allclose(sliced[f'{name}_sum'], grouped[name].sum().reindex(range(size), fill_value=0),
+                                   rtol=1e-12)
+    np.testing.assert_allclose(sliced['wpm_sumsq'], (df['wpm'] ** 2).groupby(df[column]).sum()
+                               .reindex(range(size), fill_value=0), rtol=1e-12)
+
+
+def test_monthly_slice_matches_groupby(df, aggs):
+    grouped = df.groupby(df['datetime'].dt.to_period('M'))
+    monthly = aggs['monthly']
+
+    assert monthly['month'] == [str(period) for period in grouped.size().index]
+    np.testing.assert_array_equal(monthly['count'], grouped.size())
+    np.testing.assert_allclose(monthly['wpm_sum'] / monthly['count'], grouped['wpm'].mean(), rtol=1e-12)
+    np.testing.assert_allclose(monthly['acc_sum'] / monthly['count'], grouped['acc'].mean(), rtol=1e-12)
+
+
+def test_cube_cells(df, aggs):
+    cube = aggs['cube']
+    month = df['month'].to_numpy() - cube['first_month']
+    cells = df.groupby([month, df['day_of_week_num'].to_numpy(), df['hour'].to_numpy()])['wpm']
+
+    assert cube['count'].shape == (month.max() + 1, 7, 24)
+    assert cube['count'].sum() == len(df)
+    for (m, weekday, hour), wpm in list(cells)[:50]:
+        assert cube['count'][m, weekday, hour] == len(wpm)
+        assert cube['wpm_sum'][m, weekday, hour] == pytest.approx(wpm.sum(), rel=1e-12)
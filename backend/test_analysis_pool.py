@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# backend/test_analysis_pool.py
+#
+# AnalysisPool: modules run off the event loop must give the same sections
+# as running them one after another, and a busy or slow pool must turn into
+# a 503 or 504 instead of a hung request. Process pools read the feature
+# matrix from shared memory, which is freed once the modules are done.
+#
+# Usage:
+#   python -m pytest test_analysis_pool.py
+
+import asyncio
+import pickle
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import main
+import pipeline
+from analyser import aggregates, parser, sessions
+from analyser.dataset import Dataset
+from instrumentation import StageMetrics, Trace
+from synthetic_export import export_csv_bytes
+
+
+@pytest.fixture(scope="module")
+def upload():
+    df = parser.parse_csv(export_csv_bytes(2000, seed=101))
+    return df, aggregates.compute_aggregates(df), sessions.build_session_index(df)
+
+
+def sequential_sections(df, aggs, session_index) -> dict:
+    jobs = pipeline.module_jobs(Dataset(df), aggs, session_index)
+    return {name: func(*args) for name, (func, *args) in jobs.items()}
+
+
+def run_on(pool: pipeline.AnalysisPool, df, aggs, session_index) -> dict:
+    async def run():
+        async with pool.slot():
+            return await pool.run_modules(df, aggs, session_index=session_index)
+    try:
+        return asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+
+def assert_same_sections(sections: dict, expected: dict):
+    assert set(sections) == set(expected)
+    for name in expected:
+        if name == "persona_state":
+            assert pipeline.clustering.describe_personas(sections[name]) == \
+                pipeline.clustering.describe_personas(expected[name])
+        else:
+            assert sections[name] == expected[name], name
+
+
+def test_thread_pool_matches_sequential_run(upload):
+    sections = run_on(pipeline.AnalysisPool("thread", max_workers=3), *upload)
+
+    assert_same_sections(sections, sequential_sections(*upload))
+
+
+def test_modules_stream_in_as_they_finish(upload):
+    df, aggs, session_index = upload
+    pool = pipeline.AnalysisPool("thread", max_workers=2)
+    trace = Trace(StageMetrics())
+
+    async def names():
+        return [name async for name, _ in pool.iter_modules(df, aggs, trace, session_index)]
+    try:
+        order = asyncio.run(names())
+    finally:
+        pool.shutdown()
+
+    assert sorted(order) == sorted(pipeline.module_jobs(Dataset(df), aggs, session_index))
+    # Each module is timed inside the worker that ran it
+    assert {"core_stats", "clustering", "warmup"} <= {span["name"] for span in trace.spans}
+
+
+def test_busy_pool_rejects_after_the_queue_timeout():
+    pool = pipeline.AnalysisPool("thread", max_workers=1, max_concurrent=1, queue_timeout_seconds=0.05)
+
+    async def second_request():
+        async with pool.slot():
+            with pytest.raises(pipeline.PoolSaturated):
+                async with pool.slot():
+                    pass
+    try:
+        asyncio.run(second_request())
+    finally:
+        pool.shutdown()
+
+    assert pool.rejected == 1
+    assert pool.active == 0
+
+
+def test_slow_modules_time_out(upload, monkeypatch):
+    monkeypatch.setattr(pipeline, "module_jobs", lambda *args: {"core": (time.sleep, 1)})
+    pool = pipeline.AnalysisPool("thread", max_workers=1, timeout_seconds=0.1)
+
+    with pytest.raises(pipeline.AnalysisTimeout):
+        run_on(pool, *upload)
+    assert pool.timeouts == 1
+
+
+@pytest.mark.parametrize("error, status", [(pipeline.PoolSaturated("busy"), 503),
+                                           (pipeline.AnalysisTimeout("slow"), 504)])
+def test_pool_errors_map_to_http_status(error, status):
+    assert main.http_error(error).status_code == status
+
+
+def test_process_pool_matches_sequential_run(upload, monkeypatch):
+    shared = []
+    share_feature_matrix = pipeline.clustering.share_feature_matrix
+
+    def share_and_record(dataset):
+        shared.append(share_feature_matrix(dataset))
+        return shared[-1]
+    monkeypatch.setattr(pipeline.clustering, "share_feature_matrix", share_and_record)
+
+    sections = run_on(pipeline.AnalysisPool("process", max_workers=2), *upload)
+
+    assert_same_sections(sections, sequential_sections(*upload))
+    # The feature matrix went through shared memory and was freed afterwards
+    assert len(shared) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shared[0].name)
+
+
+def test_shared_feature_matrix_fit_matches_in_process_fit(upload):
+    df = upload[0]
+    features = pipeline.clustering.feature_matrix(df)
+    shared = pipeline.clustering.share_feature_matrix(df)
+    try:
+        np.testing.assert_array_equal(shared.array, features)
+        # Only the name, shape and dtype are sent to workers
+        assert len(pickle.dumps(shared)) < 200
+        state = pipeline.clustering.fit_shared_persona_state(pickle.loads(pickle.dumps(shared)))
+    finally:
+        shared.unlink()
+
+    assert pipeline.clustering.describe_personas(state) == \
+        pipeline.clustering.describe_personas(pipeline.clustering.fit_persona_state(features))
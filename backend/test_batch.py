@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# backend/test_batch.py
+#
+# Batch analysis (/api/analyze/batch): every export in the form or in a zip
+# gets the same result as /api/analyze, a bad export fails on its own
+# line, and the per-export and per-batch ceilings hold for zipped exports too.
+#
+# Usage:
+#   python -m pytest test_batch.py
+
+import gzip
+import io
+import json
+import zipfile
+
+import pytest
+
+import batch
+import main
+from synthetic_export import export_csv_bytes
+
+
+def zip_bytes(members: list) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def post_batch(client, files: list):
+    return client.post("/api/analyze/batch", files=[("files", file) for file in files])
+
+
+def records(response) -> list:
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.fixture(scope="module")
+def exports():
+    return {"alice.csv": export_csv_bytes(800, seed=131), "bob.csv": export_csv_bytes(600, seed=132)}
+
+
+def test_batch_matches_single_analyses(client, exports):
+    lines = records(post_batch(client, [
+        ("alice.csv", exports["alice.csv"]),
+        ("club.zip", zip_bytes([("club/bob.csv.gz", gzip.compress(exports["bob.csv"])),
+                                ("__MACOSX/._bob.csv", b"junk"), ("notes.txt", b"not an export")])),
+    ]))
+
+    assert lines[-1] == {**lines[-1], "status": "complete", "total": 2, "succeeded": 2, "failed": 0}
+    by_user = {line["user"]: line for line in lines[:-1]}
+    assert by_user["bob"]["file"] == "club/bob.csv.gz"
+    for user in ("alice", "bob"):
+        single = client.post("/api/analyze", files={"file": ("export.csv", exports[f"{user}.csv"])}).json()
+        assert by_user[user]["status"] == "success"
+        assert by_user[user]["data"] == single
+
+
+def test_bad_export_fails_on_its_own(client, exports):
+    lines = records(post_batch(client, [("alice.csv", exports["alice.csv"]), ("broken.csv", b"wpm,acc\n1,2\n")]))
+
+    by_user = {line["user"]: line for line in lines[:-1]}
+    assert by_user["alice"]["status"] == "success"
+    assert by_user["broken"]["status"] == "error"
+    assert "timestamp" in by_user["broken"]["error"]
+    assert lines[-1]["failed"] == 1
+
+
+def test_zipped_export_over_the_upload_ceiling(client, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 64 * 1024)
+    # Compresses to almost nothing, so only the unzipped size can catch it
+    bomb = zip_bytes([("bomb.csv", b"0" * (1024 * 1024))])
+
+    response = post_batch(client, [("bomb.zip", bomb)])
+
+    assert response.status_code == 413
+
+
+def test_empty_batch_is_rejected(client):
+    assert post_batch(client, [("notes.zip", zip_bytes([("notes.txt", b"hi")]))]).status_code == 400
+    assert post_batch(client, [("broken.zip", b"not a zip")]).status_code == 400
+
+
+def test_collect_exports_limits():
+    uploads = [("a.csv", b"12345"), ("b.csv", b"12345")]
+
+    assert len(batch.collect_exports(uploads, max_files=2)) == 2
+    with pytest.raises(batch.BatchTooLarge):
+        batch.collect_exports(uploads, max_files=1)
+    with pytest.raises(batch.BatchTooLarge):
+        batch.collect_exports(uploads, max_files=2, max_total_bytes=8)
+    with pytest.raises(batch.BatchTooLarge):
+        batch.collect_exports(uploads, max_files=2, max_export_bytes=4)
+
+
+def test_read_bounded_stops_early():
+    with pytest.raises(batch.BatchTooLarge):
+        batch.read_bounded(io.BytesIO(b"x" * (batch.READ_CHUNK_BYTES + 1)), batch.READ_CHUNK_BYTES, "big.csv")
+
+    assert batch.read_bounded(io.BytesIO(b"x" * 10), None, "small.csv") == b"x" * 10
+
+
+@pytest.mark.parametrize("name, user", [("alice.csv", "alice"), ("club/bob.csv.gz", "bob"),
+                                        ("c.parquet", "c"), ("D.CSV", "D")])
+def test_user_label(name, user):
+    assert batch.user_label(name) == user
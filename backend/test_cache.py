@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# backend/test_cache.py
+#
+# Result cache for /api/analyze: a repeat upload is served from the cache
+# with the same body, anything that changes the analysis gets its own
+# entry, and the LRU keeps to its entry, byte and time limits.
+#
+# Usage:
+#   python -m pytest test_cache.py
+
+import io
+
+import pytest
+
+import cache
+from synthetic_export import export_csv_bytes
+
+
+def analyze(client, data: bytes, **form):
+    response = client.post("/api/analyze", files={"file": ("export.csv", data)}, data=form)
+    assert response.status_code == 200, response.text
+    return response
+
+
+@pytest.fixture(scope="module")
+def upload():
+    return export_csv_bytes(1500, seed=91)
+
+
+def test_repeat_upload_is_a_hit(client, upload):
+    first = analyze(client, upload)
+    second = analyze(client, upload)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+
+
+@pytest.mark.parametrize("form", [{"session_gap_minutes": "45"}, {"year": "2022"}, {"per_year": "true"},
+                                  {"user_id": "cache-user"}])
+def test_parameters_that_change_the_result_miss(client, upload, form):
+    analyze(client, upload)
+
+    assert analyze(client, upload, **form).headers["X-Cache"] == "MISS"
+    assert analyze(client, upload, **form).headers["X-Cache"] == "HIT"
+
+
+def test_hash_upload_rewinds():
+    upload = io.BytesIO(b"x" * 2500)
+    upload.seek(100)
+
+    digest = cache.hash_upload(upload, chunk_size=1000)
+
+    assert upload.tell() == 0
+    assert digest == cache.hash_upload(io.BytesIO(b"x" * 2500))
+
+
+def test_cache_key_covers_every_parameter():
+    keys = {cache.cache_key("abc"), cache.cache_key("abc", user=None), cache.cache_key("abc", user="a"),
+            cache.cache_key("abc", user="b"), cache.cache_key("abd", user="a")}
+
+    assert len(keys) == 5
+    assert cache.cache_key("abc", a=1, b=2) == cache.cache_key("abc", b=2, a=1)
+
+
+def test_lru_limits():
+    results = cache.ResultCache(max_entries=2, max_bytes=10)
+    results.set("a", b"1234")
+    results.set("b", b"1234")
+    results.get("a")
+    results.set("c", b"1234")  # evicts b, the least recently used
+
+    assert results.get("b") is None
+    assert results.get("a") == b"1234"
+    results.set("d", b"123456789")  # over max_bytes together with anything else
+    assert results.stats()["bytes"] <= 10
+    results.set("e", b"12345678901")  # larger than the whole cache
+    assert results.get("e") is None
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    results = cache.ResultCache(ttl_seconds=60)
+    results.set("key", b"value")
+
+    now[0] += 59
+    assert results.get("key") == b"value"
+    now[0] += 2
+    assert results.get("key") is None
+
+
+def test_disk_tier_is_promoted(tmp_path):
+    disk = cache.DiskCacheBackend(str(tmp_path))
+    cache.ResultCache(backend=disk).set("key", b"value")
+
+    # A fresh process only has the disk tier
+    results = cache.ResultCache(backend=disk)
+    assert results.get("key") == b"value"
+    assert results.get("key") == b"value"
+    assert (results.backend_hits, results.hits) == (1, 1)
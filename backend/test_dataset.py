@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# backend/test_dataset.py
+#
+# Dataset: modules share one parsed frame, so column views must refuse
+# in-place writes, frames handed out must not write through, and running
+# the whole pipeline must leave the parsed frame exactly as it was.
+#
+# Usage:
+#   python -m pytest test_dataset.py
+
+import asyncio
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+from analyser import aggregates, parser, sessions
+from analyser.dataset import Dataset
+from synthetic_export import export_csv_bytes
+
+
+@pytest.fixture
+def df():
+    return parser.parse_csv(export_csv_bytes(1500, seed=201))
+
+
+def test_columns_are_read_only(df):
+    wpm = Dataset(df).column('wpm')
+
+    with pytest.raises(ValueError):
+        wpm[0] = 0
+    np.testing.assert_array_equal(wpm, df['wpm'].to_numpy())
+
+
+def test_columns_are_cached(df):
+    dataset = Dataset(df)
+
+    assert dataset.column('acc') is dataset.column('acc')
+    assert len(dataset) == len(df)
+    assert dataset.columns == list(df.columns)
+
+
+@pytest.mark.parametrize("columns", [None, ['timestamp', 'wpm']])
+def test_frame_changes_do_not_reach_the_dataset(df, columns):
+    before = df.copy()
+    dataset = Dataset(df)
+
+    frame = dataset.frame(columns)
+    frame['wpm'] = 0
+    frame.loc[frame.index[0], 'timestamp'] = 0
+    frame['extra'] = 1
+
+    pd.testing.assert_frame_equal(df, before)
+    assert 'extra' not in dataset.columns
+    assert dataset.column('wpm').max() > 0
+
+
+def test_modules_leave_the_parsed_frame_unchanged(df):
+    before = df.copy()
+    aggs = aggregates.compute_aggregates(df)
+    session_index = sessions.build_session_index(df)
+
+    for name, (func, *args) in pipeline.module_jobs(Dataset(df), aggs, session_index).items():
+        func(*args)
+        pd.testing.assert_frame_equal(df, before, obj=name)
+
+
+def test_pool_run_leaves_the_parsed_frame_unchanged(df):
+    before = df.copy()
+    aggs = aggregates.compute_aggregates(df)
+    pool = pipeline.AnalysisPool("thread", max_workers=3)
+
+    async def run():
+        async with pool.slot():
+            return await pool.run_modules(df, aggs, session_index=sessions.build_session_index(df))
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_analyze_export_is_repeatable():
+    upload = export_csv_bytes(1500, seed=202)
+
+    assert pipeline.analyze_export(io.BytesIO(upload)) == pipeline.analyze_export(io.BytesIO(upload))
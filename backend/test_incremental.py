@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# backend/test_incremental.py
+#
+# Incremental re-analysis for returning users (user_id): a delta upload
+# must answer exactly what a full analysis of the same export does, and a
+# user's state must only ever be used for that user's own history.
+#
+# Usage:
+#   python -m pytest test_incremental.py
+
+import pandas as pd
+import pytest
+
+from synthetic_export import generate_export
+
+
+def analyze(client, export: pd.DataFrame, **form) -> dict:
+    response = client.post("/api/analyze", files={"file": ("export.csv", export.to_csv(index=False).encode())},
+                           data=form)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def without_incremental(result: dict) -> dict:
+    return {key: value for key, value in result.items() if key != "incremental"}
+
+
+@pytest.mark.parametrize("n_tests, seed", [(3000, 41), (20000, 42)])
+def test_delta_matches_full_analysis(client, n_tests, seed):
+    export = generate_export(n_tests, seed=seed)
+    older = export.iloc[n_tests // 3:]  # exports list the newest test first
+
+    first = analyze(client, older, user_id=f"delta-{seed}")
+    delta = analyze(client, export, user_id=f"delta-{seed}")
+    full = analyze(client, export)
+
+    assert first["incremental"]["mode"] == "full"
+    assert delta["incremental"]["mode"] == "delta"
+    assert delta["incremental"]["newTests"] == full["rowCount"] - first["rowCount"]
+    assert without_incremental(delta) == full
+
+
+def test_repeated_deltas_match_full_analysis(client):
+    export = generate_export(4000, seed=43)
+
+    for newest in (3000, 2000, 1000, 0):
+        result = analyze(client, export.iloc[newest:], user_id="delta-steps")
+
+    assert result["incremental"]["mode"] == "delta"
+    assert without_incremental(result) == analyze(client, export)
+
+
+def test_same_upload_from_two_users_builds_both_states(client):
+    export = generate_export(2000, seed=44)
+    older = export.iloc[500:]
+
+    first = analyze(client, older, user_id="shared-a")
+    second = analyze(client, older, user_id="shared-b")
+    assert first["incremental"]["mode"] == second["incremental"]["mode"] == "full"
+
+    # The second user's own state was stored, so their next upload is a delta
+    assert analyze(client, export, user_id="shared-b")["incremental"]["mode"] == "delta"
+
+
+def test_other_history_is_not_folded_into_a_state(client):
+    mine = generate_export(2000, seed=45)
+    theirs = generate_export(2500, seed=46, start_ms=int(mine['timestamp'].max()) + 60_000)
+
+    analyze(client, mine, user_id="owner")
+    result = analyze(client, theirs, user_id="owner")
+
+    # A different export under the same id gets a full analysis of its own tests only
+    assert result["incremental"]["mode"] == "full"
+    assert without_incremental(result) == analyze(client, theirs)
+
+
+def test_changed_history_rebuilds_the_state(client):
+    export = generate_export(2000, seed=47)
+    analyze(client, export.iloc[500:], user_id="edited")
+
+    # One of the already analysed tests is gone
+    edited = export.drop(index=1500)
+    result = analyze(client, edited, user_id="edited")
+
+    assert result["incremental"]["mode"] == "full"
+    assert result["rowCount"] == analyze(client, edited)["rowCount"]
+
+
+def test_session_gap_change_runs_a_full_analysis(client):
+    export = generate_export(2000, seed=48)
+    analyze(client, export.iloc[500:], user_id="gap")
+
+    result = analyze(client, export, user_id="gap", session_gap_minutes="45")
+
+    assert result["incremental"]["mode"] == "full"
+    assert without_incremental(result) == analyze(client, export, session_gap_minutes="45")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# backend/test_instrumentation.py
+#
+# Per-stage instrumentation: every analyze request records its stages,
+# /metrics exposes them in the Prometheus text format, and Server-Timing
+# carries them on the response when enabled.
+#
+# Usage:
+#   python -m pytest test_instrumentation.py
+
+import re
+
+import main
+from instrumentation import StageMetrics, Trace
+from synthetic_export import export_csv_bytes
+
+PIPELINE_STAGES = ["preflight", "read_upload", "aggregates", "sessions", "core_stats", "clustering", "serialize"]
+
+
+def stage_count(metrics_text: str, stage: str) -> int:
+    match = re.search(rf'^analyze_stage_duration_seconds_count{{stage="{stage}"}} (\d+)$', metrics_text, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def test_metrics_count_each_stage_of_an_upload(client):
+    before = client.get("/metrics").text
+    response = client.post("/api/analyze", files={"file": ("export.csv", export_csv_bytes(1200, seed=111))})
+    after = client.get("/metrics")
+
+    assert response.status_code == 200, response.text
+    assert after.headers["content-type"].startswith("text/plain")
+    for stage in PIPELINE_STAGES:
+        assert stage_count(after.text, stage) == stage_count(before, stage) + 1, stage
+    assert "analyze_result_cache_misses_total" in after.text
+    assert "analyze_pool_completed_total" in after.text
+
+
+def test_server_timing_header(client, monkeypatch):
+    monkeypatch.setattr(main, "SERVER_TIMING", True)
+    response = client.post("/api/analyze", files={"file": ("export.csv", export_csv_bytes(1200, seed=112))})
+
+    spans = dict(part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+    assert set(PIPELINE_STAGES) <= set(spans)
+    assert all(float(duration) >= 0 for duration in spans.values())
+
+
+def test_server_timing_is_off_by_default(client, monkeypatch):
+    monkeypatch.setattr(main, "SERVER_TIMING", False)
+    response = client.post("/api/analyze", files={"file": ("export.csv", export_csv_bytes(1200, seed=113))})
+
+    assert "Server-Timing" not in response.headers
+
+
+def test_stage_metrics_histogram():
+    metrics = StageMetrics(buckets=(0.1, 1.0))
+    trace = Trace(metrics)
+    trace.add("parse", 0.05, rows=100, rss_delta=2048)
+    trace.add("parse", 0.5, rows=50)
+    with trace.span("render") as record:
+        record["rows"] = 7
+
+    text = metrics.render()
+    assert 'analyze_stage_duration_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'analyze_stage_duration_seconds_bucket{stage="parse",le="1.0"} 2' in text
+    assert 'analyze_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'analyze_stage_rows_total{stage="parse"} 150' in text
+    assert 'analyze_stage_rows_total{stage="render"} 7' in text
+    assert 'analyze_stage_rss_delta_bytes_count{stage="parse"} 1' in text
+    assert [span["name"] for span in trace.spans] == ["parse", "parse", "render"]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# backend/test_parser.py
+#
+# Chunked CSV parsing (parser.parse_csv_stream): the cleaned frame must not
+# depend on the chunk size, and the row ceiling and incremental cut-off
+# must work across chunk boundaries. The vectorised charStats decoder must
+# give the same counts as the pandas string-splitting reference, and the
+# cleaned frame must follow the storage plan in parser.py.
+#
+# Usage:
+#   python -m pytest test_parser.py
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import parser
+from synthetic_export import generate_export
+
+
+@pytest.fixture(scope="module")
+def csv_bytes():
+    return generate_export(4000, seed=71, malformed_rate=0.01).to_csv(index=False).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [97, 999, 4000, 100_000])
+def test_chunk_size_does_not_change_the_frame(csv_bytes, chunk_size):
+    expected = parser.parse_csv(csv_bytes)
+    parsed = parser.parse_csv_stream(io.BytesIO(csv_bytes), chunk_size=chunk_size)
+
+    pd.testing.assert_frame_equal(parsed.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_parsed_frame_is_clean_and_chronological(csv_bytes):
+    df = parser.parse_csv(csv_bytes)
+    raw = pd.read_csv(io.BytesIO(csv_bytes), on_bad_lines='skip')
+
+    assert 0 < len(df) < len(raw)  # malformed rows dropped
+    assert (df['wpm'] > 0).all()
+    assert df['acc'].between(0, 100).all()
+    assert df['timestamp'].is_monotonic_increasing
+    assert 'charStats' not in df.columns
+    np.testing.assert_array_equal(df['total_chars'], df['chars_correct'] + df['chars_incorrect'] + df['chars_extra'])
+
+
+def test_row_ceiling_stops_mid_file(csv_bytes):
+    with pytest.raises(parser.UploadTooLargeError):
+        parser.parse_csv_stream(io.BytesIO(csv_bytes), chunk_size=500, max_rows=1000)
+
+    assert len(parser.parse_csv_stream(io.BytesIO(csv_bytes), chunk_size=500, max_rows=10_000)) > 0
+
+
+def test_min_timestamp_keeps_only_newer_tests(csv_bytes):
+    df = parser.parse_csv(csv_bytes)
+    cutoff = int(df['timestamp'].iloc[len(df) // 2])
+    skipped = {"count": 0, "digest": 0}
+
+    newer = parser.parse_csv_stream(io.BytesIO(csv_bytes), chunk_size=300, min_timestamp=cutoff, skipped=skipped)
+
+    older = df[df['timestamp'] <= cutoff]
+    pd.testing.assert_frame_equal(newer.reset_index(drop=True),
+                                  df[df['timestamp'] > cutoff].reset_index(drop=True))
+    assert skipped["count"] == len(older)
+    assert skipped["digest"] == parser.tests_digest(older['timestamp'], older['wpm'], older['acc'])
+
+
+@pytest.mark.parametrize("values", [
+    ["10;2;0;1", "123456789;0;0;0", "0;0;0;0"],
+    ["10;2;0;1", "junk", "5;x;3;2", "1;2;3", "1;2;3;4;5", "", "-4;2;1;0", "1.5;2;0;0", " 7;1;0;0"],
+    ["1234567890;1;1;1", "99999999999;0;0;0", "3;\n;1;1", "4;4;4;4"],
+    [np.nan, "8;0;1;0", None],
+])
+def test_char_stats_fast_path_matches_slow_path(values):
+    char_stats = pd.Series(values, dtype=object)
+
+    expected = parser._decode_char_stats_slow(char_stats.fillna('0;0;0;0').astype(str))
+    np.testing.assert_array_equal(parser.decode_char_stats(char_stats), expected)
+
+
+def test_char_stats_of_a_whole_export():
+    export = generate_export(3000, seed=72)
+
+    decoded = parser.decode_char_stats(export['charStats'])
+
+    assert decoded.dtype == np.int32
+    np.testing.assert_array_equal(decoded, parser._decode_char_stats_slow(export['charStats'].fillna('0;0;0;0').astype(str)))
+
+
+def test_char_stats_values():
+    decoded = parser.decode_char_stats(pd.Series(["10;2;0;1", "junk", "5;x;3;2", np.nan, "99999999999;0;0;0"]))
+
+    np.testing.assert_array_equal(decoded, [[10, 2, 0, 1], [0, 0, 0, 0], [5, 0, 3, 2], [0, 0, 0, 0],
+                                            [np.iinfo(np.int32).max, 0, 0, 0]])
+
+
+def test_storage_plan(csv_bytes):
+    df = parser.parse_csv(csv_bytes)
+
+    expected = {'wpm': 'float64', 'acc': 'float64', 'consistency': 'float64', 'testDuration': 'float64',
+                'timestamp': 'int64', 'hour': 'uint8', 'day_of_week_num': 'uint8', 'month': 'int32',
+                'date': 'int32', 'year': 'int16', 'restartCount': 'int32', 'total_chars': 'int32',
+                **{col: 'int32' for col in parser.CHAR_STATS_COLUMNS}}
+    assert {col: str(df[col].dtype) for col in expected} == expected
+    assert list(df['day_of_week'].cat.categories) == parser.WEEKDAY_NAMES
+
+    # The compact codes carry the same calendar as the datetime column
+    np.testing.assert_array_equal(df['day_of_week'].cat.codes, df['day_of_week_num'])
+    np.testing.assert_array_equal(df['day_of_week'].astype(str), df['datetime'].dt.day_name())
+    np.testing.assert_array_equal(df['month'], df['datetime'].dt.to_period('M').array.asi8)
+    np.testing.assert_array_equal(df['date'], (df['datetime'] - pd.Timestamp(0)).dt.days)
+    assert parser.month_labels(df['month'].iloc[:1]) == [str(df['datetime'].iloc[0].to_period('M'))]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# backend/test_personas.py
+#
+# Persona clustering engines: method="auto" keeps the exact K-means fit
+# below MINIBATCH_MIN_ROWS, and the mini-batch engine finds the same
+# clusters as full K-means on clearly grouped histories.
+#
+# Usage:
+#   python -m pytest test_personas.py
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from analyser import clustering, parser
+from synthetic_export import generate_export
+
+# (wpm, acc, consistency) centres of the typing regimes in grouped_export
+REGIMES = np.array([[60, 94, 65], [120, 90, 72], [95, 99, 85], [85, 96, 60]])
+REGIME_SPREAD = np.array([6, 1, 4])
+
+
+def grouped_export(n_tests: int, seed: int):
+    """
+    Parsed synthetic export whose tests come from four distinct typing regimes.
+    """
+    export = generate_export(n_tests, seed=seed, malformed_rate=0)
+    rng = np.random.default_rng(seed)
+    regime = rng.integers(0, len(REGIMES), n_tests)
+    features = np.round(REGIMES[regime] + rng.normal(0, 1, (n_tests, 3)) * REGIME_SPREAD, 2)
+    export[clustering.FEATURE_COLUMNS] = features.clip([5, 40, 0], [250, 100, 100])
+    return parser.parse_csv(export.to_csv(index=False).encode())
+
+
+def renumbered(state: dict, order: np.ndarray) -> dict:
+    """
+    A persona state with cluster order[i] as cluster i.
+    """
+    return {**state, "centroids": state["centroids"][order],
+            "moments": {key: values[order] for key, values in state["moments"].items()}}
+
+
+def test_auto_is_exact_kmeans_below_threshold():
+    df = parser.parse_csv(generate_export(5000, seed=3).to_csv(index=False).encode())
+    features = clustering.feature_matrix(df)
+
+    state = clustering.fit_persona_state(features)
+
+    # Same clusters, numbered as KMeans numbers them (which the persona names follow)
+    labels = KMeans(n_clusters=4, random_state=clustering.RANDOM_STATE, n_init=10).fit(
+        StandardScaler().fit_transform(features)).labels_
+    np.testing.assert_array_equal(state["moments"]["count"], np.bincount(labels, minlength=4))
+    np.testing.assert_array_equal(state["centroids"], clustering.fit_persona_state(features, method="kmeans")["centroids"])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_engines_agree_on_grouped_exports(seed):
+    features = clustering.feature_matrix(grouped_export(30000, seed))
+    features_scaled = StandardScaler().fit_transform(features)
+
+    exact = clustering.fit_persona_model(features_scaled, method="kmeans")
+    fast = clustering.fit_persona_model(features_scaled, method="minibatch")
+
+    # Same assignments: every exact cluster is one mini-batch cluster
+    overlap = np.zeros((4, 4), dtype=np.int64)
+    np.add.at(overlap, (exact.labels_, fast.labels_), 1)
+    matching = overlap.argmax(axis=1)
+    assert sorted(matching) == [0, 1, 2, 3]
+    assert overlap[np.arange(4), matching].sum() == len(features)
+
+    # Same personas once the clusters carry the same numbers
+    exact_state = clustering.fit_persona_state(features, method="kmeans")
+    fast_state = renumbered(clustering.fit_persona_state(features, method="minibatch"), matching)
+    exact_personas = clustering.describe_personas(exact_state)["allPersonas"]
+    fast_personas = clustering.describe_personas(fast_state)["allPersonas"]
+
+    assert fast_personas == exact_personas
+
+def test_minibatch_is_deterministic():
+    features_scaled = StandardScaler().fit_transform(clustering.feature_matrix(grouped_export(20000, 5)))
+
+    first = clustering.fit_persona_model(features_scaled, method="minibatch")
+    second = clustering.fit_persona_model(features_scaled, method="minibatch")
+
+    np.testing.assert_array_equal(first.labels_, second.labels_)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# backend/test_ranges.py
+#
+# Year and date-range slicing: analysing a slice of a parsed export must
+# give the same result as uploading only the tests in that slice, and the
+# range boundaries follow whole UTC days.
+#
+# Usage:
+#   python -m pytest test_ranges.py
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import ranges
+from synthetic_export import generate_export
+
+# 2023-10-01 00:00 UTC in ms: the export spans the 2023/2024 boundary
+SPAN_START_MS = 1696118400000
+
+
+@pytest.fixture(scope="module")
+def export():
+    return generate_export(3000, seed=171, start_ms=SPAN_START_MS, malformed_rate=0)
+
+
+def analyze(client, export: pd.DataFrame, **form) -> dict:
+    response = client.post("/api/analyze", files={"file": ("export.csv", export.to_csv(index=False).encode())},
+                           data=form)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def rows_between(export: pd.DataFrame, start: str, end: str) -> pd.DataFrame:
+    """
+    The raw export rows taken on the days start..end (UTC), inclusive.
+    """
+    start_ms, end_ms = ranges.date_range(dt.date.fromisoformat(start), dt.date.fromisoformat(end))
+    return export[(export['timestamp'] >= start_ms) & (export['timestamp'] < end_ms)]
+
+
+def test_year_matches_uploading_that_year_alone(client, export):
+    result = analyze(client, export, year="2024")
+
+    assert result == analyze(client, rows_between(export, "2024-01-01", "2024-12-31"))
+
+
+def test_per_year_matches_each_year_alone(client, export):
+    years = analyze(client, export, per_year="true")["years"]
+
+    assert {"2023", "2024"} <= set(years)
+    for year, result in years.items():
+        assert result == analyze(client, rows_between(export, f"{year}-01-01", f"{year}-12-31")), year
+
+
+def test_date_range_includes_both_end_days(client, export):
+    result = analyze(client, export, start="2023-11-15", end="2024-01-10")
+
+    assert result == analyze(client, rows_between(export, "2023-11-15", "2024-01-10"))
+
+
+@pytest.mark.parametrize("form", [{"year": "2024", "start": "2024-01-01"}, {"start": "2024-02-01", "end": "2024-01-01"},
+                                  {"start": "01/02/2024"}, {"year": "10000"}, {"year": "1990"}])
+def test_bad_ranges_are_rejected(client, export, form):
+    response = client.post("/api/analyze", files={"file": ("export.csv", export.to_csv(index=False).encode())},
+                           data=form)
+
+    assert response.status_code == 400
+
+
+def test_range_rows_and_year_rows():
+    timestamps = np.array([ranges.year_range(2023)[1] - 1, ranges.year_range(2024)[0],
+                           ranges.year_range(2024)[1] - 1, ranges.year_range(2026)[0]])
+
+    assert ranges.year_rows(timestamps) == {2023: slice(0, 1), 2024: slice(1, 3), 2026: slice(3, 4)}
+    assert ranges.range_rows(timestamps, ranges.year_range(2024)) == slice(1, 3)
+    assert ranges.range_rows(timestamps, ranges.year_range(2025)) == slice(3, 3)
+    assert ranges.range_rows(timestamps, (None, None)) == slice(0, 4)
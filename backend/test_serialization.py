@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# backend/test_serialization.py
+#
+# Response encoding: serialization.dumps must produce the bytes Starlette's
+# JSONResponse would (with or without orjson), and large responses are
+# compressed only for clients that accept it.
+#
+# Usage:
+#   python -m pytest test_serialization.py
+
+import gzip
+import io
+
+import numpy as np
+import pytest
+from fastapi.responses import JSONResponse
+
+import pipeline
+import serialization
+from synthetic_export import export_csv_bytes
+
+
+@pytest.fixture(scope="module")
+def response_data():
+    return pipeline.analyze_export(io.BytesIO(export_csv_bytes(1500, seed=161)))
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_jsonresponse(response_data, use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    body = serialization.dumps(response_data)
+
+    assert body == JSONResponse(response_data).body
+    assert serialization.loads(body) == response_data
+
+
+def test_stdlib_fallback_accepts_numpy(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    data = {"count": np.int64(3), "mean": np.float64(1.5), "flags": np.array([1, 2]), "name": "Zoë"}
+
+    assert serialization.dumps(data) == '{"count":3,"mean":1.5,"flags":[1,2],"name":"Zoë"}'.encode()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None), ("identity", None), ("gzip", "gzip"), ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None), ("GZIP;q=0.5", "gzip"), ("gzip;q=bad", None),
+])
+def test_negotiate_encoding_gzip(header, expected, monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert serialization.negotiate_encoding(header) == expected
+
+
+def test_brotli_is_preferred_when_installed():
+    if serialization.brotli is None:
+        pytest.skip("brotli is not installed")
+    assert serialization.negotiate_encoding("gzip, br") == "br"
+    assert serialization.negotiate_encoding("gzip, br;q=0") == "gzip"
+
+
+def test_only_large_bodies_are_compressed(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    large = b'{"data":"' + b"x" * serialization.DEFAULT_COMPRESS_MIN_BYTES + b'"}'
+
+    small_response = serialization.compressed_response(b"{}", "gzip")
+    large_response = serialization.compressed_response(large, "gzip", {"X-Cache": "MISS"})
+
+    assert "content-encoding" not in small_response.headers
+    assert large_response.headers["content-encoding"] == "gzip"
+    assert large_response.headers["vary"] == "Accept-Encoding"
+    assert large_response.headers["x-cache"] == "MISS"
+    assert gzip.decompress(large_response.body) == large
+
+
+def test_compression_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv("RESPONSE_COMPRESS_MIN_BYTES", "0")
+    large = b"x" * (2 * serialization.DEFAULT_COMPRESS_MIN_BYTES)
+
+    response = serialization.compressed_response(large, "gzip")
+
+    assert response.body == large
+    assert "vary" not in response.headers
+
+
+def test_endpoint_gzips_for_accepting_clients(client):
+    upload = export_csv_bytes(3000, seed=162)
+
+    compressed = client.post("/api/analyze", files={"file": ("export.csv", upload)},
+                             headers={"Accept-Encoding": "gzip"})
+    plain = client.post("/api/analyze", files={"file": ("export.csv", upload)},
+                        headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
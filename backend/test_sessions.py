@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# backend/test_sessions.py
+#
+# Session index (sessions.build_session_index): every per-session array must
+# match grouping the frame by session, and a session's rows are one lookup.
+#
+# Usage:
+#   python -m pytest test_sessions.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import parser, sessions
+from synthetic_export import generate_export
+
+
+@pytest.fixture(scope="module")
+def df():
+    return parser.parse_csv(generate_export(3000, seed=51).to_csv(index=False).encode())
+
+
+@pytest.mark.parametrize("gap_minutes", [5, sessions.DEFAULT_SESSION_GAP_MINUTES, 120])
+def test_index_matches_groupby(df, gap_minutes):
+    index = sessions.build_session_index(df, gap_minutes)
+
+    minutes_since_last = df['timestamp'].diff() / 60_000
+    session = (minutes_since_last > gap_minutes).cumsum().to_numpy()
+    grouped = df.groupby(session, sort=True)
+
+    assert index["gap_minutes"] == gap_minutes
+    np.testing.assert_array_equal(index["lengths"], grouped.size())
+    np.testing.assert_array_equal(index["ends"] - index["starts"], index["lengths"])
+    np.testing.assert_array_equal(index["start_timestamp"], grouped['timestamp'].min())
+    np.testing.assert_array_equal(index["end_timestamp"], grouped['timestamp'].max())
+    np.testing.assert_allclose(index["wpm_sum"], grouped['wpm'].sum())
+    np.testing.assert_array_equal(index["wpm_max"], grouped['wpm'].max())
+    np.testing.assert_allclose(index["acc_sum"], grouped['acc'].sum())
+    np.testing.assert_array_equal(index["restart_sum"], grouped['restartCount'].sum())
+
+    # Peak position: first test in the session with the session's best WPM
+    peaks = grouped['wpm'].apply(lambda wpm: int(np.argmax(wpm.to_numpy())) + 1)
+    np.testing.assert_array_equal(index["peak_position"], peaks)
+
+
+def test_session_rows(df):
+    index = sessions.build_session_index(df)
+    session = len(index["starts"]) // 2
+
+    rows = df.iloc[sessions.session_rows(index, session)]
+
+    assert len(rows) == index["lengths"][session]
+    assert rows['timestamp'].iloc[0] == index["start_timestamp"][session]
+    assert rows['wpm'].max() == index["wpm_max"][session]
+
+
+def test_wider_gap_merges_sessions(df):
+    narrow = sessions.build_session_index(df, 5)
+    wide = sessions.build_session_index(df, 120)
+
+    assert len(wide["starts"]) < len(narrow["starts"])
+    assert set(wide["starts"]) <= set(narrow["starts"])
+
+
+def test_optional_columns_are_skipped(df):
+    index = sessions.build_session_index(df[['timestamp', 'wpm']])
+
+    assert "acc_sum" not in index
+    assert "restart_sum" not in index
+
+
+def test_empty_frame():
+    index = sessions.build_session_index(pd.DataFrame({'timestamp': [], 'wpm': []}))
+
+    assert all(len(values) == 0 for key, values in index.items() if key != "gap_minutes")
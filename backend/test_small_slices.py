@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# backend/test_small_slices.py
+#
+# Years and date ranges with fewer tests than persona clusters (e.g. a
+# year with 2 tests) must still analyse instead of failing the request.
+#
+# Usage:
+#   python test_small_slices.py        (or: python -m pytest test_small_slices.py)
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi.testclient import TestClient
+
+import main
+from synthetic_export import generate_export
+
+# 2023-06-01 and 2024-01-01 00:00 UTC in ms
+SPARSE_YEAR_START_MS = 1685577600000
+FULL_YEAR_START_MS = 1704067200000
+
+
+def export_with_sparse_year(sparse_tests: int) -> bytes:
+    """
+    CSV export with `sparse_tests` valid tests in 2023 and a few hundred in 2024.
+    """
+    sparse = generate_export(sparse_tests, seed=1, start_ms=SPARSE_YEAR_START_MS, malformed_rate=0)
+    full = generate_export(300, seed=2, start_ms=FULL_YEAR_START_MS, malformed_rate=0)
+    return pd.concat([full, sparse], ignore_index=True).to_csv(index=False).encode()
+
+
+def analyze(data: bytes, **form) -> dict:
+    client = TestClient(main.app)
+    response = client.post("/api/analyze", files={"file": ("export.csv", data, "text/csv")}, data=form)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_sparse_year():
+    for sparse_tests in (1, 2, 3):
+        result = analyze(export_with_sparse_year(sparse_tests), year="2023")
+        assert result["rowCount"] == sparse_tests
+        personas = result["persona"]["allPersonas"]
+        assert len(personas) == sparse_tests
+        assert sum(persona["count"] for persona in personas) == sparse_tests
+
+
+def test_sparse_year_per_year():
+    result = analyze(export_with_sparse_year(2), per_year="true")
+    assert set(result["years"]) == {"2023", "2024"}
+    assert result["years"]["2023"]["rowCount"] == 2
+    assert len(result["years"]["2023"]["persona"]["allPersonas"]) == 2
+    assert len(result["years"]["2024"]["persona"]["allPersonas"]) == 4
+
+
+def test_sparse_date_range():
+    result = analyze(export_with_sparse_year(3), start="2023-01-01", end="2023-12-31")
+    assert result["rowCount"] == 3
+
+
+if __name__ == "__main__":
+    test_sparse_year()
+    test_sparse_year_per_year()
+    test_sparse_date_range()
+    print("✅ Small slices analysed successfully")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# backend/test_startup.py
+#
+# Startup: importing the app leaves sklearn unimported, and the server's
+# pre-warm pays for it (and the first KMeans fit) before the first upload.
+#
+# Usage:
+#   python -m pytest test_startup.py
+
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import main
+import pipeline
+
+
+def test_import_does_not_load_sklearn():
+    check = "import sys, main; assert 'sklearn' not in sys.modules, 'sklearn was imported'; print(main.startup_timings['import'])"
+    result = subprocess.run([sys.executable, "-c", check], cwd=Path(__file__).parent, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout) > 0
+
+
+def test_prewarm_runs_the_whole_pipeline():
+    seconds = pipeline.prewarm(n_tests=200)
+
+    assert seconds > 0
+    assert "sklearn.cluster" in sys.modules
+
+
+def test_lifespan_prewarms_before_serving(monkeypatch):
+    monkeypatch.setattr(main, "PREWARM", True)
+    monkeypatch.setattr(main, "startup_timings", {"import": 0.1})
+    # The lifespan shuts its pools down on exit; keep the app's own for other tests
+    monkeypatch.setattr(main, "analysis_pool", pipeline.AnalysisPool("thread", max_workers=1))
+    monkeypatch.setattr(main, "batch_executor", None)
+
+    with TestClient(main.app) as client:
+        assert main.startup_timings["prewarm"] > 0
+        assert 'app_startup_seconds{phase="prewarm"}' in client.get("/metrics").text
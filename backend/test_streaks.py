@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# backend/test_streaks.py
+#
+# Streaks on integer day ordinals: aggregates.streak_state must agree with
+# walking the calendar day by day, continuing from a prior state must match
+# computing over all days at once, and the yearInNumbers fields must match
+# the export's own UTC dates.
+#
+# Usage:
+#   python -m pytest test_streaks.py
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import aggregates, core_stats, parser
+from synthetic_export import export_csv_bytes, generate_export
+
+
+def walk_days(days) -> dict:
+    """
+    Streak state the slow way: one step per active day.
+    """
+    current = longest = longest_gap = 0
+    previous = None
+    for day in days:
+        if previous is not None and day - previous > 1:
+            longest_gap = max(longest_gap, day - previous - 1)
+        current = current + 1 if previous is not None and day - previous == 1 else 1
+        longest = max(longest, current)
+        previous = day
+    return {"lastDay": previous, "current": current, "longest": longest, "longestGap": longest_gap}
+
+
+def random_days(seed: int, n: int = 300) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Mostly consecutive days with the odd break of up to a few weeks
+    steps = rng.choice([1, 1, 1, 2, 3, 9, 30], size=n)
+    return 19000 + np.cumsum(steps)
+
+
+@pytest.mark.parametrize("days", [[19000], [19000, 19001, 19002], [19000, 19005], [19000, 19001, 19010, 19011, 19012]])
+def test_streak_state_small_cases(days):
+    assert aggregates.streak_state(np.array(days)) == walk_days(days)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_streak_state_matches_walk(seed):
+    days = random_days(seed)
+
+    assert aggregates.streak_state(days) == walk_days(days.tolist())
+
+
+def test_empty_days():
+    assert aggregates.streak_state(np.array([], dtype=np.int32)) == {"lastDay": None, "current": 0, "longest": 0,
+                                                                     "longestGap": 0}
+
+
+@pytest.mark.parametrize("split", [1, 150, 299])
+def test_continuing_from_prior_matches_all_days(split):
+    days = random_days(7)
+
+    prior = aggregates.streak_state(days[:split])
+    # Days already counted in the prior state are skipped
+    continued = aggregates.streak_state(days[split - 1:], prior)
+
+    assert continued == aggregates.streak_state(days)
+
+
+def test_run_continues_across_the_split():
+    prior = aggregates.streak_state(np.array([19000, 19001, 19002]))
+
+    assert aggregates.streak_state(np.array([19003, 19004]), prior)["current"] == 5
+    assert aggregates.streak_state(np.array([19006]), prior) == {"lastDay": 19006, "current": 1, "longest": 3,
+                                                                  "longestGap": 3}
+
+
+def test_distinct_days():
+    days = np.array([5, 5, 6, 9, 9, 9, 10], dtype=np.int32)
+
+    np.testing.assert_array_equal(aggregates.distinct_days(days), [5, 6, 9, 10])
+    assert len(aggregates.distinct_days(days[:0])) == 0
+
+
+def test_parsed_dates_are_utc_day_ordinals():
+    export = generate_export(500, seed=191, malformed_rate=0)
+    df = parser.parse_csv(export.to_csv(index=False).encode())
+    utc_days = pd.to_datetime(export['timestamp'], unit='ms', utc=True).dt.date
+
+    assert df['date'].dtype == np.int32
+    assert parser.day_labels(df['date']) == sorted(day.isoformat() for day in utc_days)
+
+
+def test_year_in_numbers_matches_the_calendar(client):
+    export = generate_export(2000, seed=192, malformed_rate=0)
+    dates = sorted(set(pd.to_datetime(export['timestamp'], unit='ms', utc=True).dt.date))
+    ordinals = [day.toordinal() for day in dates]
+    expected = walk_days(ordinals)
+
+    response = client.post("/api/analyze", files={"file": ("export.csv", export.to_csv(index=False).encode())})
+    numbers = response.json()["yearInNumbers"]
+
+    assert numbers["activeDays"] == len(dates)
+    assert numbers["totalDays"] == (dates[-1] - dates[0]).days + 1
+    assert numbers["dateRange"] == {"start": dates[0].isoformat(), "end": dates[-1].isoformat()}
+    assert numbers["longestStreak"] == expected["longest"]
+    assert numbers["currentStreak"] == expected["current"]
+    assert numbers["longestGap"] == expected["longestGap"]
+
+
+def test_calculate_longest_streak():
+    df = parser.parse_csv(export_csv_bytes(800, seed=193))
+    dates = sorted({dt.date.fromisoformat(label) for label in parser.day_labels(df['date'])})
+
+    assert core_stats.calculate_longest_streak(df) == walk_days([day.toordinal() for day in dates])["longest"]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# backend/test_streaming.py
+#
+# Streaming responses (stream=ndjson / stream=sse): merging every partial
+# event must rebuild exactly the plain JSON response, summary first and a
+# single complete (or error) event last.
+#
+# Usage:
+#   python -m pytest test_streaming.py
+
+import json
+
+import pytest
+
+from synthetic_export import export_csv_bytes
+
+
+def ndjson_events(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def sse_events(response) -> list:
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append({"event": lines["event"], **json.loads(lines["data"])})
+    return events
+
+
+def merged(events: list) -> dict:
+    data = {}
+    for event in events:
+        if event["event"] == "partial":
+            data.update(event["data"])
+    return data
+
+
+def post(client, upload: bytes, headers=None, **form):
+    return client.post("/api/analyze", files={"file": ("export.csv", upload)}, data=form, headers=headers or {})
+
+
+@pytest.mark.parametrize("seed, form, headers, parse", [
+    (141, {"stream": "ndjson"}, None, ndjson_events),
+    (142, {"stream": "sse"}, None, sse_events),
+    (143, {}, {"Accept": "application/x-ndjson"}, ndjson_events),
+    (144, {}, {"Accept": "text/event-stream"}, sse_events),
+])
+def test_partials_rebuild_the_plain_response(client, seed, form, headers, parse):
+    upload = export_csv_bytes(1500, seed=seed)
+
+    response = post(client, upload, headers, **form)
+    events = parse(response)
+
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert events[0]["section"] == "summary"
+    assert events[-1] == {"event": "complete", "cache": "MISS"}
+    assert all(event["event"] == "partial" for event in events[:-1])
+    assert {event["section"] for event in events[:-1]} >= {"summary", "core", "persona", "warmup"}
+
+    # The streamed result was cached for plain requests too
+    plain = post(client, upload)
+    assert plain.headers["X-Cache"] == "HIT"
+    assert merged(events) == plain.json()
+
+
+def test_cache_hit_streams_one_partial(client):
+    upload = export_csv_bytes(1200, seed=151)
+    expected = post(client, upload).json()
+
+    events = ndjson_events(post(client, upload, stream="ndjson"))
+
+    assert [(event["event"], event.get("section")) for event in events] == [("partial", "all"), ("complete", None)]
+    assert events[0]["data"] == expected
+    assert events[-1]["cache"] == "HIT"
+
+
+def test_failure_becomes_an_error_event(client):
+    # Passes the header sniff but has no valid tests once cleaned
+    upload = b"wpm,acc,timestamp\n0,50,1700000000000\n0,60,1700000001000\n"
+
+    events = ndjson_events(post(client, upload, stream="ndjson"))
+    plain = post(client, upload)
+
+    assert plain.status_code == 400
+    assert events[-1] == {"event": "error", "status": 400, "detail": plain.json()["detail"]}
+
+
+def test_unknown_stream_mode(client):
+    assert post(client, export_csv_bytes(100, seed=152), stream="xml").status_code == 400
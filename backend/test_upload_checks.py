@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# backend/test_upload_checks.py
+#
+# Pre-flight checks on /api/analyze: a wrong file is turned away with a
+# 4xx before it's parsed, and a good one (in any format, with or without
+# the optional columns) is left intact for the parser.
+#
+# Usage:
+#   python -m pytest test_upload_checks.py
+
+import io
+
+import pytest
+
+import main
+from analyser import parser
+from synthetic_export import generate_export
+from test_upload_formats import FORMAT_SUFFIXES, encode_export
+
+
+@pytest.fixture(scope="module")
+def export():
+    return generate_export(1500, seed=31)
+
+
+def analyze(client, name: str, data: bytes, **form):
+    return client.post("/api/analyze", files={"file": (name, data)}, data=form)
+
+
+@pytest.mark.parametrize("file_format", list(FORMAT_SUFFIXES))
+def test_sniff_upload_leaves_upload_open(export, file_format):
+    upload = io.BytesIO(encode_export(export, file_format))
+    info = parser.sniff_upload(upload, file_format)
+
+    assert 'wpm' in info["columns"]
+    assert not upload.closed
+    assert upload.tell() == 0
+
+
+def test_zst_round_trip(client, export):
+    expected = analyze(client, "export.csv", encode_export(export, 'csv'))
+    response = analyze(client, "export.csv.zst", encode_export(export, 'csv.zst'))
+
+    assert response.status_code == 200, response.text
+    assert response.json() == expected.json()
+
+
+def test_zst_state_rebuild(client, export):
+    unrelated = generate_export(700, seed=32, start_ms=1700000000000)
+
+    first = analyze(client, "export.csv.zst", encode_export(export, 'csv.zst'), user_id="checks-zst")
+    assert first.status_code == 200, first.text
+
+    # The incremental attempt rejects the history, rewinds the upload and parses it in full
+    second = analyze(client, "export.csv.zst", encode_export(unrelated, 'csv.zst'), user_id="checks-zst")
+    assert second.status_code == 200, second.text
+    assert second.json()["incremental"]["mode"] == "full"
+
+
+@pytest.mark.parametrize("missing", [['consistency'], ['restartCount'], ['testDuration'],
+                                     ['consistency', 'restartCount', 'testDuration', 'charStats', 'mode']])
+def test_optional_columns_may_be_missing(client, export, missing):
+    response = analyze(client, "export.csv", export.drop(columns=missing).to_csv(index=False).encode())
+
+    assert response.status_code == 200, response.text
+    assert response.json()["rowCount"] == len(parser.parse_csv(encode_export(export, 'csv')))
+
+
+@pytest.mark.parametrize("missing", ['wpm', 'acc', 'timestamp'])
+def test_required_columns_are_checked_up_front(client, export, missing):
+    response = analyze(client, "export.csv", export.drop(columns=[missing]).to_csv(index=False).encode())
+
+    assert response.status_code == 400
+    assert missing in response.json()["detail"]
+
+
+@pytest.mark.parametrize("name, data", [
+    ("export.csv", b""),
+    ("export.csv", b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR"),
+    ("export.csv", b"wpm,acc,timestamp\nfast,sure,yesterday\n"),
+    ("export.csv.gz", b"not gzip at all"),
+    ("export.csv.zst", b"not zstd at all"),
+    ("export.parquet", b"not parquet at all"),
+    ("export.txt", b"wpm,acc,timestamp\n"),
+])
+def test_bad_uploads_are_rejected(client, name, data):
+    response = analyze(client, name, data)
+
+    assert response.status_code == 400, response.text
+
+
+def test_row_ceiling(client, export, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_ROWS", 1000)
+    response = analyze(client, "export.csv", encode_export(generate_export(1200, seed=33), 'csv'))
+
+    assert response.status_code == 413
+    assert "1,000" in response.json()["detail"]
+
+
+def test_parquet_row_ceiling_from_metadata(export):
+    upload = io.BytesIO(encode_export(export, 'parquet'))
+
+    with pytest.raises(parser.UploadTooLargeError):
+        parser.sniff_upload(upload, 'parquet', max_rows=len(export) - 1)
+
+
+def test_byte_ceiling(client, export, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 1024)
+    response = analyze(client, "export.csv", encode_export(export, 'csv'))
+
+    assert response.status_code == 413
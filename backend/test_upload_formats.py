@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# backend/test_upload_formats.py
+#
+# Every upload format (CSV, .csv.gz, .csv.zst, Parquet, Arrow IPC) must parse
+# to the same tests as the plain CSV and leave the upload open, since the
+# API rewinds it after the pre-flight check and after an incremental attempt.
+#
+# Usage:
+#   python -m pytest test_upload_formats.py
+
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from analyser import parser
+from synthetic_export import generate_export
+
+# Both are optional extras (requirements-optional.txt)
+pa = pytest.importorskip("pyarrow")
+zstandard = pytest.importorskip("zstandard")
+
+FORMAT_SUFFIXES = {'csv': '.csv', 'csv.gz': '.csv.gz', 'csv.zst': '.csv.zst', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def encode_export(export: pd.DataFrame, file_format: str) -> bytes:
+    """
+    An export as the bytes a user would upload in `file_format`.
+    """
+    csv_bytes = export.to_csv(index=False).encode()
+    if file_format == 'csv':
+        return csv_bytes
+    if file_format == 'csv.gz':
+        return gzip.compress(csv_bytes)
+    if file_format == 'csv.zst':
+        return zstandard.ZstdCompressor().compress(csv_bytes)
+
+    # Typed formats carry the analysed columns with their real types
+    table = pa.Table.from_pandas(export[parser.ANALYSIS_COLUMNS], preserve_index=False)
+    buffer = io.BytesIO()
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, buffer)
+    else:
+        with pa.ipc.new_file(buffer, table.schema) as writer:
+            writer.write_table(table)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def export():
+    return generate_export(3000, seed=11)
+
+
+@pytest.mark.parametrize("file_format", list(FORMAT_SUFFIXES))
+def test_parse_upload_matches_csv(export, file_format):
+    expected = parser.parse_csv(encode_export(export, 'csv'))
+
+    upload = io.BytesIO(encode_export(export, file_format))
+    parsed = parser.parse_upload(upload, file_format, chunk_size=700)
+
+    assert not upload.closed
+    upload.seek(0)
+    pd.testing.assert_frame_equal(parsed.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_index_type=False)
+
+
+@pytest.mark.parametrize("file_format", list(FORMAT_SUFFIXES))
+def test_parse_upload_leaves_upload_open_after_incremental_parse(export, file_format):
+    upload = io.BytesIO(encode_export(export, file_format))
+    skipped = {}
+    parser.parse_upload(upload, file_format, min_timestamp=int(export['timestamp'].median()), skipped=skipped)
+
+    # main.analysis_events rewinds and re-parses when the history doesn't match
+    assert not upload.closed
+    upload.seek(0)
+    reparsed = parser.parse_upload(upload, file_format)
+    assert skipped["count"] > 0
+    assert len(reparsed) == len(parser.parse_csv(encode_export(export, 'csv')))
+
+
+@pytest.mark.parametrize("file_format", ['csv.gz', 'parquet', 'arrow'])
+def test_analyze_endpoint_matches_csv(client, export, file_format):
+    expected = client.post("/api/analyze", files={"file": ("export.csv", encode_export(export, 'csv'))})
+    response = client.post("/api/analyze",
+                           files={"file": ("export" + FORMAT_SUFFIXES[file_format], encode_export(export, file_format))})
+
+    assert expected.status_code == 200, expected.text
+    assert response.status_code == 200, response.text
+    assert response.json() == expected.json()
+
+
+@pytest.mark.parametrize("file_format", ['csv.gz', 'parquet', 'arrow'])
+def test_analyze_endpoint_rebuilds_state_from_any_format(client, file_format):
+    user_form = {"user_id": f"formats-{file_format}"}
+    first = generate_export(800, seed=21)
+    unrelated = generate_export(600, seed=22, start_ms=1700000000000)
+    name = "export" + FORMAT_SUFFIXES[file_format]
+
+    response = client.post("/api/analyze", files={"file": (name, encode_export(first, file_format))}, data=user_form)
+    assert response.status_code == 200, response.text
+
+    # Not a continuation of the stored history: the upload is rewound and analysed in full
+    response = client.post("/api/analyze", files={"file": (name, encode_export(unrelated, file_format))}, data=user_form)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["incremental"]["mode"] == "full"
+    assert result["rowCount"] == len(parser.parse_csv(encode_export(unrelated, 'csv')))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# backend/test_warmup.py
+#
+# Vectorised warmup slide (warmup.compute_warmup): the same numbers as the
+# original groupby/apply version, whether the frame is sorted or not, and
+# session summaries of split histories merge into the whole.
+#
+# Usage:
+#   python -m pytest test_warmup.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyser import parser, sessions, warmup
+from synthetic_export import generate_export
+
+
+def groupby_warmup(df: pd.DataFrame) -> dict:
+    """
+    The numbers the warmup slide was first computed with, by grouping the frame.
+    """
+    df = df.sort_values('timestamp').reset_index(drop=True)
+    session_id = (df['timestamp'].diff() / 60_000 > 30).cumsum()
+    test_in_session = df.groupby(session_id).cumcount() + 1
+    session_size = df.groupby(session_id)['wpm'].transform('size')
+
+    long_sessions = df[session_size >= 3]
+    peaks = long_sessions.groupby(session_id[session_size >= 3]).apply(
+        lambda session: test_in_session[session['wpm'].idxmax()])
+    curve = df['wpm'][test_in_session <= 10].groupby(test_in_session).agg(['mean', 'count'])
+
+    return {
+        "coldStartWpm": round(float(df['wpm'][test_in_session == 1].mean()), 1),
+        "warmedUpWpm": round(float(df['wpm'][test_in_session >= 4].mean()), 1),
+        "testsUntilPeak": round(float(peaks.mean()), 1),
+        "medianTestsUntilPeak": int(peaks.median()),
+        "totalSessions": int(session_id.nunique()),
+        "avgTestsPerSession": round(float(session_size.groupby(session_id).first().mean()), 1),
+        "longestSession": int(session_size.max()),
+        "warmupCurve": [{"testNumber": int(position), "avgWpm": round(float(row['mean']), 1),
+                         "sampleSize": int(row['count'])} for position, row in curve.iterrows()],
+    }
+
+
+def parsed_export(n_tests: int, seed: int) -> pd.DataFrame:
+    return parser.parse_csv(generate_export(n_tests, seed=seed).to_csv(index=False).encode())
+
+
+@pytest.mark.parametrize("n_tests, seed", [(5, 121), (300, 122), (5000, 123)])
+def test_matches_groupby_version(n_tests, seed):
+    df = parsed_export(n_tests, seed)
+
+    result = warmup.compute_warmup(df)
+
+    assert {key: result[key] for key in groupby_warmup(df)} == groupby_warmup(df)
+
+
+def test_unsorted_frame_and_shared_index_agree():
+    df = parsed_export(2000, 124)
+    shuffled = df.sample(frac=1, random_state=0)
+
+    expected = warmup.compute_warmup(df)
+    assert warmup.compute_warmup(shuffled[['timestamp', 'wpm']]) == expected
+    assert warmup.compute_warmup(df, sessions.build_session_index(df)) == expected
+
+
+def test_split_summaries_merge_into_the_whole():
+    df = parsed_export(3000, 125)
+    closed, open_session = warmup.split_open_session(df)
+
+    merged = warmup.merge_session_summaries(warmup.summarize_sessions(closed), warmup.summarize_sessions(open_session))
+
+    assert warmup.describe_warmup(merged) == warmup.compute_warmup(df)
+    np.testing.assert_array_equal(merged["curve_count"], warmup.summarize_sessions(df)["curve_count"])
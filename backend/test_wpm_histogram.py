@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# backend/test_wpm_histogram.py
+#
+# WPM histogram (aggregates.wpm_histogram): quantiles, threshold counts and
+# the clutch factor read from it must match the same numbers taken over
+# the raw tests, for a whole export and for merged histograms.
+#
+# Usage:
+#   python -m pytest test_wpm_histogram.py
+
+import numpy as np
+import pytest
+
+from analyser import aggregates, parser
+from synthetic_export import generate_export
+
+QUANTILES = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+
+def raw_clutch(wpm: np.ndarray, acc: np.ndarray) -> tuple:
+    fast = wpm >= np.quantile(wpm, 0.9)
+    slow = wpm <= np.quantile(wpm, 0.1)
+    return acc[fast].mean(), acc[slow].mean()
+
+
+@pytest.fixture(scope="module")
+def tests():
+    df = parser.parse_csv(generate_export(5000, seed=61).to_csv(index=False).encode())
+    return df['wpm'].to_numpy(dtype=np.float64), df['acc'].to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize("n_tests", [1, 2, 7, 5000])
+def test_quantiles_match_numpy(tests, n_tests):
+    wpm, acc = tests[0][:n_tests], tests[1][:n_tests]
+    histogram = aggregates.wpm_histogram(wpm, acc)
+
+    for q in QUANTILES:
+        assert aggregates.histogram_quantile(histogram, q) == pytest.approx(np.quantile(wpm, q), abs=1e-9)
+
+
+def test_fine_values_stay_within_a_bin():
+    wpm = np.random.default_rng(62).uniform(20, 150, 3000)
+    histogram = aggregates.wpm_histogram(wpm, np.full(len(wpm), 95.0))
+
+    for q in QUANTILES:
+        assert aggregates.histogram_quantile(histogram, q) == pytest.approx(np.quantile(wpm, q), abs=0.005)
+
+
+def test_sparse_histogram_matches_dense():
+    # An outlier more than MAX_DENSE_WPM_BINS bins away switches to the sparse (np.unique) layout
+    wpm = np.array([40.5, 41.25, 41.25, 60.0, 99.99, 100.0, 20000.0])
+    histogram = aggregates.wpm_histogram(wpm, np.arange(len(wpm), dtype=np.float64))
+
+    np.testing.assert_array_equal(histogram["wpm"], np.unique(wpm))
+    np.testing.assert_array_equal(histogram["count"], [1, 2, 1, 1, 1, 1])
+    for q in QUANTILES:
+        assert aggregates.histogram_quantile(histogram, q) == pytest.approx(np.quantile(wpm, q))
+
+
+def test_threshold_counts(tests):
+    wpm, acc = tests
+    histogram = aggregates.wpm_histogram(wpm, acc)
+
+    for threshold in aggregates.WPM_THRESHOLDS + [float(np.median(wpm)), float(wpm.max())]:
+        assert aggregates.count_at_least(histogram, threshold) == int((wpm >= threshold).sum())
+
+
+def test_clutch_factor_matches_raw_tests(tests):
+    wpm, acc = tests
+
+    assert aggregates.clutch_accuracies(aggregates.wpm_histogram(wpm, acc)) == pytest.approx(raw_clutch(wpm, acc))
+
+
+def test_merged_histograms_match_one_pass(tests):
+    wpm, acc = tests
+    whole = aggregates.wpm_histogram(wpm, acc)
+    merged = aggregates.merge_wpm_histograms(aggregates.wpm_histogram(wpm[:1234], acc[:1234]),
+                                             aggregates.wpm_histogram(wpm[1234:], acc[1234:]))
+
+    np.testing.assert_array_equal(merged["bin"], whole["bin"])
+    np.testing.assert_array_equal(merged["count"], whole["count"])
+    np.testing.assert_allclose(merged["acc_sum"], whole["acc_sum"])
+    assert aggregates.clutch_accuracies(merged) == pytest.approx(raw_clutch(wpm, acc))
+
+
+def test_compute_aggregates_clutch_comes_from_the_histogram():
+    df = parser.parse_csv(generate_export(3000, seed=63).to_csv(index=False).encode())
+    aggs = aggregates.compute_aggregates(df)
+
+    fast, slow = aggregates.clutch_accuracies(aggs["wpm_histogram"])
+    assert aggs["fast_acc_mean"] == fast
+    assert aggs["slow_acc_mean"] == slow
@@ -2,7 +2,7 @@
 
 import { motion, AnimatePresence } from "framer-motion"
 import { useEffect, useState } from "react"
-import { analyzeTypingData, type WrappedData } from "@/lib/api"
+import { analyzeTypingDataStream, type WrappedData } from "@/lib/api"
 
 const processingMessages = [
   "Crunching your keystrokes...",
@@ -50,8 +50,12 @@ export function ProcessingScreen({ file, onComplete, onError }: ProcessingScreen
       setMessageIndex((prev) => (prev + 1) % processingMessages.length)
     }, 700)
 
-    // Call the actual API
-    analyzeTypingData(file)
+    // Call the actual API; each streamed slide moves the bar forward
+    let sectionsReceived = 0
+    analyzeTypingDataStream(file, () => {
+      sectionsReceived += 1
+      setProgress((prev) => Math.max(prev, Math.min(95, sectionsReceived * 13)))
+    })
       .then((data) => {
         setProgress(100)
         setTimeout(() => onComplete(data), 500)
@@ -20,6 +20,8 @@ export interface WrappedData {
     activeDays: number;
     totalCharacters: number;
     longestStreak: number;
+    currentStreak: number;  // Streak the export ends on
+    longestGap: number;     // Most days in a row without a test
   };
   
   // Peak Performance slide
@@ -187,11 +189,31 @@ export interface WrappedData {
     consistencyRating: string;
     wpmStdDev: number;
   };
+
+  // One full result per calendar year (only when requested with perYear)
+  years?: Record<string, WrappedData>;
+}
+
+// Optional date filters: a calendar year or a start/end day (YYYY-MM-DD),
+// plus perYear for a result per year side by side
+export interface AnalysisOptions {
+  year?: number;
+  start?: string;
+  end?: string;
+  perYear?: boolean;
+}
+
+function appendOptions(formData: FormData, options: AnalysisOptions) {
+  if (options.year !== undefined) formData.append('year', String(options.year));
+  if (options.start) formData.append('start', options.start);
+  if (options.end) formData.append('end', options.end);
+  if (options.perYear) formData.append('per_year', 'true');
 }
 
-export async function analyzeTypingData(file: File): Promise<WrappedData> {
+export async function analyzeTypingData(file: File, options: AnalysisOptions = {}): Promise<WrappedData> {
   const formData = new FormData();
   formData.append('file', file);
+  appendOptions(formData, options);
 
   const response = await fetch(`${API_URL}/api/analyze`, {
     method: 'POST',
@@ -206,6 +228,107 @@ export async function analyzeTypingData(file: File): Promise<WrappedData> {
   return response.json();
 }
 
+// Sections the backend streams, in the order they usually arrive
+export type StreamSection =
+  | 'summary'
+  | 'core'
+  | 'journey'
+  | 'timing'
+  | 'warmup'
+  | 'comparisons'
+  | 'persona'
+  | 'years'
+  | 'incremental'
+  | 'all';
+
+type StreamEvent =
+  | { event: 'partial'; section: StreamSection; data: Partial<WrappedData> }
+  | { event: 'complete'; cache: string }
+  | { event: 'error'; status: number; detail: string };
+
+// Streams the analysis as NDJSON: each slide's data arrives as soon as its
+// module finishes, so callers can react before the slowest one (personas)
+export async function analyzeTypingDataStream(
+  file: File,
+  onSection?: (section: StreamSection, data: Partial<WrappedData>) => void,
+  options: AnalysisOptions = {}
+): Promise<WrappedData> {
+  const formData = new FormData();
+  formData.append('file', file);
+  formData.append('stream', 'ndjson');
+  appendOptions(formData, options);
+
+  const response = await fetch(`${API_URL}/api/analyze`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Failed to analyze data');
+  }
+
+  if (!response.body) {
+    // No streaming support: fall back to reading the whole body
+    return mergeStreamEvents(await response.text(), onSection);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const result: Partial<WrappedData> = {};
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+
+    const lines = buffer.split('\n');
+    buffer = done ? '' : lines.pop() ?? '';
+    for (const line of lines) {
+      if (applyStreamEvent(line, result, onSection)) {
+        return result as WrappedData;
+      }
+    }
+    if (done) break;
+  }
+
+  throw new Error('Analysis stream ended unexpectedly');
+}
+
+function mergeStreamEvents(
+  text: string,
+  onSection?: (section: StreamSection, data: Partial<WrappedData>) => void
+): WrappedData {
+  const result: Partial<WrappedData> = {};
+  for (const line of text.split('\n')) {
+    if (applyStreamEvent(line, result, onSection)) {
+      return result as WrappedData;
+    }
+  }
+  throw new Error('Analysis stream ended unexpectedly');
+}
+
+// Returns true once the stream is complete; throws on an error event
+function applyStreamEvent(
+  line: string,
+  result: Partial<WrappedData>,
+  onSection?: (section: StreamSection, data: Partial<WrappedData>) => void
+): boolean {
+  if (!line.trim()) return false;
+
+  const event = JSON.parse(line) as StreamEvent;
+  if (event.event === 'error') {
+    throw new Error(event.detail || 'Failed to analyze data');
+  }
+  if (event.event === 'complete') {
+    return true;
+  }
+
+  Object.assign(result, event.data);
+  onSection?.(event.section, event.data);
+  return false;
+}
+
 export async function checkAPIHealth(): Promise<boolean> {
   try {
     const response = await fetch(`${API_URL}/`);